@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the Country Picker.
+
+Run with `python -m benchmarks.bench`; see benchmarks/bench.py for options.
+"""
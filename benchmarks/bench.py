@@ -0,0 +1,293 @@
+"""
+Benchmark runner for the Country Picker.
+
+Starts a local FakeApiServer playing API_URL and FLAG_BASE_URL, then measures:
+
+    parse.*      parse throughput, buffered and streaming
+    startup.*    CountryPickerApp construction to first item / populated combobox,
+                 on a cold start (empty working directory) and a warm start
+    flag.*       selection-to-flag-visible latency: cold (network), warm from
+                 the flag pack on disk, warm from the in-memory pixmap cache
+    ui.*         event-loop lag on the GUI thread during the sessions
+
+Qt measurements run in child processes on the offscreen platform, since a
+QApplication can only be created once per process. Results are written as
+JSON and can be compared against a stored baseline:
+
+    python -m benchmarks.bench --output bench_results.json
+    python -m benchmarks.bench --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.fake_api import FakeApiServer, make_countries
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metrics where larger values are better; all others are durations
+HIGHER_IS_BETTER_SUFFIXES = ("_per_s",)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return the nearest-rank percentile of values (0 for an empty list).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def bench_parse(countries: int, repeat: int) -> Dict[str, float]:
+    """
+    Measure buffered (json.loads + parse_countries_json) and streaming
+    (iter_countries_json over 16 KiB chunks into a CountryTable) parse throughput.
+    """
+    from country_picker.table import CountryTable
+    from country_picker.utils import iter_countries_json, parse_countries_json
+
+    payload = json.dumps(make_countries(countries), ensure_ascii=False).encode("utf-8")
+    chunks = [payload[i:i + 16 * 1024] for i in range(0, len(payload), 16 * 1024)]
+
+    buffered, streaming = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_countries_json(json.loads(payload))
+        buffered.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        CountryTable(iter_countries_json(chunks))
+        streaming.append(time.perf_counter() - start)
+
+    best_buffered, best_streaming = min(buffered), min(streaming)
+    return {
+        "parse.buffered_records_per_s": countries / best_buffered,
+        "parse.stream_records_per_s": countries / best_streaming,
+        "parse.stream_mb_per_s": len(payload) / best_streaming / 1e6,
+    }
+
+
+def run_session(workdir: str, server: FakeApiServer, label: str, selections: int) -> Dict[str, float]:
+    """
+    Run one GUI session in a child process with workdir as working directory,
+    holding its caches and logs, and return its metrics prefixed by label.
+    """
+    env = dict(os.environ)
+    env.update({
+        "QT_QPA_PLATFORM": "offscreen",
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "COUNTRY_PICKER_API_URL": server.api_url,
+        "COUNTRY_PICKER_FLAG_BASE_URL": server.base_url,
+        "COUNTRY_PICKER_CACHE_DIR": os.path.join(workdir, "cache"),
+    })
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench", "--session", "--selections", str(selections)],
+        cwd=workdir, env=env, capture_output=True, text=True, timeout=300,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{label} session failed:\n{completed.stderr}")
+    session = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        f"startup.{label}.constructed_ms": session["constructed_ms"],
+        f"startup.{label}.first_item_ms": session["first_item_ms"],
+        f"startup.{label}.populated_ms": session["populated_ms"],
+        f"flag.{label}.first_view_p50_ms": percentile(session["first_view_ms"], 0.5),
+        f"flag.{label}.first_view_p95_ms": percentile(session["first_view_ms"], 0.95),
+        f"flag.{label}.memory_p50_ms": percentile(session["memory_ms"], 0.5),
+        f"ui.{label}.max_lag_ms": session["max_lag_ms"],
+        f"ui.{label}.p99_lag_ms": session["p99_lag_ms"],
+    }
+
+
+def session_main(selections: int) -> None:
+    """
+    Child-process entry: start the app, time startup and flag selections,
+    and print the measurements as one JSON line.
+    """
+    from PyQt6.QtCore import QElapsedTimer, QEventLoop, QTimer
+
+    from country_picker.app import CountryPickerApp
+
+    start = time.perf_counter()
+    app = CountryPickerApp()
+    marks: Dict[str, float] = {"constructed_ms": (time.perf_counter() - start) * 1000}
+
+    # Event-loop lag: a 5 ms heartbeat that records how late each tick fires
+    lags: List[float] = []
+    heartbeat = QTimer()
+    heartbeat.setInterval(5)
+    clock = QElapsedTimer()
+    clock.start()
+
+    def on_beat() -> None:
+        lags.append(max(0.0, clock.restart() - 5))
+
+    heartbeat.timeout.connect(on_beat)
+    heartbeat.start()
+
+    class Waiter:
+        """
+        Collects a matching signal emission. Connect it before triggering the
+        action: emissions from worker threads may happen before wait() runs.
+        """
+
+        def __init__(self, signal, predicate) -> None:
+            self.signal, self.predicate = signal, predicate
+            self.loop = QEventLoop()
+            self.matched = False
+            signal.connect(self.handler)
+
+        def handler(self, *args) -> None:
+            if not self.matched and self.predicate(*args):
+                self.matched = True
+                self.loop.quit()
+
+        def wait(self, timeout: float) -> bool:
+            if not self.matched:
+                QTimer.singleShot(int(timeout * 1000), self.loop.quit)
+                self.loop.exec()
+            self.signal.disconnect(self.handler)
+            return self.matched
+
+    # The fetch thread may emit before anything here could connect to it, so
+    # startup is observed by polling the UI state on the GUI thread instead
+    poll = QTimer()
+    poll.setInterval(1)
+    loaded = QEventLoop()
+
+    def on_poll() -> None:
+        if app.ui.country_model.rowCount() > 0:
+            marks.setdefault("first_item_ms", (time.perf_counter() - start) * 1000)
+        if app.ui.search_index is not None:  # set once the complete list is shown
+            marks["populated_ms"] = (time.perf_counter() - start) * 1000
+            loaded.quit()
+
+    poll.timeout.connect(on_poll)
+    poll.start()
+    QTimer.singleShot(30000, loaded.quit)
+    loaded.exec()
+    poll.stop()
+    if "populated_ms" not in marks:
+        raise RuntimeError("country list was not loaded")
+
+    model = app.ui.country_model
+    rows = list(range(0, model.rowCount(), max(1, model.rowCount() // selections)))[:selections]
+
+    def select(row: int) -> float:
+        code = model.record(row)[1]
+        waiter = Waiter(app.catalog.flag_ready, lambda c, _image: c == code)
+        begin = time.perf_counter()
+        app.ui.combobox.setCurrentIndex(row)
+        pixmap = app.ui.flag_label.pixmap()
+        if pixmap is None or pixmap.isNull():
+            waiter.wait(15.0)
+        else:
+            waiter.signal.disconnect(waiter.handler)
+        return (time.perf_counter() - begin) * 1000
+
+    first_view = [select(row) for row in rows]
+    memory = [select(row) for row in rows]
+
+    heartbeat.stop()
+    app.stop_workers()
+    print(json.dumps({
+        **marks,
+        "first_view_ms": first_view,
+        "memory_ms": memory,
+        "max_lag_ms": max(lags, default=0.0),
+        "p99_lag_ms": percentile(lags, 0.99),
+    }))
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Return a description of every metric that regressed by more than
+    tolerance (a fraction) relative to the baseline. Durations must also be
+    worse by at least min_delta_ms, so timer noise on tiny values is ignored.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        value = results.get(name)
+        if value is None or base <= 0:
+            continue
+        if name.endswith(HIGHER_IS_BETTER_SUFFIXES):
+            worse = value < base * (1 - tolerance)
+        else:
+            worse = value > base * (1 + tolerance) and value - base >= min_delta_ms
+        if worse:
+            regressions.append(f"{name}: {value:.3f} (baseline {base:.3f})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Country Picker benchmarks")
+    parser.add_argument("--countries", type=int, default=250, help="Countries served by the fake API")
+    parser.add_argument("--flag-bytes", type=int, default=2000, help="Approximate size of each SVG flag")
+    parser.add_argument("--latency", type=float, default=0.02, help="Per-request latency in seconds")
+    parser.add_argument("--bandwidth", type=float, default=None, help="Throughput limit in bytes/s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--selections", type=int, default=20, help="Flags selected per session")
+    parser.add_argument("--parse-countries", type=int, default=50000, help="Records in the parse benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of the parse benchmark")
+    parser.add_argument("--output", default="bench_results.json", help="File receiving the results")
+    parser.add_argument("--baseline", default=None, help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore duration regressions below this")
+    parser.add_argument("--session", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.session:
+        session_main(args.selections)
+        return
+
+    results = bench_parse(args.parse_countries, args.repeat)
+
+    server = FakeApiServer(
+        countries=args.countries,
+        flag_bytes=args.flag_bytes,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+    ).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results.update(run_session(workdir, server, "cold", args.selections))
+            results.update(run_session(workdir, server, "warm", args.selections))
+    finally:
+        server.stop()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "session")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    width = max(map(len, results))
+    for name, value in sorted(results.items()):
+        print(f"{name:<{width}}  {value:12.3f}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
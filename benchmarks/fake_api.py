@@ -0,0 +1,202 @@
+"""
+Local HTTP stand-in for the countries API (API_URL) and the flag CDN
+(FLAG_BASE_URL), with configurable latency, bandwidth, error rate and
+payload size.
+
+    /v2/all?...       JSON array of {"name", "alpha2Code"} with ETag / 304 support
+    /<code>.svg       generated SVG flag
+    PUT /_control     JSON object setting latency, bandwidth and/or error_rate,
+                      so another process can simulate outages
+"""
+
+import hashlib
+import json
+import random
+import string
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients dropping keep-alive connections on exit are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_countries(count: int) -> List[Dict[str, Any]]:
+    """
+    Return count synthetic countries in API shape, unsorted, with accented
+    names so normalization paths are exercised. Codes repeat after 676 entries.
+    """
+    regions = ["Africa", "Americas", "Asia", "Europe", "Oceania"]
+    letters = string.ascii_uppercase
+    rng = random.Random(count)
+    countries = []
+    for i in range(count):
+        code = letters[(i // 26) % 26] + letters[i % 26]
+        name = f"{rng.choice(['Île', 'Côte', 'Saint', 'Nueva', 'Upper'])} {rng.choice(letters)}{i:05d}"
+        region = regions[i % len(regions)]
+        countries.append({
+            "name": name,
+            "alpha2Code": code,
+            "alpha3Code": code + letters[i % 26],
+            "region": region,
+            "subregion": f"{['Northern', 'Southern', 'Eastern', 'Western'][i % 4]} {region}",
+            "population": rng.randrange(1000, 200_000_000),
+            "capital": f"{name} City",
+        })
+    rng.shuffle(countries)
+    return countries
+
+
+def make_flag(code: str, size: int) -> bytes:
+    """
+    Return an SVG flag for code of roughly size bytes.
+    """
+    color = hashlib.md5(code.encode()).hexdigest()[:6]
+    body = [f'<rect width="640" height="480" fill="#{color}"/>']
+    i = 0
+    while sum(map(len, body)) < size:
+        body.append(f'<circle cx="{(i * 37) % 640}" cy="{(i * 53) % 480}" r="{4 + i % 9}" fill="#fff"/>')
+        i += 1
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 640 480">' + "".join(body) + "</svg>"
+    ).encode()
+
+
+class FakeApiServer:
+    """
+    Threaded HTTP server playing the countries API and the flag CDN.
+
+    Attributes may be changed while the server runs, e.g. to simulate an
+    outage by setting error_rate to 1.0.
+    """
+
+    def __init__(
+        self,
+        countries: int = 250,
+        flag_bytes: int = 2000,
+        latency: float = 0.0,
+        bandwidth: float | None = None,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """
+        Args:
+            countries: Number of countries in the API response.
+            flag_bytes: Approximate size of each SVG flag.
+            latency: Seconds to wait before answering each request.
+            bandwidth: Response throughput limit in bytes per second, or None.
+            error_rate: Probability of answering 503 instead of the payload.
+            seed: Seed for the error injection.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.flag_bytes = flag_bytes
+        self.requests: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.set_countries(make_countries(countries))
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                server._handle(self)
+
+            def do_PUT(self) -> None:
+                server._control(self)
+
+        self._httpd = _Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/v2/all?fields=name,alpha2Code"
+
+    def set_countries(self, countries: List[Dict[str, Any]]) -> None:
+        """
+        Replace the API payload; the ETag changes accordingly.
+        """
+        payload = json.dumps(countries, ensure_ascii=False).encode("utf-8")
+        self.countries = countries
+        self._payload = payload
+        self._etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+    def start(self) -> "FakeApiServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        path = handler.path.split("?", 1)[0]
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            failing = self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+
+        if failing:
+            self._send(handler, 503, b"unavailable", "text/plain")
+        elif path.endswith("/all"):
+            if handler.headers.get("If-None-Match") == self._etag:
+                self._send(handler, 304, b"", None, {"ETag": self._etag})
+            else:
+                self._send(handler, 200, self._payload, "application/json", {"ETag": self._etag})
+        elif path.endswith(".svg"):
+            code = path.rsplit("/", 1)[-1][:-4]
+            self._send(handler, 200, make_flag(code, self.flag_bytes), "image/svg+xml")
+        else:
+            self._send(handler, 404, b"not found", "text/plain")
+
+    def _control(self, handler: BaseHTTPRequestHandler) -> None:
+        if handler.path != "/_control":
+            self._send(handler, 404, b"not found", "text/plain")
+            return
+        try:
+            changes = json.loads(handler.rfile.read(int(handler.headers.get("Content-Length", 0))))
+            for name in set(changes) - {"latency", "bandwidth", "error_rate"}:
+                raise ValueError(f"unknown setting {name}")
+        except ValueError as e:
+            self._send(handler, 400, str(e).encode(), "text/plain")
+            return
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self._send(handler, 204, b"", None)
+
+    def _send(self, handler, status: int, body: bytes, content_type: str | None, headers: Dict[str, str] | None = None) -> None:
+        handler.send_response(status)
+        if content_type:
+            handler.send_header("Content-Type", content_type)
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if not self.bandwidth:
+            handler.wfile.write(body)
+            return
+        # Throttle by writing small chunks at the configured rate
+        chunk = 16 * 1024
+        for start in range(0, len(body), chunk):
+            handler.wfile.write(body[start:start + chunk])
+            handler.wfile.flush()
+            time.sleep(min(chunk, len(body) - start) / self.bandwidth)
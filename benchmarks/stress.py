@@ -0,0 +1,414 @@
+"""
+Stress and soak harness for the Country Picker GUI.
+
+Starts a local FakeApiServer playing API_URL and FLAG_BASE_URL, then runs
+CountryPickerApp with a few extra embedded pickers in a child process on
+Qt's offscreen platform, and keeps it busy for --duration seconds:
+
+    selections   bursts of currentIndexChanged on random pickers and rows
+    popups       popup open/close cycles, highlighting rows while open
+    flaps        network outages: the server fails every request while a
+                 cold fetch of the country list runs, which goes through
+                 on_fetch_error and the backoff retry; the outage ends after
+                 the failure is reported and the retry must then recover
+
+Every --sample-every seconds the child reports its RSS, OS thread count,
+live and running QThread objects and the event-loop lag of a 5 ms
+heartbeat. The run fails (exit status 1) if any budget is exceeded: QThread
+objects or OS threads growing after the warm-up (e.g. a thread created per
+selection), more QThreads running than the app owns, QThreads still running
+after shutdown, RSS growing by more than --max-rss-growth-mb, lag beyond
+--lag-p99-ms / --lag-max-ms, or a flap the app did not recover from.
+
+    python -m benchmarks.stress --duration 120
+    python -m benchmarks.stress --duration 14400 --sample-every 60 --output soak.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.bench import percentile
+from benchmarks.fake_api import FakeApiServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Interval of the heartbeat measuring event-loop lag, in milliseconds
+HEARTBEAT_MS = 5
+
+
+def process_stats() -> Dict[str, float]:
+    """
+    Return the RSS (MiB) and OS thread count of this process. Without
+    /proc (not Linux), the peak RSS and Python's thread count are used.
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {"rss_mb": int(fields["VmRSS"].split()[0]) / 1024, "threads": int(fields["Threads"])}
+    except (OSError, KeyError, ValueError):
+        import resource
+        import threading
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_mb": peak / (1024 * 1024 if sys.platform == "darwin" else 1024), "threads": threading.active_count()}
+
+
+def histogram_percentile(histogram: Counter, fraction: float) -> int:
+    """
+    Return the nearest-rank percentile of the values counted in histogram
+    (0 if it is empty).
+    """
+    rank = int(fraction * sum(histogram.values()))
+    for value in sorted(histogram):
+        rank -= histogram[value]
+        if rank < 0:
+            return value
+    return max(histogram, default=0)
+
+
+def session_main(args: argparse.Namespace) -> None:
+    """
+    Child-process entry: run the app under load for args.duration seconds,
+    printing one JSON line per sample and a final summary line.
+    """
+    import gc
+    import random
+    import urllib.request
+
+    from PyQt6.QtCore import QElapsedTimer, QThread, QTimer
+
+    from country_picker.app import CountryPickerApp
+    from country_picker.config import COUNTRIES_CACHE_FILE
+    from country_picker.metrics import METRICS
+    from country_picker.ui import CountryPickerWidget
+
+    start = time.monotonic()
+    app = CountryPickerApp()
+    pickers = [app.ui] + [CountryPickerWidget(app.catalog) for _ in range(args.pickers)]
+    for picker in pickers[1:]:
+        app.ui.layout.addWidget(picker)
+    rng = random.Random(args.seed)
+    counts = {"selections": 0, "popups": 0, "flaps": 0, "fetch_errors": 0, "flags_shown": 0, "flags_failed": 0}
+    recoveries: List[float] = []
+
+    def on_flag(_code: str, image) -> None:
+        counts["flags_shown" if not image.isNull() else "flags_failed"] += 1
+
+    app.catalog.flag_ready.connect(on_flag)
+
+    # Event-loop lag: how late each heartbeat fires, per sample window, and
+    # over the whole run as a histogram of whole milliseconds, since a soak
+    # run must not grow with its own measurements
+    lags: List[float] = []
+    lag_histogram: Counter = Counter()
+    clock = QElapsedTimer()
+    clock.start()
+
+    def on_beat() -> None:
+        lags.append(max(0.0, clock.restart() - HEARTBEAT_MS))
+
+    heartbeat = QTimer()
+    heartbeat.setInterval(HEARTBEAT_MS)
+    heartbeat.timeout.connect(on_beat)
+
+    def select() -> None:
+        for _ in range(args.burst):
+            picker = rng.choice(pickers)
+            rows = picker.country_model.rowCount()
+            if rows:
+                picker.combobox.setCurrentIndex(rng.randrange(rows))
+                counts["selections"] += 1
+
+    selector = QTimer()
+    selector.setInterval(args.tick_ms)
+    selector.timeout.connect(select)
+
+    popup_open: List[Any] = []
+
+    def cycle_popup() -> None:
+        if popup_open:
+            popup_open.pop().combobox.hidePopup()
+            return
+        picker = rng.choice(pickers)
+        rows = picker.country_model.rowCount()
+        if not rows:
+            return
+        picker.combobox.showPopup()
+        view = picker.combobox.view()
+        for _ in range(5):
+            view.setCurrentIndex(picker.country_model.index(rng.randrange(rows), 0))
+        popup_open.append(picker)
+        counts["popups"] += 1
+
+    popups = QTimer()
+    popups.setInterval(args.popup_ms)
+    popups.timeout.connect(cycle_popup)
+
+    # Flap state: None when the network is up, else when the outage started;
+    # recovering is set once the failure was reported and the network is back
+    flap: Dict[str, Any] = {"since": None, "recovering": False}
+
+    def set_network(error_rate: float) -> None:
+        request = urllib.request.Request(
+            f"{args.control_url}/_control", json.dumps({"error_rate": error_rate}).encode(), method="PUT"
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+    def start_flap() -> None:
+        if flap["since"] is not None or app.catalog.loading:
+            return
+        set_network(1.0)
+        # Without a cached list the fetch reports its failure to the UI
+        try:
+            os.remove(COUNTRIES_CACHE_FILE)
+        except OSError:
+            pass
+        flap.update(since=time.monotonic(), recovering=False)
+        counts["flaps"] += 1
+        app.catalog.start_fetch()
+
+    def on_fetch_failed(_error: str) -> None:
+        counts["fetch_errors"] += 1
+        if flap["since"] is not None and not flap["recovering"]:
+            set_network(0.0)
+            flap["recovering"] = True
+
+    def on_countries(_table, loading: bool) -> None:
+        if not loading and flap["recovering"]:
+            recoveries.append(time.monotonic() - flap["since"])
+            flap.update(since=None, recovering=False)
+
+    app.catalog.fetch_failed.connect(on_fetch_failed)
+    app.catalog.countries_changed.connect(on_countries)
+    flapper = QTimer()
+    flapper.setInterval(int(args.flap_every * 1000))
+    flapper.timeout.connect(start_flap)
+
+    def live_qthreads() -> List[QThread]:
+        gc.collect()
+        return [obj for obj in gc.get_objects() if isinstance(obj, QThread)]
+
+    def sample() -> None:
+        threads = live_qthreads()
+        lag_histogram.update(int(lag) for lag in lags)
+        line = {
+            "t": round(time.monotonic() - start, 1),
+            **process_stats(),
+            "qthreads": len(threads),
+            "qthreads_running": sum(thread.isRunning() for thread in threads),
+            "lag_p99_ms": percentile(lags, 0.99),
+            "lag_max_ms": max(lags, default=0.0),
+            **counts,
+        }
+        lags.clear()
+        print(json.dumps(line), flush=True)
+        # The collection above must not count as event-loop lag
+        clock.restart()
+
+    sampler = QTimer()
+    sampler.setInterval(int(args.sample_every * 1000))
+    sampler.timeout.connect(sample)
+
+    def begin() -> None:
+        heartbeat.start()
+        selector.start()
+        popups.start()
+        sampler.start()
+        if args.flap_every > 0:
+            flapper.start()
+        clock.restart()
+
+    # Load starts once the first complete list is shown
+    def on_first_list(_table, loading: bool) -> None:
+        if not loading and not heartbeat.isActive():
+            begin()
+
+    def end() -> None:
+        # Runs after the app stopped its workers; samples taken now would
+        # compare the stopped app with the running one
+        for timer in (heartbeat, selector, popups, sampler, flapper):
+            timer.stop()
+
+    app.catalog.countries_changed.connect(on_first_list)
+    app.app.aboutToQuit.connect(end)
+    QTimer.singleShot(int(args.duration * 1000), app.app.quit)
+    if app.watchdog is not None:
+        app.watchdog.start()
+        app.heartbeat_timer.start()
+    app.app.exec()
+
+    # aboutToQuit stopped the workers; a fetch may still be finishing
+    fetch_thread = app.catalog.fetch_thread
+    if fetch_thread is not None:
+        fetch_thread.wait(10000)
+    running_after_stop = sum(thread.isRunning() for thread in live_qthreads())
+    lag_histogram.update(int(lag) for lag in lags)
+    print(json.dumps({"summary": {
+        **counts,
+        "recoveries_s": [round(r, 2) for r in recoveries],
+        "unrecovered_flap_s": None if flap["since"] is None else round(time.monotonic() - flap["since"], 1),
+        "qthreads_running_after_stop": running_after_stop,
+        "lag_p99_ms": histogram_percentile(lag_histogram, 0.99),
+        "lag_max_ms": max(lag_histogram, default=0),
+        "stalls": {name: value for name, value in METRICS.snapshot().get("counters", {}).items() if name.startswith("loop.")},
+    }}), flush=True)
+
+
+def check_budgets(samples: List[Dict[str, Any]], summary: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """
+    Return a description of every budget the run exceeded.
+    """
+    violations = []
+    if not samples:
+        return ["no samples were taken (the country list never loaded?)"]
+    base = next((s for s in samples if s["t"] >= args.warmup), samples[-1])
+    after = [s for s in samples if s["t"] >= base["t"]]
+    last = samples[-1]
+
+    most = max(s["qthreads"] for s in after)
+    if most > base["qthreads"] + args.qthread_slack:
+        violations.append(f"QThread objects grew from {base['qthreads']} to {most}")
+    running = max(s["qthreads_running"] for s in samples)
+    if running > args.max_running_qthreads:
+        violations.append(f"{running} QThreads running at once (budget {args.max_running_qthreads})")
+    if summary.get("qthreads_running_after_stop"):
+        violations.append(f"{summary['qthreads_running_after_stop']} QThreads still running after shutdown")
+    threads = max(s["threads"] for s in after)
+    if threads > base["threads"] + args.thread_slack:
+        violations.append(f"OS threads grew from {base['threads']} to {threads}")
+    growth = last["rss_mb"] - base["rss_mb"]
+    if growth > args.max_rss_growth_mb:
+        violations.append(f"RSS grew by {growth:.1f} MiB after warm-up (budget {args.max_rss_growth_mb} MiB)")
+
+    worst_p99 = max(s["lag_p99_ms"] for s in samples)
+    if worst_p99 > args.lag_p99_ms:
+        violations.append(f"event-loop lag p99 {worst_p99:.1f} ms in one sample (budget {args.lag_p99_ms} ms)")
+    worst = max(s["lag_max_ms"] for s in samples)
+    if worst > args.lag_max_ms:
+        violations.append(f"event-loop lag {worst:.1f} ms (budget {args.lag_max_ms} ms)")
+
+    if summary.get("flaps") and not summary.get("fetch_errors"):
+        violations.append("network flaps never reached on_fetch_error")
+    slow = [r for r in summary.get("recoveries_s", []) if r > args.recovery_s]
+    if slow:
+        violations.append(f"{len(slow)} flaps took longer than {args.recovery_s} s to recover (slowest {max(slow)} s)")
+    unrecovered = summary.get("unrecovered_flap_s")
+    if unrecovered is not None and unrecovered > args.recovery_s:
+        violations.append(f"still not recovered from a flap after {unrecovered} s")
+    return violations
+
+
+def run_session(workdir: str, server: FakeApiServer, args: argparse.Namespace) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run the stress session in a child process with workdir as working
+    directory, printing each sample as it arrives, and return the samples
+    and the summary.
+    """
+    env = dict(os.environ)
+    env.update({
+        "QT_QPA_PLATFORM": "offscreen",
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "COUNTRY_PICKER_API_URL": server.api_url,
+        "COUNTRY_PICKER_FLAG_BASE_URL": server.base_url,
+        "COUNTRY_PICKER_CACHE_DIR": os.path.join(workdir, "cache"),
+    })
+    command = [
+        sys.executable, "-m", "benchmarks.stress", "--session", "--control-url", server.base_url,
+        *(f"--{name.replace('_', '-')}={value}" for name, value in vars(args).items() if name in SESSION_OPTIONS),
+    ]
+    samples: List[Dict[str, Any]] = []
+    summary: Dict[str, Any] = {}
+    stderr_path = os.path.join(workdir, "session.stderr")
+    with open(stderr_path, "w+", encoding="utf-8") as stderr:
+        child = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        for line in child.stdout:
+            record = json.loads(line)
+            if "summary" in record:
+                summary = record["summary"]
+                continue
+            samples.append(record)
+            print(
+                f"t={record['t']:>8.1f}s  rss={record['rss_mb']:7.1f} MiB  threads={record['threads']:3d}  "
+                f"qthreads={record['qthreads_running']}/{record['qthreads']}  "
+                f"lag p99={record['lag_p99_ms']:6.1f} max={record['lag_max_ms']:6.1f} ms  "
+                f"selections={record['selections']}  popups={record['popups']}  "
+                f"flaps={record['flaps']} errors={record['fetch_errors']}",
+                flush=True,
+            )
+        if child.wait() != 0 or not summary:
+            stderr.seek(0)
+            raise RuntimeError(f"stress session failed:\n{stderr.read()[-4000:]}")
+    return samples, summary
+
+
+# Options passed on to the child process
+SESSION_OPTIONS = ("duration", "sample_every", "pickers", "tick_ms", "burst", "popup_ms", "flap_every", "seed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Country Picker stress and soak test")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep the app under load")
+    parser.add_argument("--warmup", type=float, default=10.0, help="Seconds before thread and memory baselines are taken")
+    parser.add_argument("--sample-every", type=float, default=5.0, help="Seconds between samples")
+    parser.add_argument("--pickers", type=int, default=3, help="Pickers embedded in addition to the main one")
+    parser.add_argument("--tick-ms", type=int, default=10, help="Milliseconds between selection bursts")
+    parser.add_argument("--burst", type=int, default=2, help="Selections per burst")
+    parser.add_argument("--popup-ms", type=int, default=250, help="Milliseconds between popup opens and closes")
+    parser.add_argument("--flap-every", type=float, default=20.0, help="Seconds between network outages (0 disables them)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the choice of pickers and rows")
+    parser.add_argument("--countries", type=int, default=250, help="Countries served by the fake API")
+    parser.add_argument("--flag-bytes", type=int, default=2000, help="Approximate size of each SVG flag")
+    parser.add_argument("--latency", type=float, default=0.005, help="Per-request latency in seconds")
+    parser.add_argument("--qthread-slack", type=int, default=1, help="Allowed growth of live QThread objects")
+    parser.add_argument("--max-running-qthreads", type=int, default=2, help="QThreads allowed to run at once")
+    parser.add_argument("--thread-slack", type=int, default=8, help="Allowed growth of OS threads after warm-up")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0, help="Allowed RSS growth after warm-up")
+    parser.add_argument("--lag-p99-ms", type=float, default=50.0, help="Budget for the p99 event-loop lag of any sample")
+    parser.add_argument("--lag-max-ms", type=float, default=500.0, help="Budget for the longest event-loop lag")
+    parser.add_argument("--recovery-s", type=float, default=90.0, help="Budget for recovering from a network flap")
+    parser.add_argument("--output", default="stress_results.json", help="File receiving the samples and verdict")
+    parser.add_argument("--control-url", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--session", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.session:
+        session_main(args)
+        return
+
+    server = FakeApiServer(countries=args.countries, flag_bytes=args.flag_bytes, latency=args.latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            samples, summary = run_session(workdir, server, args)
+    finally:
+        server.stop()
+
+    violations = check_budgets(samples, summary, args)
+    report = {
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "session", "control_url")},
+        "samples": samples,
+        "summary": summary,
+        "violations": violations,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"{summary['selections']} selections, {summary['popups']} popups, {summary['flaps']} flaps "
+        f"(recovered in {', '.join(f'{r:.1f}' for r in summary['recoveries_s']) or '-'} s), "
+        f"{summary['flags_shown']} flags delivered; lag p99 {summary['lag_p99_ms']:.1f} ms, "
+        f"max {summary['lag_max_ms']:.1f} ms"
+    )
+    for line in violations:
+        print(f"BUDGET EXCEEDED {line}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
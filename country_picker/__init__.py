@@ -8,15 +8,33 @@ CountryPicker/
 │   ├── __init__.py
 │   ├── __main__.py
 │   ├── app.py
+│   ├── catalog.py
 │   ├── ui.py
+│   ├── models.py
+│   ├── table.py
+│   ├── search.py
 │   ├── thread.py
+│   ├── render.py
 │   ├── utils.py
 │   ├── data.py
+│   ├── cache.py
+│   ├── flagpack.py
+│   ├── snapshot.py
+│   ├── retry.py
+│   ├── mirrors.py
+│   ├── prefetch.py
+│   ├── locking.py
+│   ├── cli.py
+│   ├── server.py
+│   ├── startup.py
+│   ├── metrics.py
+│   ├── log.py
+│   ├── watchdog.py
 │   ├── config.py
 │   └── assets/
 │       └── flags/            # (empty, created at runtime)
 ├── logs/
-│   └── app.log               # (created at runtime by config.py)
+│   └── app.log               # (created at runtime by log.py, rotated)
 ├── tests/
 │   ├── __init__.py
 │   └── test_data.py
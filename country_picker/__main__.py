@@ -1,16 +1,23 @@
 """
 Entrypoint for the country_picker package.
-Parses command-line arguments and launches the Country Picker application.
+Parses command-line arguments and launches the Country Picker application,
+or runs one of the headless subcommands.
 """
 
 import argparse
-from .app import CountryPickerApp
+from .cli import add_commands
+from .config import LOG_LEVEL, METRICS_FILE, METRICS_LOG, WATCHDOG_STALL_MS
+from .metrics import METRICS, install_dump
+from .startup import StartupProfiler
 
 
 def main() -> None:
     """
-    Parses optional CLI arguments and starts the Qt application.
+    Parses optional CLI arguments and starts the Qt application,
+    unless a subcommand was given.
     """
+    profiler = StartupProfiler()
+
     parser = argparse.ArgumentParser(description="Country Picker")
     parser.add_argument(
         "--select",
@@ -18,10 +25,57 @@ def main() -> None:
         help="Pre-select a country name in the dropdown",
         default=None,
     )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print per-phase startup timings (ms) as a JSON line on stderr",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        type=str.upper,
+        default=LOG_LEVEL,
+        help="Lowest level of messages written to the log",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=METRICS_FILE,
+        help="Write counters and timings as JSON to this file at exit and on SIGUSR1",
+    )
+    parser.add_argument(
+        "--log-metrics",
+        action="store_true",
+        default=METRICS_LOG,
+        help="Also log every timing as a JSON line",
+    )
+    parser.add_argument(
+        "--stall-ms",
+        type=float,
+        default=WATCHDOG_STALL_MS,
+        help="Log event loop stalls longer than this, with the main thread's stack (0 disables)",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    add_commands(subparsers)
     args = parser.parse_args()
 
+    METRICS.log_spans = args.log_metrics
+    if args.metrics_file:
+        install_dump(args.metrics_file)
+
+    if args.command is not None:
+        exit(args.handler(args))
+
+    # Qt is only imported when the window is actually needed
+    from .app import CountryPickerApp
+    profiler.mark("imports")
+
     # Initialize the application with optional preselected country
-    app = CountryPickerApp(preselect=args.select)
+    app = CountryPickerApp(
+        preselect=args.select,
+        profiler=profiler if args.profile_startup else None,
+        log_level=args.log_level,
+        stall_ms=args.stall_ms,
+    )
     exit_code = app.run()
     exit(exit_code)
 
@@ -1,154 +1,208 @@
 import sys
-import os
 from PyQt6.QtWidgets import QApplication, QMessageBox
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import QEvent, QObject, QTimer
 
+from .catalog import CountryCatalog
 from .ui import CountryPickerUI
-from .thread import CountryFetchThread, FlagFetchThread
+from .metrics import METRICS
+from .search import LookupIndex
+from .startup import StartupProfiler
+from .table import CountryTable
+from .watchdog import StallWatchdog
 from .config import (
-    LOGS_DIR,
-    LOG_FILE,
-    RETRY_INTERVAL_SECONDS,
+    LOG_LEVEL,
+    STARTUP_DEFER_MAX_MS,
+    WATCHDOG_INTERVAL_MS,
+    WATCHDOG_STALL_MS,
     MESSAGE_BOX_PRESELECT_NOT_FOUND,
+    MESSAGE_BOX_PRESELECT_SUGGESTIONS,
 )
 
-import logging
 
-# Ensure logs directory exists
-if not os.path.exists(LOGS_DIR):
-    os.makedirs(LOGS_DIR, exist_ok=True)
+class FirstPaintFilter(QObject):
+    """
+    Event filter calling a function on the first paint event of the watched
+    widget, then removing itself.
+    """
 
-# Configure logging
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-)
+    def __init__(self, widget, on_paint) -> None:
+        super().__init__(widget)
+        self._on_paint = on_paint
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            self._on_paint()
+        return False
 
 
 class CountryPickerApp:
     """
     Main application controller class.
-    Handles UI initialization, threading, and retry logic.
+    Shows the picker window, starts the shared country catalog once it is on
+    screen, and applies the preselected country.
     """
 
-    def __init__(self, preselect: str | None = None):
+    def __init__(
+        self,
+        preselect: str | None = None,
+        profiler: StartupProfiler | None = None,
+        log_level: str = LOG_LEVEL,
+        stall_ms: float = WATCHDOG_STALL_MS,
+    ):
         """
-        Initialize the application and start fetching countries.
+        Initialize the application and show the window. Logging, the flag
+        worker and the country fetch are started after the first paint.
 
         Args:
             preselect: Optional country name to pre-select on startup.
+            profiler: Optional profiler receiving startup phase timings.
+            log_level: Lowest level written to the log file, e.g. "DEBUG".
+            stall_ms: Event loop lag reported as a stall, with the main
+                thread's stack; 0 disables the watchdog.
         """
+        self.profiler = profiler
+        self.log_level = log_level
         self.app = QApplication(sys.argv)
-        self.ui = CountryPickerUI()
+        self._mark("qapplication")
+
+        # Country list, fetching and flags live in the process-wide catalog,
+        # so further pickers embedded in the window share them
+        self.catalog = CountryCatalog.instance()
+        self.ui = CountryPickerUI(self.catalog)
+        self._first_paint = FirstPaintFilter(self.ui, self.on_first_paint)
         self.ui.show()
 
         self.preselect = preselect
-        self.countries: list[tuple[str, str]] = []
-        self.flag_fetch_thread: FlagFetchThread | None = None
-
-        # Retry timer for re-fetching countries after errors
-        self.retry_timer = QTimer()
-        self.retry_timer.setInterval(1000)  # Tick every 1 second
-        self.seconds_remaining = RETRY_INTERVAL_SECONDS
+        self.app.aboutToQuit.connect(self.stop_workers)
+
+        # Heartbeat measuring the event loop lag; the watchdog thread reports
+        # stalls with the main thread's stack. Started in run().
+        self.watchdog: StallWatchdog | None = None
+        if stall_ms > 0:
+            self.watchdog = StallWatchdog(stall_ms=stall_ms)
+            self.heartbeat_timer = QTimer()
+            self.heartbeat_timer.setInterval(WATCHDOG_INTERVAL_MS)
+            self.heartbeat_timer.timeout.connect(self.watchdog.beat)
+
+        # Python only runs signal handlers (SIGUSR1 dumps the metrics) when it
+        # gets control from the Qt event loop, so wake it up regularly; the
+        # heartbeat already does
+        if METRICS.dump_path is not None and self.watchdog is None:
+            self.signal_timer = QTimer()
+            self.signal_timer.timeout.connect(lambda: None)
+            self.signal_timer.start(500)
+
+        # Connected after the window, so the list is shown before preselecting
+        self.catalog.countries_changed.connect(self.on_countries_changed)
+        self.catalog.fetch_failed.connect(self.on_fetch_error)
+
+        # Fallback in case the window never paints (e.g. started minimized)
+        QTimer.singleShot(STARTUP_DEFER_MAX_MS, self.start_workers)
+
+    def _mark(self, phase: str) -> None:
+        """
+        Record a startup phase when profiling.
+        """
+        if self.profiler is not None:
+            self.profiler.mark(phase)
 
-        # Start initial fetch thread
-        self.fetch_thread = CountryFetchThread()
-        self.fetch_thread.finished.connect(self.on_countries_fetched)
-        self.fetch_thread.error.connect(self.on_fetch_error)
-        self.fetch_thread.start()
+    def on_first_paint(self) -> None:
+        """
+        Start the deferred work once the window has been painted.
+        """
+        self._mark("first_paint")
+        # Return to the event loop first so the painted frame is flushed
+        QTimer.singleShot(0, self.start_workers)
 
-        # Connect UI events
-        self.ui.combobox.currentIndexChanged.connect(self.on_country_selected)
-        self.retry_timer.timeout.connect(self.update_retry_countdown)
+    def start_workers(self) -> None:
+        """
+        Set up logging and start the catalog, which starts the flag worker
+        and fetches the country list. Runs once, after the window is on screen.
+        """
+        if self.catalog.started:
+            return
+        # Imported here: the log file is opened off the startup path
+        from .log import setup_logging
+        setup_logging(self.log_level)
+        self.catalog.start()
 
-    def on_countries_fetched(self, countries: list[tuple[str, str]]) -> None:
+    def on_countries_changed(self, table: CountryTable, loading: bool) -> None:
         """
-        Handle successful country fetch.
+        Record startup timings and apply the preselected country to the
+        first complete list.
 
         Args:
-            countries: List of (country_name, alpha2_code) tuples.
-        """
-        self.retry_timer.stop()
-        self.ui.update_retry_label(None)
-        self.countries = sorted(countries, key=lambda x: x[0])
-        self.ui.set_countries(self.countries)
-
-        # If preselect specified, set it in combobox or warn if not found
-        if self.preselect:
-            index = next(
-                (i + 1 for i, (name, _) in enumerate(self.countries) if name.lower() == self.preselect.lower()),
-                None,
-            )
-            if index is not None:
-                self.ui.combobox.setCurrentIndex(index)
-            else:
-                QMessageBox.warning(
-                    self.ui,
-                    "Preselect not found",
-                    MESSAGE_BOX_PRESELECT_NOT_FOUND.format(self.preselect),
-                )
-
-    def on_fetch_error(self, error_msg: str) -> None:
+            table: Countries now shown.
+            loading: True while more countries are still arriving.
+        """
+        self._mark("first_data")
+        if loading:
+            return
+        if self.profiler is not None:
+            self.profiler.report()
+
+        if self.ui.current_country() is None and self.preselect:
+            # If preselect specified, set it in combobox or offer close matches
+            lookup = LookupIndex(table)
+            row = lookup.resolve(self.preselect)
+            if row is None:
+                row = self.ask_preselect_suggestion(table, lookup.suggest(self.preselect))
+            if row is not None:
+                self.ui.combobox.setCurrentIndex(row)
+        # Preselect applies to the first list only, not to later refreshes
+        self.preselect = None
+
+    def ask_preselect_suggestion(self, table: CountryTable, suggestions: list[int]) -> int | None:
         """
-        Handle errors in fetching countries.
+        Warn that the preselected country was not found and offer the closest
+        matches as buttons.
 
         Args:
-            error_msg: Error message string.
-        """
-        logging.error(f"Error fetching countries: {error_msg}")
-        self.ui.show_error_loading()
-        self.seconds_remaining = RETRY_INTERVAL_SECONDS
-        self.retry_timer.start()
-        self.ui.update_retry_label(self.seconds_remaining)
+            table: Countries currently shown.
+            suggestions: Rows of the closest matching countries.
 
-    def update_retry_countdown(self) -> None:
-        """
-        Countdown timer handler for retrying country fetch.
+        Returns:
+            The row chosen by the user, or None.
         """
-        self.seconds_remaining -= 1
-        if self.seconds_remaining <= 0:
-            # Time to retry fetching countries
-            self.retry_timer.stop()
-            self.ui.update_retry_label(None)
-
-            self.fetch_thread = CountryFetchThread()
-            self.fetch_thread.finished.connect(self.on_countries_fetched)
-            self.fetch_thread.error.connect(self.on_fetch_error)
-            self.fetch_thread.start()
-        else:
-            self.ui.update_retry_label(self.seconds_remaining)
+        text = MESSAGE_BOX_PRESELECT_NOT_FOUND.format(self.preselect)
+        if suggestions:
+            text += "\n\n" + MESSAGE_BOX_PRESELECT_SUGGESTIONS
+        box = QMessageBox(QMessageBox.Icon.Warning, "Preselect not found", text, parent=self.ui)
+        buttons = {
+            box.addButton(table.name(row), QMessageBox.ButtonRole.AcceptRole): row
+            for row in suggestions
+        }
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        return buttons.get(box.clickedButton())
 
-    def on_country_selected(self, index: int) -> None:
+    def on_fetch_error(self, error_msg: str) -> None:
         """
-        Handle user selecting a country from the combobox.
+        Report the startup timings when the country list could not be
+        loaded; the catalog retries the fetch.
 
         Args:
-            index: The selected index of the combobox.
+            error_msg: Error message string.
         """
-        if index <= 0 or index - 1 >= len(self.countries):
-            # No valid selection
-            self.ui.update_label("", None)
-            return
-
-        country_name, alpha2 = self.countries[index - 1]
-        # Show country name immediately without flag
-        self.ui.update_label(country_name, None)
+        if self.profiler is not None:
+            self.profiler.report()  # first_data stays unset
 
-        # Stop previous flag fetch thread if running
-        if self.flag_fetch_thread is not None:
-            self.flag_fetch_thread.quit()
-            self.flag_fetch_thread.wait()
-
-        # Start new thread to fetch flag icon asynchronously
-        self.flag_fetch_thread = FlagFetchThread(alpha2)
-        self.flag_fetch_thread.finished.connect(
-            lambda path: self.ui.update_label(country_name, path)
-        )
-        self.flag_fetch_thread.start()
+    def stop_workers(self) -> None:
+        """
+        Stop the catalog's workers and the watchdog before the application exits.
+        """
+        self.catalog.stop()
+        if self.watchdog is not None:
+            self.heartbeat_timer.stop()
+            self.watchdog.stop()
 
     def run(self) -> None:
         """
         Start the Qt application event loop.
         """
+        if self.watchdog is not None:
+            self.watchdog.start()
+            self.heartbeat_timer.start()
         sys.exit(self.app.exec())
@@ -0,0 +1,134 @@
+"""
+On-disk cache of the parsed country list.
+
+The list is stored together with the HTTP validators (ETag / Last-Modified)
+returned by the API, so the next launch can show it immediately and only
+re-download it when the server reports a change.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .config import COUNTRIES_CACHE_FILE
+from .utils import Country
+
+# Bump when the on-disk layout changes; older files are ignored.
+CACHE_FORMAT_VERSION = 2
+
+# Version 1 stored (name, alpha2) pairs only. Such a list is still shown,
+# but without its validators, so the full records are downloaded next.
+_PAIRS_FORMAT_VERSION = 1
+
+
+class CachedCountries(NamedTuple):
+    """
+    Country list loaded from the cache, with the validators of the response
+    it was parsed from.
+    """
+    countries: List[Country]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def load_country_cache(path: str = COUNTRIES_CACHE_FILE) -> Optional[CachedCountries]:
+    """
+    Load the cached country list.
+
+    Args:
+        path (str): Location of the cache file.
+
+    Returns:
+        CachedCountries | None: The cached entry, or None if the file is
+        missing, unreadable or written by an incompatible version.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return decode_country_cache(payload)
+
+
+def decode_country_cache(payload: Any) -> Optional[CachedCountries]:
+    """
+    Validate a decoded cache document (as written by save_country_cache,
+    also used inside the bundled snapshot).
+
+    Args:
+        payload (Any): Result of json.load on the document.
+
+    Returns:
+        CachedCountries | None: The entry, or None if the document is
+        malformed or has an incompatible version.
+    """
+    if not isinstance(payload, dict):
+        return None
+    version = payload.get("version")
+    if version == _PAIRS_FORMAT_VERSION:
+        try:
+            countries = [Country(str(name), str(alpha2)) for name, alpha2 in payload["countries"]]
+        except (KeyError, TypeError, ValueError):
+            return None
+        return CachedCountries(countries, None, None)
+    if version != CACHE_FORMAT_VERSION:
+        return None
+
+    try:
+        countries = [
+            Country(str(name), str(alpha2), str(alpha3), str(region), str(subregion), int(population), str(capital))
+            for name, alpha2, alpha3, region, subregion, population, capital in payload["countries"]
+        ]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return CachedCountries(countries, payload.get("etag"), payload.get("last_modified"))
+
+
+def encode_country_cache(
+    countries: List[Country],
+    etag: Optional[str],
+    last_modified: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Build the JSON-serializable cache document for a country list.
+    """
+    return {
+        "version": CACHE_FORMAT_VERSION,
+        "etag": etag,
+        "last_modified": last_modified,
+        # Shorter (name, alpha2, ...) tuples are padded to full records
+        "countries": [record if isinstance(record, Country) else Country(*record) for record in countries],
+    }
+
+
+def save_country_cache(
+    countries: List[Country],
+    etag: Optional[str],
+    last_modified: Optional[str],
+    path: str = COUNTRIES_CACHE_FILE,
+) -> None:
+    """
+    Atomically write the country list and its validators to the cache.
+
+    The data is written to a temporary file next to the target and then
+    renamed over it, so a crash never leaves a truncated cache behind.
+
+    Args:
+        countries (List[Country]): Parsed country records.
+        etag (str | None): ETag header of the response, if any.
+        last_modified (str | None): Last-Modified header of the response, if any.
+        path (str): Location of the cache file.
+
+    Raises:
+        OSError: If the cache directory or file cannot be written.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    payload = encode_country_cache(countries, etag, last_modified)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,338 @@
+"""
+Process-wide country catalog shared by all picker widgets.
+
+The catalog owns the country list and the fetch and retry logic around it,
+the flag worker, prefetching, the selection history and the cache of
+rendered flags. However many CountryPickerWidgets a window shows, the list
+is fetched once and held in memory once (one CountryTable, one SearchIndex),
+and a flag is downloaded and rendered once for all of them. Widgets only
+keep their own selection and view state, and follow the catalog through
+its signals.
+"""
+
+import logging
+import math
+import time
+from typing import Hashable
+
+from PyQt6.QtCore import QCoreApplication, QObject, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from .config import (
+    API_URL,
+    COUNTRY_ALIASES,
+    PIXMAP_CACHE_MAX_BYTES,
+    PREFETCH_HISTORY_COUNT,
+    PREFETCH_WORKERS,
+    WORKER_STOP_GRACE_MS,
+    WORKER_STOP_TIMEOUT_MS,
+)
+from .metrics import METRICS
+from .mirrors import Mirrors
+from .prefetch import PRIORITY_HISTORY, PrefetchScheduler, SelectionHistory
+from .retry import CircuitBreakers
+from .search import SearchIndex
+from .table import CountryTable
+from .thread import CountryFetchThread, FlagFetchWorker
+from .utils import Country, LRUCache
+
+
+def build_search_index(table: CountryTable) -> SearchIndex:
+    """
+    Return the type-to-search index over the names and alternative names
+    (COUNTRY_ALIASES) of the countries in table.
+    """
+    aliases = {
+        row: COUNTRY_ALIASES[table.code(row)]
+        for row in range(len(table))
+        if table.code(row) in COUNTRY_ALIASES
+    }
+    return SearchIndex(table.names, aliases)
+
+
+class CountryCatalog(QObject):
+    """
+    Country list, flags and fetch state shared by the pickers of a process.
+
+    The first call to start() loads the list (cached, then revalidated) and
+    starts the flag worker and prefetching; later calls do nothing, so every
+    widget may call it. Fetch errors are retried with exponential backoff,
+    with a countdown announced through retry_countdown.
+
+    Flag requests carry the requesting widget as owner: of one owner's
+    pending requests only the newest is served, while requests of different
+    owners are all served, and a flag being fetched for one widget is
+    delivered to every widget through flag_ready.
+
+    Use instance() for the process-wide catalog; separate instances are
+    only useful in tests.
+    """
+    countries_changed = pyqtSignal(object, bool)  # emits the CountryTable, and True while more countries arrive
+    fetch_failed = pyqtSignal(str)                # emits the error message when no list could be loaded
+    retry_countdown = pyqtSignal(int)             # emits seconds until the next attempt, or 0 once it started
+    flag_ready = pyqtSignal(str, QImage)          # emits alpha2 code and rendered flag, or a null image if failed
+
+    _instance: "CountryCatalog | None" = None
+
+    @classmethod
+    def instance(cls) -> "CountryCatalog":
+        """
+        Return the process-wide catalog, creating it on first use. A
+        QApplication must exist; the catalog is stopped when it quits.
+        """
+        if cls._instance is None:
+            cls._instance = cls()
+            app = QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(cls._instance.stop)
+        return cls._instance
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        # The shown list, complete unless loading, and its search index
+        self.table = CountryTable()
+        self.loading = True
+        self.search_index: SearchIndex | None = None
+        # Message of the last failed fetch while no list is available
+        self.error: str | None = None
+
+        # Rendered flags keyed by (alpha2, width, height, device pixel ratio)
+        self.flag_cache = LRUCache(PIXMAP_CACHE_MAX_BYTES)
+
+        self.flag_worker: FlagFetchWorker | None = None
+        self.fetch_thread: CountryFetchThread | None = None
+        self.mirrors: Mirrors | None = None
+        self.prefetcher: PrefetchScheduler | None = None
+        self.history: SelectionHistory | None = None
+        # Threads that did not stop in time, referenced so they are not destroyed while running
+        self.stalled_threads: list[QThread] = []
+
+        # Backoff state shared by the country and flag fetch paths
+        self.breakers = CircuitBreakers()
+        self.fetch_failures = 0
+        self.retry_deadline = 0.0
+
+        # Retry timer for re-fetching countries after errors, and a timer
+        # refreshing the countdown shown until then
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.retry_fetch)
+        self.countdown_timer = QTimer(self)
+        self.countdown_timer.setInterval(1000)  # Tick every 1 second
+        self.countdown_timer.timeout.connect(self.update_retry_countdown)
+        self.partial_countries = CountryTable()
+
+    @property
+    def started(self) -> bool:
+        """
+        True once start() was called.
+        """
+        return self.flag_worker is not None
+
+    def start(self) -> None:
+        """
+        Start the long-lived flag worker and prefetching, and fetch the
+        country list. Only the first call has an effect.
+        """
+        if self.started:
+            return
+        # Load the statistics and choices of earlier runs
+        self.mirrors = Mirrors()
+        self.history = SelectionHistory()
+        if PREFETCH_WORKERS > 0:
+            self.prefetcher = PrefetchScheduler(self.breakers, mirrors=self.mirrors)
+            self.prefetcher.start()
+
+        # Long-lived worker fetching flags off the GUI thread
+        self.flag_worker = FlagFetchWorker(self.breakers, self.mirrors, self.prefetcher)
+        self.flag_worker.flag_ready.connect(self.flag_ready)
+        self.flag_worker.start()
+
+        self.start_fetch()
+
+    def start_fetch(self) -> None:
+        """
+        Start a thread fetching the country list.
+        """
+        self.partial_countries = CountryTable()
+        self.fetch_thread = CountryFetchThread(self.breakers, self.mirrors)
+        self.fetch_thread.finished.connect(self.on_countries_fetched)
+        self.fetch_thread.batch.connect(self.on_countries_batch)
+        self.fetch_thread.error.connect(self.on_fetch_error)
+        self.fetch_thread.start()
+
+    def on_countries_batch(self, batch: list[Country]) -> None:
+        """
+        Publish the countries received so far while the list is still downloading.
+
+        Args:
+            batch: Newly parsed Country records, unsorted.
+        """
+        # Only the batch is sorted, then merged with the rows shown so far
+        self.partial_countries = self.partial_countries.merge(batch)
+        self.table = self.partial_countries
+        self.loading = True
+        self.countries_changed.emit(self.table, True)
+
+    def on_countries_fetched(self, countries: list[Country]) -> None:
+        """
+        Publish a complete country list and cancel any pending retry.
+
+        Args:
+            countries: Country records, in response order.
+        """
+        self.retry_timer.stop()
+        self.countdown_timer.stop()
+        self.retry_countdown.emit(0)
+        self.fetch_failures = 0
+        self.partial_countries = CountryTable()
+        self.error = None
+
+        # The list may arrive twice (cached, then revalidated) or after
+        # partial batches; widgets keep a selection made in the meantime
+        self.table = CountryTable(countries)
+        self.search_index = build_search_index(self.table)
+        self.loading = False
+        self.countries_changed.emit(self.table, False)
+        self.prefetch_most_chosen()
+
+    def on_fetch_error(self, error_msg: str) -> None:
+        """
+        Handle errors in fetching countries: publish the error and schedule
+        the next attempt.
+
+        Args:
+            error_msg: Error message string.
+        """
+        logging.error(f"Error fetching countries: {error_msg}")
+        METRICS.incr("countries.errors")
+        self.table = CountryTable()
+        self.search_index = None
+        self.error = error_msg
+        self.fetch_failed.emit(error_msg)
+
+        # Back off exponentially, and never retry before the API host's
+        # circuit breaker lets a request through
+        self.fetch_failures += 1
+        delay = max(
+            self.breakers.policy.delay(self.fetch_failures),
+            self.breakers.for_url(API_URL).retry_in(),
+        )
+        self.retry_deadline = time.monotonic() + delay
+        self.retry_timer.start(math.ceil(delay * 1000))
+        self.countdown_timer.start()
+        self.update_retry_countdown()
+
+    def retry_seconds(self) -> int | None:
+        """
+        Return the seconds left until the next attempt, or None if no retry is pending.
+        """
+        if not self.countdown_timer.isActive():
+            return None
+        return max(1, math.ceil(self.retry_deadline - time.monotonic()))
+
+    def update_retry_countdown(self) -> None:
+        """
+        Countdown timer handler announcing the seconds left until the next attempt.
+        """
+        self.retry_countdown.emit(self.retry_seconds() or 1)
+
+    def retry_fetch(self) -> None:
+        """
+        Retry fetching countries once the backoff delay has passed.
+        """
+        self.countdown_timer.stop()
+        self.retry_countdown.emit(0)
+        self.start_fetch()
+
+    def request_flag(
+        self, alpha2_code: str, width: int, height: int, device_pixel_ratio: float, owner: Hashable = None
+    ) -> None:
+        """
+        Queue a flag fetch; the result is delivered through flag_ready.
+        Ignored until start() was called.
+
+        Args:
+            alpha2_code: Alpha2 code of the country.
+            width: Width of the flag in logical pixels.
+            height: Height of the flag in logical pixels.
+            device_pixel_ratio: Device pixel ratio of the screen showing the flag.
+            owner: Requester; only its newest pending request is served.
+        """
+        if self.flag_worker is not None:
+            self.flag_worker.request(alpha2_code, width, height, device_pixel_ratio, owner)
+
+    def prefetch(self, codes: list[str], priority: int, replace: bool = False) -> None:
+        """
+        Queue flags for prefetching, if prefetching is enabled and started.
+
+        Args:
+            codes: Alpha2 codes, most important first.
+            priority: PRIORITY_HIGHLIGHT or PRIORITY_HISTORY.
+            replace: Drop pending prefetches of the same priority first.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.schedule(codes, priority, replace=replace)
+
+    def prefetch_most_chosen(self) -> None:
+        """
+        Queue the flags of the listed countries chosen most often in earlier runs.
+        """
+        if self.history is None:
+            return
+        codes = [
+            code for code in self.history.most_chosen(PREFETCH_HISTORY_COUNT)
+            if self.table.row_of_code(code) is not None
+        ]
+        self.prefetch(codes, PRIORITY_HISTORY)
+
+    def record_choice(self, alpha2_code: str) -> None:
+        """
+        Count a country chosen by the user in the selection history.
+        """
+        if self.history is not None:
+            self.history.record(alpha2_code)
+
+    def stop(self) -> None:
+        """
+        Stop the country fetch, the flag worker and prefetching, and save the
+        mirror statistics and selection history. Safe to call more than once.
+        """
+        self.retry_timer.stop()
+        self.countdown_timer.stop()
+        fetch_thread, self.fetch_thread = self.fetch_thread, None
+        if fetch_thread is not None:
+            # A list arriving now must not be published by a stopped catalog
+            fetch_thread.finished.disconnect(self.on_countries_fetched)
+            fetch_thread.batch.disconnect(self.on_countries_batch)
+            fetch_thread.error.disconnect(self.on_fetch_error)
+        prefetcher, self.prefetcher = self.prefetcher, None
+        if prefetcher is not None:
+            prefetcher.stop()
+        if self.history is not None:
+            self.history.save()
+        if self.flag_worker is not None:
+            self.flag_worker.stop()
+        # Threads still running are waited for before their objects can be
+        # destroyed, which would abort the process
+        threads = dict.fromkeys(t for t in (*self.stalled_threads, fetch_thread, self.flag_worker) if t is not None)
+        self.stalled_threads = [thread for thread in threads if not join_thread(thread)]
+        mirrors, self.mirrors = self.mirrors, None
+        if mirrors is not None:
+            mirrors.close()
+
+
+def join_thread(thread: QThread) -> bool:
+    """
+    Wait for a thread asked to stop, up to WORKER_STOP_TIMEOUT_MS and then,
+    with a warning, up to WORKER_STOP_GRACE_MS more. Returns False, after
+    logging an error, if it is still running.
+    """
+    name = type(thread).__name__
+    if thread.wait(WORKER_STOP_TIMEOUT_MS):
+        return True
+    logging.warning(f"{name} still running {WORKER_STOP_TIMEOUT_MS} ms after stop, waiting for it")
+    if thread.wait(WORKER_STOP_GRACE_MS):
+        return True
+    logging.error(f"{name} did not stop within {WORKER_STOP_TIMEOUT_MS + WORKER_STOP_GRACE_MS} ms")
+    return False
@@ -0,0 +1,574 @@
+"""
+Command-line subcommands that run without starting the Qt application.
+
+Nothing here may import PyQt6, and requests is only imported when a command
+actually goes to the network, so the headless commands start quickly.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+from .cache import load_country_cache
+from .config import (
+    CACHE_DIR,
+    COUNTRIES_CACHE_FILE,
+    FLAG_CACHE_MAX_BYTES,
+    FLAG_MIRRORS,
+    FLAG_PACK_FILE,
+    LOG_FILE,
+    SERVE_HOST,
+    SERVE_PORT,
+    SERVE_REFRESH_SECONDS,
+    SERVE_WORKERS,
+    SNAPSHOT_FILE,
+    WARM_CACHE_WORKERS,
+)
+from .flagpack import FlagPack
+from .search import LookupIndex
+from .snapshot import Snapshot
+from .table import CountryTable
+from .utils import API_FIELDS, api_item
+
+# Distinct input lines whose resolution `resolve` remembers; the memo is
+# cleared when full, so memory stays bounded however long the input is
+RESOLVE_MEMO_SIZE = 65536
+
+# Without a terminal to redraw on, warm-cache reports progress in steps of
+# this many percent
+WARM_CACHE_PROGRESS_STEP = 10
+
+
+def _load_countries() -> Optional[CountryTable]:
+    """
+    Return the country list from the cache, else the bundled snapshot, else
+    the API. Returns None, after printing the error, if none is available.
+    """
+    cached = load_country_cache()
+    if cached is None:
+        snapshot = Snapshot()
+        cached = snapshot.countries()
+        snapshot.close()
+    if cached is not None:
+        return CountryTable(cached.countries)
+
+    import requests
+
+    from .data import fetch_countries
+
+    try:
+        return CountryTable(fetch_countries())
+    except (requests.RequestException, ValueError) as e:
+        print(f"Cannot load the country list: {e}", file=sys.stderr)
+        return None
+
+
+def _discard_stdout() -> None:
+    """
+    Point stdout at devnull after its reader went away (e.g. output piped
+    into head), which is not an error, so flushing it at exit does not fail.
+    """
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def lookup(args: argparse.Namespace) -> int:
+    """
+    Print the code and name of each queried country, with suggestions for
+    names that are not found.
+
+    Args:
+        args: Parsed arguments with the `queries` (names or alpha2 codes).
+
+    Returns:
+        Process exit code: 1 if any query was not found.
+    """
+    countries = _load_countries()
+    if countries is None:
+        return 1
+    index = LookupIndex(countries)
+
+    missing = 0
+    for query in args.queries:
+        row = index.resolve(query)
+        if row is not None:
+            print(f"{countries.code(row)}\t{countries.name(row)}")
+            continue
+        missing += 1
+        suggestions = [countries.name(r) for r in index.suggest(query)]
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        print(f"'{query}' not found.{hint}", file=sys.stderr)
+    return 1 if missing else 0
+
+
+def export(args: argparse.Namespace) -> int:
+    """
+    Write the country list as JSON or CSV, with the API's field names.
+
+    Args:
+        args: Parsed arguments with the `format`, an optional `region` to
+            export only its countries and an optional `output` file.
+
+    Returns:
+        Process exit code.
+    """
+    countries = _load_countries()
+    if countries is None:
+        return 1
+    rows = countries.filter(region=args.region)
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump(
+                [api_item(countries.record(row)) for row in rows],
+                out, ensure_ascii=False, indent=2,
+            )
+            out.write("\n")
+        else:
+            writer = csv.writer(out)
+            writer.writerow(API_FIELDS)
+            writer.writerows(countries.record(row) for row in rows)
+    except BrokenPipeError:
+        _discard_stdout()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def resolve(args: argparse.Namespace) -> int:
+    """
+    Resolve country names or codes read from stdin, one per line.
+
+    For every input line one line "<alpha2>\t<name>" is written to stdout,
+    or a lone tab if the line could not be resolved, so output lines pair
+    up with input lines. Input is streamed, and repeated lines are answered
+    from a bounded memo.
+
+    Args:
+        args: Parsed arguments with the `fuzzy` flag.
+
+    Returns:
+        Process exit code.
+    """
+    countries = _load_countries()
+    if countries is None:
+        return 1
+    index = LookupIndex(countries)
+
+    stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="\n")
+    memo: Dict[str, str] = {}
+    lines = unresolved = 0
+    try:
+        for line in stdin:
+            query = line.rstrip("\r\n")
+            result = memo.get(query)
+            if result is None:
+                row = index.resolve(query)
+                if row is None and args.fuzzy:
+                    suggestions = index.suggest(query, limit=1)
+                    row = suggestions[0] if suggestions else None
+                if row is None:
+                    result = "\t\n"
+                else:
+                    result = f"{countries.code(row)}\t{countries.name(row)}\n"
+                if len(memo) >= RESOLVE_MEMO_SIZE:
+                    memo.clear()
+                memo[query] = result
+            lines += 1
+            if result == "\t\n":
+                unresolved += 1
+            stdout.write(result)
+        stdout.flush()
+    except BrokenPipeError:
+        _discard_stdout()
+        return 0
+
+    if unresolved:
+        print(f"{unresolved} of {lines} lines not resolved", file=sys.stderr)
+    return 0
+
+
+def compact_pack(args: argparse.Namespace) -> int:
+    """
+    Rewrite the flag pack without the space left behind by appends.
+
+    Args:
+        args: Parsed arguments with the pack `path`.
+
+    Returns:
+        Process exit code.
+    """
+    with FlagPack(args.path) as pack:
+        before = pack.file_size()
+        pack.compact()
+        print(f"Compacted {args.path}: {len(pack)} flags, {before} -> {pack.file_size()} bytes")
+    return 0
+
+
+def _format_time(timestamp: int | None) -> str:
+    """
+    Format a Unix timestamp for display, or "-" if there is none.
+    """
+    if not timestamp:
+        return "-"
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+
+def cache_stats(args: argparse.Namespace) -> int:
+    """
+    Print what the shared cache directory holds.
+
+    Args:
+        args: Parsed arguments with the flag pack `path`.
+
+    Returns:
+        Process exit code.
+    """
+    print(f"Cache directory: {CACHE_DIR}")
+
+    cached = load_country_cache()
+    if cached is None:
+        print("Country list:    not cached")
+    else:
+        size = os.path.getsize(COUNTRIES_CACHE_FILE)
+        print(f"Country list:    {len(cached.countries)} countries, {size} bytes, ETag {cached.etag or '-'}")
+
+    if not os.path.exists(args.path):
+        print("Flags:           not cached")
+        return 0
+    with FlagPack(args.path) as pack:
+        stats = pack.stats()
+    print(f"Flags:           {stats.flags} flags in {args.path}")
+    print(f"  size:          {stats.file_size} bytes ({stats.file_size - stats.live_bytes} reclaimable), "
+          f"cap {FLAG_CACHE_MAX_BYTES} bytes")
+    print(f"  last accessed: oldest {_format_time(stats.oldest_access)}, newest {_format_time(stats.newest_access)}")
+    return 0
+
+
+def cache_prune(args: argparse.Namespace) -> int:
+    """
+    Evict least recently used flags down to a size and compact the flag pack.
+
+    Args:
+        args: Parsed arguments with the flag pack `path` and `max_bytes`.
+
+    Returns:
+        Process exit code.
+    """
+    with FlagPack(args.path) as pack:
+        before = pack.file_size()
+        evicted = pack.prune(args.max_bytes)
+        print(f"Pruned {args.path}: evicted {len(evicted)} flags, {before} -> {pack.file_size()} bytes")
+    return 0
+
+
+def build_snapshot(args: argparse.Namespace) -> int:
+    """
+    Download the country list and every flag and write them as the bundled
+    offline snapshot.
+
+    Args:
+        args: Parsed arguments with the archive `output` and the number of
+            parallel flag downloads, `workers`.
+
+    Returns:
+        Process exit code: 1 if the country list could not be downloaded.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    from .data import download_countries, download_flag
+    from .snapshot import write_snapshot
+
+    try:
+        listing = download_countries()
+    except (requests.RequestException, ValueError) as e:
+        print(f"Cannot download the country list: {e}", file=sys.stderr)
+        return 1
+
+    codes = sorted({country.alpha2 for country in listing.countries})
+    flags = {}
+    with requests.Session() as session, ThreadPoolExecutor(args.workers) as pool:
+        def fetch(code: str) -> tuple[str, bytes | None]:
+            try:
+                return code, download_flag(session, code)
+            except requests.RequestException as e:
+                print(f"Flag '{code}' skipped: {e}", file=sys.stderr)
+                return code, None
+
+        for code, svg in pool.map(fetch, codes):
+            if svg is not None:
+                flags[code] = svg
+
+    write_snapshot(args.output, listing, flags)
+    print(f"Wrote {args.output}: {len(listing.countries)} countries, {len(flags)}/{len(codes)} flags")
+    return 0
+
+
+def _looks_like_svg(data: bytes) -> bool:
+    """
+    Return True if data starts like an SVG document rather than, e.g., an
+    HTML error page that was stored with a 200 status.
+    """
+    head = bytes(data[:512]).lstrip().lower()
+    return head.startswith((b"<svg", b"<?xml")) and b"<svg" in bytes(data[:4096]).lower()
+
+
+def warm_cache(args: argparse.Namespace) -> int:
+    """
+    Download the flags of all countries that are missing from the flag pack.
+
+    The country list is revalidated with the API first. Flags are fetched by
+    a bounded pool of workers sharing one keep-alive session, and each one is
+    added to the pack as soon as it arrives, so an interrupted run is resumed
+    by running the command again. Flags bundled in the snapshot are copied
+    instead of downloaded.
+
+    Args:
+        args: Parsed arguments with the flag pack `path`, the number of
+            parallel downloads, `workers`, and `verify` to also check flags
+            already in the pack and download corrupt ones again.
+
+    Returns:
+        Process exit code: 1 if no country list is available or any flag failed.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    from .data import download_flag, fetch_flag, revalidate_countries
+    from .mirrors import Mirrors
+    from .retry import CircuitBreakers, RetryLaterError
+
+    breakers = CircuitBreakers()
+    mirrors = Mirrors()
+    snapshot = Snapshot()
+    cached = load_country_cache()
+    try:
+        fresh = revalidate_countries(cached, breakers=breakers, mirrors=mirrors)
+        countries = fresh if fresh is not None else cached.countries
+    except (requests.RequestException, ValueError, RetryLaterError) as e:
+        if cached is None:
+            cached = snapshot.countries()
+        if cached is None:
+            print(f"Cannot load the country list: {e}", file=sys.stderr)
+            snapshot.close()
+            mirrors.close()
+            return 1
+        print(f"Cannot revalidate the country list, using the cached one: {e}", file=sys.stderr)
+        countries = cached.countries
+
+    pack = FlagPack(args.path, FLAG_CACHE_MAX_BYTES)
+    codes = sorted({country.alpha2.lower() for country in countries if country.alpha2})
+    todo = codes if args.verify else [code for code in codes if code not in pack]
+    counts = dict.fromkeys(("downloaded", "copied", "verified", "repaired", "failed"), 0)
+    counts["cached"] = len(codes) - len(todo)
+    downloaded_bytes = 0
+
+    def warm(code: str) -> tuple[str, int]:
+        existing = code in pack
+        if existing:
+            data = pack.get(code)  # None if it does not match its digest
+            if data is not None and _looks_like_svg(data):
+                return "verified", 0
+            if data is not None:
+                # Intact but not a flag: fetch_flag would return it as is
+                content = mirrors.call(
+                    FLAG_MIRRORS, lambda base_url: download_flag(session, code, breakers, base_url)
+                )
+                pack.add(code, content)
+                return "repaired", len(content)
+        bundled = snapshot.flag(code) is not None
+        data = fetch_flag(session, pack, code, snapshot, breakers, mirrors=mirrors)
+        if existing:
+            return "repaired", 0 if bundled else len(data)
+        return ("copied", 0) if bundled else ("downloaded", len(data))
+
+    interactive = sys.stderr.isatty()
+    next_step = WARM_CACHE_PROGRESS_STEP
+
+    def report(done: int) -> None:
+        nonlocal next_step
+        percent = done * 100 // len(todo)
+        line = (
+            f"Warming {args.path}: {done}/{len(todo)} ({percent}%), "
+            f"{downloaded_bytes / 1024:.0f} KiB downloaded, {counts['failed']} failed"
+        )
+        if interactive:
+            print(f"\r{line}", end="" if done < len(todo) else "\n", file=sys.stderr, flush=True)
+        elif percent >= next_step or done == len(todo):
+            print(line, file=sys.stderr)
+            next_step = percent - percent % WARM_CACHE_PROGRESS_STEP + WARM_CACHE_PROGRESS_STEP
+
+    start = time.perf_counter()
+    session = requests.Session()
+    # One keep-alive connection per worker instead of urllib3's default of 10
+    adapter = HTTPAdapter(pool_connections=len(FLAG_MIRRORS), pool_maxsize=args.workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    pool = ThreadPoolExecutor(args.workers, thread_name_prefix="warm-cache")
+    try:
+        futures = {pool.submit(warm, code): code for code in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                outcome, size = future.result()
+            except (requests.RequestException, RetryLaterError, OSError) as e:
+                outcome, size = "failed", 0
+                if interactive:
+                    print(file=sys.stderr)
+                print(f"Flag '{futures[future]}' failed: {e}", file=sys.stderr)
+            counts[outcome] += 1
+            downloaded_bytes += size
+            report(done)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=True, cancel_futures=True)
+        print(f"\nInterrupted; run warm-cache again to resume. {len(pack)} flags in {args.path}", file=sys.stderr)
+        return 130
+    finally:
+        pool.shutdown(wait=True)
+        stored = len(pack)
+        pack.close()
+        session.close()
+        snapshot.close()
+        mirrors.close()
+
+    summary = ", ".join(f"{count} {outcome}" for outcome, count in counts.items() if count)
+    print(
+        f"Warmed {args.path} in {time.perf_counter() - start:.1f} s: {stored} flags "
+        f"({summary or 'nothing to do'}), {downloaded_bytes} bytes downloaded"
+    )
+    return 1 if counts["failed"] else 0
+
+
+def serve(args: argparse.Namespace) -> int:
+    """
+    Serve the country list and flags over HTTP until interrupted.
+
+    Args:
+        args: Parsed arguments with the `host`, `port`, number of `workers`,
+            the list revalidation interval, `refresh`, and the `log_level`.
+
+    Returns:
+        Process exit code: 1 if no country list is available or the address
+        cannot be bound.
+    """
+    from .log import setup_logging, shutdown_logging
+    from .server import create_server
+
+    # Log like the app, to the rotating log file, written off the request threads
+    setup_logging(args.log_level)
+    try:
+        try:
+            server = create_server(args.host, args.port, args.workers, args.refresh or None)
+        except OSError as e:
+            print(f"Cannot start the server: {e}", file=sys.stderr)
+            return 1
+        if server is None:
+            print(f"Cannot start the server: no country list available, see {LOG_FILE}", file=sys.stderr)
+            return 1
+
+        print(f"Serving {len(server.service.dataset.listing.countries)} countries on {server.url}", file=sys.stderr)
+        print(f"  COUNTRY_PICKER_API_URL={server.url}/countries", file=sys.stderr)
+        print(f"  COUNTRY_PICKER_FLAG_BASE_URL={server.url}/flags", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+    finally:
+        shutdown_logging()
+
+
+def _positive_int(value: str) -> int:
+    """
+    argparse type for counts that must be at least 1, such as --workers.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def add_commands(subparsers: argparse._SubParsersAction) -> None:
+    """
+    Register the headless subcommands on the main argument parser.
+
+    Args:
+        subparsers: Subparser collection of the main parser.
+    """
+    parser = subparsers.add_parser(
+        "compact-pack", help="Reclaim unused space in the flag pack"
+    )
+    parser.add_argument("--path", default=FLAG_PACK_FILE, help="Flag pack to compact")
+    parser.set_defaults(handler=compact_pack)
+
+    parser = subparsers.add_parser("lookup", help="Print the code and name of countries")
+    parser.add_argument("queries", nargs="+", metavar="query", help="Country name or alpha2 code")
+    parser.set_defaults(handler=lookup)
+
+    parser = subparsers.add_parser("export", help="Write the country list as JSON or CSV")
+    parser.add_argument("--format", choices=("json", "csv"), default="json", help="Output format")
+    parser.add_argument("--region", default=None, help="Only export countries of this region, e.g. Europe")
+    parser.add_argument("--output", default=None, help="File to write instead of stdout")
+    parser.set_defaults(handler=export)
+
+    parser = subparsers.add_parser(
+        "resolve", help="Resolve names or codes from stdin to '<code>\\t<name>' lines on stdout"
+    )
+    parser.add_argument(
+        "--fuzzy", action="store_true", help="Resolve misspelled names to the closest match"
+    )
+    parser.set_defaults(handler=resolve)
+
+    parser = subparsers.add_parser("cache", help="Inspect or prune the shared cache")
+    actions = parser.add_subparsers(dest="action", metavar="action", required=True)
+    stats = actions.add_parser("stats", help="Show cache contents and sizes")
+    stats.add_argument("--path", default=FLAG_PACK_FILE, help="Flag pack to inspect")
+    stats.set_defaults(handler=cache_stats)
+    prune = actions.add_parser("prune", help="Evict least recently used flags and compact the pack")
+    prune.add_argument("--path", default=FLAG_PACK_FILE, help="Flag pack to prune")
+    prune.add_argument(
+        "--max-bytes", type=int, default=FLAG_CACHE_MAX_BYTES, help="Size to prune the pack to, in bytes"
+    )
+    prune.set_defaults(handler=cache_prune)
+
+    parser = subparsers.add_parser(
+        "build-snapshot", help="Download the country list and all flags into the bundled snapshot"
+    )
+    parser.add_argument("--output", default=SNAPSHOT_FILE, help="Snapshot archive to write")
+    parser.add_argument("--workers", type=_positive_int, default=8, help="Parallel flag downloads")
+    parser.set_defaults(handler=build_snapshot)
+
+    parser = subparsers.add_parser(
+        "warm-cache", help="Download the flags of all countries that are missing from the flag pack"
+    )
+    parser.add_argument("--path", default=FLAG_PACK_FILE, help="Flag pack to fill")
+    parser.add_argument("--workers", type=_positive_int, default=WARM_CACHE_WORKERS, help="Parallel flag downloads")
+    parser.add_argument(
+        "--verify", action="store_true", help="Also check flags already in the pack and replace corrupt ones"
+    )
+    parser.set_defaults(handler=warm_cache)
+
+    parser = subparsers.add_parser("serve", help="Serve the country list and flags over HTTP")
+    parser.add_argument("--host", default=SERVE_HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--workers", type=_positive_int, default=SERVE_WORKERS, help="Connections handled in parallel")
+    parser.add_argument(
+        "--refresh", type=float, default=SERVE_REFRESH_SECONDS,
+        help="Seconds between revalidations of the country list (0 disables them)",
+    )
+    parser.set_defaults(handler=serve)
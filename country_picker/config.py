@@ -1,21 +1,132 @@
 """
 Configuration constants for the Country Picker application.
 Adjust these values to customize behavior or API endpoints.
+The endpoints can also be overridden with environment variables,
+e.g. to point the app at a local mirror or a test server.
 """
 
+import os
+import sys
+
 # URL to fetch country data (returns JSON)
-API_URL = "https://restcountries.com/v2/all?fields=name,alpha2Code"
+API_URL = os.environ.get(
+    "COUNTRY_PICKER_API_URL",
+    "https://restcountries.com/v2/all?fields=name,alpha2Code,alpha3Code,region,subregion,population,capital",
+)
+
+# Download chunk size, and number of countries per progressive UI update,
+# when the country list is parsed while it streams in
+STREAM_CHUNK_BYTES = 16 * 1024
+COUNTRY_STREAM_BATCH_SIZE = 500
 
 # Base URL to download SVG flags
-FLAG_BASE_URL = "https://flagcdn.com"
-# FLAG_BASE_URL = "https://github.com/lipis/flag-icon-css/raw/main/flags/4x3"
+FLAG_BASE_URL = os.environ.get("COUNTRY_PICKER_FLAG_BASE_URL", "https://flagcdn.com")
+
+
+def _mirrors(env: str, primary: str, defaults: tuple) -> tuple:
+    """
+    Return the primary URL followed by the whitespace-separated mirrors in
+    the environment variable env (URLs may contain commas), or by defaults
+    if it is not set.
+    """
+    extra = os.environ.get(env)
+    urls = [primary, *(extra.split() if extra is not None else defaults)]
+    return tuple(dict.fromkeys(url.rstrip("/") for url in urls))
+
+
+# Mirrors serving the same resources; requests go to the fastest healthy one
+# and are hedged with the next (see mirrors.py). The lipis flag-icons set
+# uses the same <code>.svg names as flagcdn. It is only added when the flag
+# URL was not overridden, so pointing the app at a test server stays local
+API_MIRRORS = _mirrors("COUNTRY_PICKER_API_MIRRORS", API_URL, ())
+FLAG_MIRRORS = _mirrors(
+    "COUNTRY_PICKER_FLAG_MIRRORS",
+    FLAG_BASE_URL,
+    () if "COUNTRY_PICKER_FLAG_BASE_URL" in os.environ
+    else ("https://cdn.jsdelivr.net/gh/lipis/flag-icons@main/flags/4x3",),
+)
+
+
+def _user_cache_root() -> str:
+    """
+    Return the platform's per-user cache directory.
+    """
+    if os.name == "nt":
+        return os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches")
+    return os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+
+
+# Per-user directory holding the on-disk caches (country list with its HTTP
+# validators, flag pack), shared by all running instances
+CACHE_DIR = os.environ.get("COUNTRY_PICKER_CACHE_DIR") or os.path.join(_user_cache_root(), "country-picker")
+COUNTRIES_CACHE_FILE = os.path.join(CACHE_DIR, "countries.json")
+
+# Downloaded flags are stored packed into a single file, evicting the least
+# recently used ones when it grows past the size cap (bytes)
+FLAG_PACK_FILE = os.path.join(CACHE_DIR, "flags.pack")
+FLAG_CACHE_MAX_BYTES = int(os.environ.get("COUNTRY_PICKER_FLAG_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Per-mirror latency and error rate averages, kept across runs
+MIRROR_STATS_FILE = os.path.join(CACHE_DIR, "mirrors.json")
+
+# Weight of a new request in the per-mirror moving averages
+MIRROR_EWMA_ALPHA = 0.2
+
+# A mirror failing at least this fraction of requests is only used after
+# the healthy ones
+MIRROR_UNHEALTHY_ERROR_RATE = 0.5
 
-# Folder where downloaded flag files will be stored
-FLAG_FOLDER = "flags"
+# Bounds of the delay after which a request is also sent to the next mirror,
+# and the delay used for mirrors without measurements (ms)
+MIRROR_HEDGE_MIN_MS = 50
+MIRROR_HEDGE_MAX_MS = 2000
+MIRROR_HEDGE_DEFAULT_MS = 500
 
-# Logging output directory and file
-LOGS_DIR = "logs"
-LOG_FILE = f"{LOGS_DIR}/app.log"
+# Requests in flight at once across all hedged calls, and how often the
+# mirror statistics are saved (seconds)
+MIRROR_HEDGE_WORKERS = 4
+MIRROR_SAVE_INTERVAL_SECONDS = 30
+
+# Flag prefetching (see prefetch.py): how often each country was chosen, kept
+# across runs; rows prefetched above and below the highlighted one while the
+# popup is open; most chosen countries prefetched once the list is shown;
+# concurrent prefetch downloads (0 disables prefetching) and their bandwidth
+# budget (bytes per second)
+PREFETCH_HISTORY_FILE = os.path.join(CACHE_DIR, "history.json")
+PREFETCH_NEIGHBORS = 3
+PREFETCH_HISTORY_COUNT = 10
+PREFETCH_WORKERS = int(os.environ.get("COUNTRY_PICKER_PREFETCH_WORKERS", 2))
+PREFETCH_BYTES_PER_SECOND = 256 * 1024
+
+# Country list and flags bundled with the package, shown before (or without)
+# network access; regenerate with `python -m country_picker build-snapshot`
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "snapshot.zip")
+
+# Memory budget for rendered flag pixmaps kept in memory (bytes)
+PIXMAP_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Time worker threads get to finish when the app quits before a warning is
+# logged, and the longer time waited for them after that (a download in
+# progress only ends at its 10 second request timeout)
+WORKER_STOP_TIMEOUT_MS = 2000
+WORKER_STOP_GRACE_MS = 15000
+
+# Logging output directory, relative to the working directory unless
+# COUNTRY_PICKER_LOGS_DIR points elsewhere, and file
+LOGS_DIR = os.environ.get("COUNTRY_PICKER_LOGS_DIR") or "logs"
+LOG_FILE = os.path.join(LOGS_DIR, "app.log")
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(threadName)s: %(message)s"
+
+# Lowest level logged (also --log-level)
+LOG_LEVEL = os.environ.get("COUNTRY_PICKER_LOG_LEVEL", "INFO").upper()
+
+# The log file is rotated when it grows past LOG_MAX_BYTES or is older than
+# LOG_MAX_AGE_SECONDS; LOG_BACKUP_COUNT compressed backups are kept
+LOG_MAX_BYTES = 1024 * 1024
+LOG_MAX_AGE_SECONDS = 24 * 60 * 60
+LOG_BACKUP_COUNT = 5
 
 # UI label texts
 INITIAL_LABEL_PLACEHOLDER = "Selected: <insert country name here>"
@@ -23,11 +134,81 @@ COMBOBOX_LOADING_TEXT = "Loading countries..."
 COMBOBOX_SELECT_TEXT = "Select a country"
 COMBOBOX_NO_COUNTRIES_TEXT = "No countries available"
 COMBOBOX_ERROR_TEXT = "Error loading countries"
+REGION_FILTER_ALL_TEXT = "All regions"
+
+# Width of the combo box, in characters, independent of the longest country name
+COMBOBOX_MIN_CONTENTS_LENGTH = 30
+
+# Alternative names matched by the search box, keyed by lowercase alpha2 code
+COUNTRY_ALIASES = {
+    "bo": ("Bolivia",),
+    "ci": ("Ivory Coast",),
+    "cz": ("Czechia",),
+    "gb": ("UK", "Great Britain", "England", "Scotland", "Wales"),
+    "ir": ("Iran",),
+    "kp": ("North Korea",),
+    "kr": ("South Korea",),
+    "la": ("Laos",),
+    "md": ("Moldova",),
+    "mk": ("Macedonia",),
+    "nl": ("Holland",),
+    "ps": ("Palestine",),
+    "ru": ("Russia",),
+    "sy": ("Syria",),
+    "tw": ("Taiwan",),
+    "tz": ("Tanzania",),
+    "us": ("USA", "America"),
+    "va": ("Vatican",),
+    "ve": ("Venezuela",),
+    "vn": ("Vietnam",),
+}
+
+# Backoff for failed country list and flag downloads: after the n-th
+# consecutive failure wait RETRY_BASE_SECONDS * 2 ** (n - 1), at most
+# RETRY_MAX_SECONDS, minus a random fraction of up to RETRY_JITTER of it
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+RETRY_JITTER = 0.5
+
+# Consecutive network failures after which requests to a host are suspended
+CIRCUIT_BREAKER_FAILURES = 3
+
+# Flags that returned 404 or timed out are not requested again for this long
+FLAG_NEGATIVE_TTL_SECONDS = 300
+
+# Metrics (see metrics.py): JSON file written at exit and on SIGUSR1, whether
+# every timing is also logged as a JSON line, and the number of recent
+# durations per timer kept for percentiles
+METRICS_FILE = os.environ.get("COUNTRY_PICKER_METRICS_FILE") or None
+METRICS_LOG = os.environ.get("COUNTRY_PICKER_METRICS_LOG", "") not in ("", "0")
+METRICS_SAMPLES = 1024
+
+# Event loop watchdog (see watchdog.py): heartbeat interval, the lag after
+# which the loop counts as stalled and the main thread's stack is captured
+# (also --stall-ms, 0 disables the watchdog), and the upper bounds of the
+# stall duration histogram buckets, all in milliseconds
+WATCHDOG_INTERVAL_MS = 100
+WATCHDOG_STALL_MS = int(os.environ.get("COUNTRY_PICKER_WATCHDOG_STALL_MS", 250))
+WATCHDOG_STALL_BUCKETS_MS = (500, 1000, 2500, 5000)
+
+# Local lookup and flag service (`python -m country_picker serve`): listen
+# address, connections handled in parallel, and seconds between revalidations
+# of the country list against API_URL
+SERVE_HOST = os.environ.get("COUNTRY_PICKER_SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.environ.get("COUNTRY_PICKER_SERVE_PORT", 8765))
+SERVE_WORKERS = 16
+SERVE_REFRESH_SECONDS = 3600
+
+# Parallel downloads, and connections kept alive to the flag host, of the
+# `warm-cache` command (also --workers)
+WARM_CACHE_WORKERS = int(os.environ.get("COUNTRY_PICKER_WARM_CACHE_WORKERS", 16))
 
-# Number of seconds to wait before retrying failed country fetch
-RETRY_INTERVAL_SECONDS = 5
+# Workers, logging and the country fetch start once the window has painted;
+# this is the latest they start if no paint event arrives (e.g. minimized)
+STARTUP_DEFER_MAX_MS = 200
 
 # MessageBox text when a preselected country isn't found
 MESSAGE_BOX_PRESELECT_NOT_FOUND = (
     "The country '{}' was not found in the loaded list."
 )
+MESSAGE_BOX_PRESELECT_SUGGESTIONS = "Did you mean one of these?"
@@ -1,20 +1,338 @@
-from typing import List, Tuple
-import requests
-from .utils import parse_countries_json
-from .config import API_URL
+import logging
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from .utils import Country, iter_countries_json
+from .cache import CachedCountries, save_country_cache
+from .flagpack import FlagPack
+from .metrics import METRICS
+from .retry import CircuitBreakers, NegativeCache, RetryLaterError
+from .snapshot import Snapshot
+from .config import API_MIRRORS, API_URL, COUNTRY_STREAM_BATCH_SIZE, FLAG_BASE_URL, FLAG_MIRRORS, STREAM_CHUNK_BYTES
 
+if TYPE_CHECKING:
+    import requests
 
-def fetch_countries() -> List[Tuple[str, str]]:
+    from .mirrors import Mirrors
+
+
+def fetch_countries() -> List[Country]:
     """
     Fetch the list of countries from the API_URL.
-    Parses and returns a list of (country_name, alpha2_code) tuples.
+    Parses and returns a list of Country records, in response order.
 
     Raises:
         requests.RequestException: For network-related errors.
         ValueError: If response JSON is invalid or cannot be parsed.
     """
-    response = requests.get(API_URL, timeout=10)
-    response.raise_for_status()  # Raise HTTPError for bad responses
+    # Without validators the server never answers 304, so a list is always returned
+    return revalidate_countries(None) or []
+
+
+def revalidate_countries(
+    cached: Optional[CachedCountries],
+    on_batch: Optional[Callable[[List[Country]], None]] = None,
+    breakers: Optional[CircuitBreakers] = None,
+    mirrors: Optional["Mirrors"] = None,
+) -> Optional[List[Country]]:
+    """
+    Conditionally re-fetch the country list and refresh the on-disk cache.
+
+    Args:
+        cached: Previously cached list and validators, or None for a cold fetch.
+        on_batch: Optional callback receiving records in batches of
+            COUNTRY_STREAM_BATCH_SIZE as they are parsed.
+        breakers: Circuit breakers consulted and updated for the API hosts.
+        mirrors: Mirror statistics used to pick and hedge API_MIRRORS.
+
+    Returns:
+        The freshly parsed records, in response order, or None if the server
+        reported 304 Not Modified.
+
+    Raises:
+        requests.RequestException: For network-related errors.
+        ValueError: If response JSON is invalid or cannot be parsed.
+        RetryLaterError: If the API host's circuit is open.
+    """
+    listing = download_countries(cached, on_batch, breakers, mirrors)
+    if listing is None:
+        return None
+
+    try:
+        save_country_cache(*listing)
+    except OSError as e:
+        # A read-only cache must not prevent the list from being shown
+        logging.warning(f"Could not write country cache: {e}")
+
+    return listing.countries
+
+
+def download_countries(
+    cached: Optional[CachedCountries] = None,
+    on_batch: Optional[Callable[[List[Country]], None]] = None,
+    breakers: Optional[CircuitBreakers] = None,
+    mirrors: Optional["Mirrors"] = None,
+) -> Optional[CachedCountries]:
+    """
+    Download the country list, conditionally if validators are known.
+
+    Sends the cached ETag / Last-Modified as If-None-Match / If-Modified-Since.
+    The payload is only downloaded and parsed when the server answers 200.
+
+    The response body is parsed incrementally while it downloads, so records
+    can be handed to on_batch (in response order) before the last byte arrives.
+
+    With mirrors, the request is raced across API_MIRRORS up to the response
+    headers; the body is then read from the mirror that answered first.
+
+    Args:
+        cached: Previously cached list and validators, or None for a cold fetch.
+        on_batch: Optional callback receiving records in batches of
+            COUNTRY_STREAM_BATCH_SIZE as they are parsed.
+        breakers: Circuit breakers consulted and updated for the API hosts.
+        mirrors: Mirror statistics used to pick and hedge API_MIRRORS, or
+            None to only use API_URL.
+
+    Returns:
+        The records in response order, with the validators of the response,
+        or None if the server reported 304 Not Modified.
+
+    Raises:
+        requests.RequestException: For network-related errors.
+        ValueError: If response JSON is invalid or cannot be parsed.
+        RetryLaterError: If the API host's circuit is open.
+    """
+    # Imported here, on the worker thread, to keep it off the startup path
+    import requests
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    def open_response(url: str) -> Tuple[str, "requests.Response"]:
+        with _circuit(breakers, url):
+            response = requests.get(url, headers=headers, timeout=10, stream=True)
+            if response.status_code != 304 or cached is None:
+                try:
+                    response.raise_for_status()  # Raise HTTPError for bad responses
+                except requests.HTTPError:
+                    response.close()
+                    raise
+        return url, response
+
+    with METRICS.span("countries.fetch", conditional=bool(headers)) as span:
+        if mirrors is None:
+            url, response = open_response(API_URL)
+        else:
+            url, response = mirrors.call(
+                API_MIRRORS, open_response, _is_host_failure, lambda result: result[1].close()
+            )
+        span["mirror"] = url
+
+        with response:
+            # Time from sending the request to parsed headers, including connection setup
+            METRICS.observe("countries.ttfb", response.elapsed.total_seconds() * 1000)
+            span["status"] = response.status_code
+            if response.status_code == 304 and cached is not None:
+                METRICS.incr("countries.not_modified")
+                return None
+
+            countries: List[Country] = []
+            batch_start = 0
+            body = _TimedChunks(response.iter_content(STREAM_CHUNK_BYTES))
+            start = time.perf_counter()
+            try:
+                for record in iter_countries_json(body):
+                    countries.append(record)
+                    if on_batch is not None and len(countries) - batch_start >= COUNTRY_STREAM_BATCH_SIZE:
+                        on_batch(countries[batch_start:])
+                        batch_start = len(countries)
+            except Exception as e:
+                # The connection broke after the headers arrived
+                if breakers is not None and _is_host_failure(e):
+                    breakers.for_url(url).record_failure()
+                raise
+            if on_batch is not None and batch_start < len(countries):
+                on_batch(countries[batch_start:])
+
+            # Parsing is interleaved with the download: split the time between them
+            METRICS.observe("countries.body", body.wait_ms, bytes=body.size)
+            METRICS.observe(
+                "countries.parse", (time.perf_counter() - start) * 1000 - body.wait_ms, count=len(countries)
+            )
+            METRICS.incr("countries.bytes", body.size)
+            span["count"] = len(countries)
+
+    # Left in response order: CountryTable sorts the list once, when it is shown
+    return CachedCountries(countries, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+def fetch_flag(
+    session: "requests.Session",
+    pack: FlagPack,
+    alpha2_code: str,
+    snapshot: Optional[Snapshot] = None,
+    breakers: Optional[CircuitBreakers] = None,
+    negative: Optional[NegativeCache] = None,
+    mirrors: Optional["Mirrors"] = None,
+) -> memoryview:
+    """
+    Return a country's SVG flag from the flag pack. On a miss the flag is
+    taken from the bundled snapshot, or else downloaded, and added to the pack.
+
+    Args:
+        session: Session used for the download, so connections are reused.
+        pack: Flag pack used as the on-disk cache.
+        alpha2_code: Lowercase alpha2 code of the country.
+        snapshot: Bundled snapshot to look in before downloading.
+        breakers: Circuit breakers consulted and updated for the flag host.
+        negative: Codes whose download recently returned 404 or timed out;
+            they fail immediately, and new such failures are added.
+        mirrors: Mirror statistics used to pick and hedge FLAG_MIRRORS, or
+            None to only use FLAG_BASE_URL.
+
+    Returns:
+        The SVG document as a zero-copy view into the pack.
+
+    Raises:
+        requests.RequestException: For network-related errors.
+        RetryLaterError: If the flag failed recently or the host's circuit is open.
+        OSError: If the flag cannot be written to the pack.
+    """
+    data = pack.get(alpha2_code)
+    if data is not None:
+        METRICS.incr("flag.pack_hit")
+        return data
+
+    # Download flag only if not already cached or bundled
+    content = snapshot.flag(alpha2_code) if snapshot is not None else None
+    if content is not None:
+        METRICS.incr("flag.snapshot_hit")
+    else:
+        retry_in = negative.retry_in(alpha2_code) if negative is not None else 0.0
+        if retry_in > 0:
+            METRICS.incr("flag.negative_hit")
+            raise RetryLaterError(f"Flag '{alpha2_code}' failed recently", retry_in)
+        try:
+            if mirrors is None:
+                content = download_flag(session, alpha2_code, breakers)
+            else:
+                content = mirrors.call(
+                    FLAG_MIRRORS,
+                    lambda base_url: download_flag(session, alpha2_code, breakers, base_url),
+                    _is_host_failure,
+                )
+        except Exception as e:
+            if negative is not None and _is_missing_or_timeout(e):
+                negative.add(alpha2_code)
+            raise
+    with METRICS.span("flag.pack_add", code=alpha2_code):
+        pack.add(alpha2_code, content)
+    return pack.get(alpha2_code)
+
+
+def download_flag(
+    session: "requests.Session",
+    alpha2_code: str,
+    breakers: Optional[CircuitBreakers] = None,
+    base_url: str = FLAG_BASE_URL,
+) -> bytes:
+    """
+    Download a country's SVG flag from FLAG_BASE_URL or a mirror of it.
+
+    Args:
+        session: Session used for the download, so connections are reused.
+        alpha2_code: Lowercase alpha2 code of the country.
+        breakers: Circuit breakers consulted and updated for the flag host.
+        base_url: Flag server to download from.
+
+    Returns:
+        The SVG document.
+
+    Raises:
+        requests.RequestException: For network-related errors.
+        RetryLaterError: If the flag host's circuit is open.
+    """
+    url = f"{base_url}/{alpha2_code}.svg"
+    with METRICS.span("flag.download", code=alpha2_code) as span, _circuit(breakers, url):
+        response = session.get(url, timeout=10)
+        METRICS.observe("flag.ttfb", response.elapsed.total_seconds() * 1000, code=alpha2_code)
+        span["status"] = response.status_code
+        response.raise_for_status()
+        span["bytes"] = len(response.content)
+    METRICS.incr("flag.download_bytes", len(response.content))
+    return response.content
+
+
+class _TimedChunks:
+    """
+    Iterates over chunks of a response body, adding up the time spent
+    waiting for them and their size.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self.wait_ms = 0.0
+        self.size = 0
+
+    def __iter__(self) -> "_TimedChunks":
+        return self
+
+    def __next__(self) -> bytes:
+        start = time.perf_counter()
+        try:
+            chunk = next(self._chunks)
+        finally:
+            self.wait_ms += (time.perf_counter() - start) * 1000
+        self.size += len(chunk)
+        return chunk
+
+
+@contextmanager
+def _circuit(breakers: Optional[CircuitBreakers], url: str) -> Iterator[None]:
+    """
+    Guard a request to url with the circuit breaker of its host: refuse it
+    while the circuit is open, and record its outcome. Only failures of the
+    host itself count; e.g. a 404 means the host is working.
+    """
+    breaker = breakers.for_url(url) if breakers is not None else None
+    if breaker is not None and not breaker.allow():
+        raise RetryLaterError(f"Requests to {urlsplit(url).netloc} are suspended", breaker.retry_in())
+    try:
+        yield
+    except Exception as e:
+        if breaker is not None and _is_host_failure(e):
+            breaker.record_failure()
+        raise
+    if breaker is not None:
+        breaker.record_success()
+
+
+def _is_host_failure(error: Exception) -> bool:
+    """
+    Return True if error means the server could not be reached or is failing.
+    """
+    import requests
+
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return False
+
+
+def _is_missing_or_timeout(error: Exception) -> bool:
+    """
+    Return True if error is a timeout or a 404 / 410 answer.
+    """
+    import requests
 
-    json_data = response.json()
-    return parse_countries_json(json_data)
+    if isinstance(error, requests.Timeout):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in (404, 410)
+    return False
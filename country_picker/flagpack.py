@@ -0,0 +1,431 @@
+"""
+Single-file, memory-mapped store for flag SVGs, shared between processes.
+
+Layout (little-endian):
+
+    header   magic, format version, entry count, index offset
+    blobs    SVG documents, back to back
+    index    one fixed-size record per flag: code, offset, length, digest,
+             last access time
+
+New flags are appended after the current index, followed by a new index;
+rewriting the header is the commit point, so an interrupted append leaves the
+previous state intact. Superseded indexes and replaced blobs become dead
+space, which compact() reclaims; add() compacts by itself once the dead space
+outgrows COMPACT_DEAD_FRACTION of the live data.
+
+Writers hold an exclusive lock on the pack file (see locking.py) and re-read
+the index before appending, so several processes can share one pack. Readers
+notice appends and compactions by other processes and remap the file. Every
+blob is checked against its digest before it is first returned.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from .locking import locked_file
+
+PACK_MAGIC = b"CPFLAGS\0"
+PACK_VERSION = 2
+
+_HEADER = struct.Struct("<8sIIQ")      # magic, version, entry count, index offset
+_HEADER_SIZE = 32                      # header is padded to leave room for new fields
+_ENTRY = struct.Struct("<8sQI16sQ")    # code, blob offset, blob length, blake2b digest, access time
+_ATIME = struct.Struct("<Q")
+_ATIME_OFFSET = _ENTRY.size - _ATIME.size
+
+# Access times are only written back when older than this, in seconds
+ATIME_RESOLUTION = 3600
+
+# When the pack outgrows its size cap, least recently used flags are evicted
+# until it is down to this fraction of the cap
+PRUNE_TARGET_FRACTION = 0.75
+
+# add() compacts the pack once its dead space exceeds this fraction of the
+# live size, which keeps the cost of rewriting amortized over the appends
+COMPACT_DEAD_FRACTION = 1.0
+
+
+class PackEntry(NamedTuple):
+    """
+    Location, digest and last access time (Unix seconds) of one flag inside the pack.
+    """
+    offset: int
+    length: int
+    digest: bytes
+    atime: int = 0
+
+
+class PackStats(NamedTuple):
+    """
+    Summary of a pack's contents, as reported by `cache stats`.
+    """
+    flags: int
+    live_bytes: int
+    file_size: int
+    oldest_access: Optional[int]
+    newest_access: Optional[int]
+
+
+def flag_digest(data: bytes) -> bytes:
+    """
+    Return the 16-byte content digest stored in the index for data.
+    """
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class FlagPack:
+    """
+    Flag SVGs stored in one memory-mapped file, indexed by alpha2 code.
+
+    Reads return zero-copy views into the mapping. All methods are thread-safe
+    and the file may be shared by several processes. With max_bytes set, the
+    least recently used flags are evicted when the file grows past it.
+
+    close() releases the mapping; packs are also context managers.
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None) -> None:
+        """
+        Open the pack at path, creating an empty one if it is missing or unreadable.
+
+        Args:
+            path (str): Location of the pack file.
+            max_bytes (int | None): Size cap of the pack file, or None for no cap.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Dict[str, PackEntry] = {}
+        self._index_offset = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._mapped: Optional[Tuple[int, int]] = None  # (inode, size) of the mapped file
+        self._verified: set[str] = set()
+        self._closed = False
+        with self._lock, locked_file(self.path) as f:
+            if not self._load():
+                self._write_empty(f)
+                self._load()
+
+    def __enter__(self) -> "FlagPack":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release the mapping and forget the index. Afterwards the pack reads
+        as empty and writing to it raises ValueError. Views returned by get()
+        stay valid; the mapping is unmapped once the last one is released.
+        Safe to call more than once.
+        """
+        with self._lock:
+            self._closed = True
+            mm, self._mm = self._mm, None
+            self._index = {}
+            self._verified = set()
+            self._mapped = None
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                # Still exported to views from get(); unmapped when they are released
+                pass
+
+    def _check_open(self) -> None:
+        """
+        Raise ValueError if the pack was closed.
+        """
+        if self._closed:
+            raise ValueError(f"Flag pack {self.path} is closed")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def codes(self) -> List[str]:
+        """
+        Return the codes of all flags in the pack.
+        """
+        return list(self._index)
+
+    def get(self, code: str) -> Optional[memoryview]:
+        """
+        Return the SVG stored for code as a zero-copy view into the mapping.
+
+        Flags added by other processes are picked up. A blob that does not
+        match its digest is reported as missing, so it gets downloaded again.
+
+        Args:
+            code (str): Lowercase alpha2 code.
+
+        Returns:
+            memoryview | None: The SVG bytes, or None if the flag is not in the pack.
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            if self._changed_on_disk():
+                with locked_file(self.path, shared=True):
+                    self._load()
+            entry = self._index.get(code)
+            if entry is None or self._mm is None:
+                return None
+            view = memoryview(self._mm)[entry.offset:entry.offset + entry.length]
+            if code not in self._verified:
+                if flag_digest(view) != entry.digest:
+                    logging.warning(f"Flag '{code}' in {self.path} is corrupt, ignoring it")
+                    return None
+                self._verified.add(code)
+            now = int(time.time())
+            if now - entry.atime >= ATIME_RESOLUTION:
+                self._touch(code, now)
+            return view
+
+    def add(self, code: str, data: bytes) -> None:
+        """
+        Append a flag to the pack, replacing any previous flag with the same
+        code. Nothing is written if another process already stored the same
+        content.
+
+        Args:
+            code (str): Lowercase alpha2 code (at most 8 ASCII characters).
+            data (bytes): SVG document.
+        """
+        digest = flag_digest(data)
+        with self._lock, locked_file(self.path) as f:
+            self._check_open()
+            if not self._load():
+                self._write_empty(f)
+                self._load()
+            current = self._index.get(code)
+            if current is not None and current.digest == digest and self._mm is not None:
+                stored = self._mm[current.offset:current.offset + current.length]
+                if flag_digest(stored) == digest:
+                    return
+
+            index = dict(self._index)
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(data)
+            index[code] = PackEntry(offset, len(data), digest, int(time.time()))
+            index_offset = f.tell()
+            f.write(self._pack_index(index))
+            f.flush()
+            os.fsync(f.fileno())
+
+            f.seek(0)
+            f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index), index_offset))
+            f.flush()
+            self._load()
+
+            # Every append leaves the previous index behind (_ENTRY.size bytes
+            # per flag), so filling an empty pack one flag at a time writes
+            # quadratic dead space unless it is compacted along the way
+            file_size = self.file_size()
+            live_bytes = self.live_bytes()
+            if self.max_bytes is not None and file_size > self.max_bytes:
+                self._rewrite(int(self.max_bytes * PRUNE_TARGET_FRACTION))
+            elif file_size - live_bytes > live_bytes * COMPACT_DEAD_FRACTION:
+                self._rewrite(None)
+
+    def live_bytes(self) -> int:
+        """
+        Return the size the pack would have after compaction.
+        """
+        return self._live_bytes(self._index)
+
+    def file_size(self) -> int:
+        """
+        Return the current size of the pack file.
+        """
+        return os.path.getsize(self.path)
+
+    def stats(self) -> PackStats:
+        """
+        Return a summary of the pack as currently stored on disk.
+        """
+        with self._lock:
+            self._check_open()
+            with locked_file(self.path, shared=True):
+                self._load()
+            atimes = [e.atime for e in self._index.values()]
+            return PackStats(
+                len(self._index),
+                self.live_bytes(),
+                self.file_size(),
+                min(atimes, default=None),
+                max(atimes, default=None),
+            )
+
+    def compact(self) -> None:
+        """
+        Rewrite the pack without dead space.
+
+        The new pack is written next to the old one and renamed over it.
+        """
+        self.prune(None)
+
+    def prune(self, max_bytes: Optional[int]) -> List[str]:
+        """
+        Evict least recently used flags until the pack holds at most
+        max_bytes, then rewrite it without dead space.
+
+        Args:
+            max_bytes (int | None): Size to prune to, or None to only compact.
+
+        Returns:
+            List[str]: Codes of the evicted flags.
+        """
+        with self._lock, locked_file(self.path):
+            self._check_open()
+            self._load()
+            return self._rewrite(max_bytes)
+
+    def _rewrite(self, max_bytes: Optional[int]) -> List[str]:
+        """
+        Write a compacted copy of the pack, without the least recently used
+        flags beyond max_bytes, and rename it over the pack. Must be called
+        with the lock and the file lock held, after _load().
+        """
+        keep = dict(self._index)
+        evicted: List[str] = []
+        if max_bytes is not None:
+            size = self._live_bytes(keep)
+            for code, entry in sorted(self._index.items(), key=lambda item: item[1].atime):
+                if size <= max_bytes:
+                    break
+                del keep[code]
+                evicted.append(code)
+                size -= entry.length + _ENTRY.size
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        index: Dict[str, PackEntry] = {}
+        with open(tmp_path, "wb") as f:
+            f.write(bytes(_HEADER_SIZE))
+            for code, entry in keep.items():
+                index[code] = entry._replace(offset=f.tell())
+                f.write(self._mm[entry.offset:entry.offset + entry.length])
+            index_offset = f.tell()
+            f.write(self._pack_index(index))
+            f.seek(0)
+            f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index), index_offset))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Views handed out by get() keep the old mapping alive until released
+        self._mm = None
+        os.replace(tmp_path, self.path)
+        self._load()
+        return evicted
+
+    def _touch(self, code: str, now: int) -> None:
+        """
+        Record an access to code, in place in the on-disk index. Must be
+        called with the lock held.
+        """
+        try:
+            with locked_file(self.path) as f:
+                if self._changed_on_disk():
+                    self._load()
+                codes = list(self._index)
+                if code not in self._index:
+                    return
+                f.seek(self._index_offset + codes.index(code) * _ENTRY.size + _ATIME_OFFSET)
+                f.write(_ATIME.pack(now))
+                self._index[code] = self._index[code]._replace(atime=now)
+                self._mapped = self._stat()
+        except OSError as e:
+            # Access times only steer eviction; a read-only cache still works
+            logging.info(f"Cannot update access time in {self.path}: {e}")
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """
+        Return the (inode, size) of the file at self.path, or None if missing.
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size
+
+    def _changed_on_disk(self) -> bool:
+        """
+        Return True if the pack file was appended to or replaced since it was mapped.
+        """
+        return self._stat() != self._mapped
+
+    def _load(self) -> bool:
+        """
+        Map the pack file and read its index. Returns False if the file is
+        missing or not a valid pack. Must be called with the lock held, and
+        with the file lock held by the caller.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                mapped = os.fstat(f.fileno())
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        if len(mm) < _HEADER_SIZE:
+            mm.close()
+            return False
+        magic, version, count, index_offset = _HEADER.unpack_from(mm, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION or index_offset + count * _ENTRY.size > len(mm):
+            mm.close()
+            return False
+
+        index: Dict[str, PackEntry] = {}
+        for i in range(count):
+            raw_code, offset, length, digest, atime = _ENTRY.unpack_from(mm, index_offset + i * _ENTRY.size)
+            index[raw_code.rstrip(b"\0").decode("ascii")] = PackEntry(offset, length, digest, atime)
+
+        # Blobs are never modified in place, so entries that did not move stay verified
+        previous = self._index
+        self._verified = {
+            code for code in self._verified
+            if code in index and index[code].offset == previous[code].offset
+        }
+        self._mm = mm
+        self._index = index
+        self._index_offset = index_offset
+        self._mapped = (mapped.st_ino, mapped.st_size)
+        return True
+
+    @staticmethod
+    def _write_empty(f: BinaryIO) -> None:
+        """
+        Overwrite the locked pack file f with an empty pack.
+        """
+        f.seek(0)
+        f.truncate()
+        header = _HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, _HEADER_SIZE)
+        f.write(header.ljust(_HEADER_SIZE, b"\0"))
+        f.flush()
+
+    @staticmethod
+    def _live_bytes(index: Dict[str, PackEntry]) -> int:
+        """
+        Return the size of a compacted pack holding the entries of index.
+        """
+        return _HEADER_SIZE + sum(e.length for e in index.values()) + _ENTRY.size * len(index)
+
+    @staticmethod
+    def _pack_index(index: Dict[str, PackEntry]) -> bytes:
+        """
+        Serialize the index records for all entries.
+        """
+        return b"".join(
+            _ENTRY.pack(code.encode("ascii"), e.offset, e.length, e.digest, e.atime)
+            for code, e in index.items()
+        )
@@ -0,0 +1,87 @@
+"""
+Advisory file locks shared between processes.
+
+Uses flock() on POSIX and msvcrt.locking() on Windows. The locks only
+coordinate processes that use them; they do not prevent other access.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _lock(f: BinaryIO, shared: bool) -> None:
+    """
+    Block until f is locked.
+    """
+    if os.name == "nt":
+        # Windows has no shared locks; lock the first byte exclusively.
+        # LK_LOCK gives up after about 10 s, so keep trying
+        while True:
+            try:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+    fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+
+def _unlock(f: BinaryIO) -> None:
+    """
+    Release the lock taken by _lock.
+    """
+    if os.name == "nt":
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def locked_file(path: str, shared: bool = False) -> Iterator[BinaryIO]:
+    """
+    Open path for reading and writing, creating it if missing, and hold a
+    lock on it for the duration of the block.
+
+    A file that is atomically replaced (renamed over) while this waits for the
+    lock is not the file at path anymore, so the lock is then taken again on
+    the new file.
+
+    Args:
+        path (str): File to lock.
+        shared (bool): Take a shared (read) lock instead of an exclusive one.
+
+    Yields:
+        BinaryIO: The locked file, opened in "r+b" mode.
+
+    Raises:
+        OSError: If the file cannot be created or opened.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    while True:
+        f = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644), "r+b")
+        try:
+            _lock(f, shared)
+            try:
+                replaced = os.fstat(f.fileno()).st_ino != os.stat(path).st_ino
+            except FileNotFoundError:
+                replaced = True
+            if not replaced:
+                try:
+                    yield f
+                finally:
+                    _unlock(f)
+                return
+            _unlock(f)
+        finally:
+            f.close()
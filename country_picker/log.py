@@ -0,0 +1,120 @@
+"""
+Application logging: records are handed to a queue and written to a
+rotating, compressed log file by a background thread.
+
+Logging from the GUI thread (or any other) then only formats the record and
+enqueues it; file writes, rollovers and compression never block the caller.
+The log file is rotated when it outgrows LOG_MAX_BYTES or LOG_MAX_AGE_SECONDS,
+keeping LOG_BACKUP_COUNT gzip-compressed backups (app.log.1.gz, ...), so long
+running sessions cannot fill the disk.
+"""
+
+import atexit
+import gzip
+import logging
+import os
+import queue
+import shutil
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from .config import LOG_BACKUP_COUNT, LOG_FILE, LOG_FORMAT, LOG_MAX_AGE_SECONDS, LOG_MAX_BYTES
+
+_listener: Optional[QueueListener] = None
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that gzip-compresses rotated files and also rolls
+    over once the current file is older than max_age seconds.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = LOG_MAX_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT,
+        max_age: float = LOG_MAX_AGE_SECONDS,
+    ) -> None:
+        """
+        Args:
+            filename (str): Log file to write.
+            max_bytes (int): Size after which the file is rotated.
+            backup_count (int): Number of compressed backups kept.
+            max_age (float): Seconds after which the file is rotated, or 0 to disable.
+        """
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.max_age = max_age
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+        # A file left behind by an earlier run ages from its last write
+        try:
+            self._opened_at = os.path.getmtime(filename)
+        except OSError:
+            self._opened_at = time.time()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.max_age and time.time() - self._opened_at >= self.max_age and os.path.exists(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._opened_at = time.time()
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        """
+        Rotator writing source to dest compressed, then removing source.
+        """
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+def setup_logging(level: str | int = logging.INFO, path: str = LOG_FILE) -> None:
+    """
+    Route all logging through a queue to a rotating file written by a
+    background thread. Only the first call has an effect; the queue is
+    flushed at exit.
+
+    Args:
+        level (str | int): Lowest level logged, e.g. "DEBUG" or logging.INFO.
+        path (str): Log file to write.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = CompressingRotatingFileHandler(path)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Write out queued records and stop the background writer.
+    """
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
@@ -0,0 +1,217 @@
+"""
+In-process metrics registry: counters and timings for the country list
+fetch, parsing, flag cache lookups and downloads, SVG rendering and the
+selection-to-flag latency.
+
+Like startup.py, this module has no Qt or network imports, so every part of
+the application, including the headless commands, records into the same
+registry. The registry can be written to a JSON file at exit and on SIGUSR1
+(see install_dump), and each timing can also be logged as one JSON line.
+"""
+
+import atexit
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from .config import METRICS_SAMPLES
+
+_log = logging.getLogger(__name__)
+
+
+class TimerStats:
+    """
+    Aggregate of the durations recorded under one name. Percentiles are
+    computed over the most recent METRICS_SAMPLES durations.
+    """
+
+    def __init__(self, samples: int = METRICS_SAMPLES) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.samples: Deque[float] = deque(maxlen=samples)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        self.samples.append(ms)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Return count, total, mean, min, max, median and 95th percentile, in ms.
+        """
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3),
+            "min_ms": round(self.min_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(percentile(0.5), 3),
+            "p95_ms": round(percentile(0.95), 3),
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of named counters and timers.
+
+    Names are dotted, subsystem first, e.g. "flag.pack_hit" or
+    "countries.ttfb". With log_spans set, every timing is also logged as a
+    JSON line on the "country_picker.metrics" logger.
+    """
+
+    def __init__(self, samples: int = METRICS_SAMPLES) -> None:
+        """
+        Args:
+            samples (int): Recent durations kept per timer for percentiles.
+        """
+        self.samples = samples
+        self.log_spans = False
+        self.dump_path: Optional[str] = None
+        self._started = time.time()
+        self._counters: Dict[str, int] = {}
+        self._timers: Dict[str, TimerStats] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        """
+        Add value to the counter name.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, ms: float, **fields: Any) -> None:
+        """
+        Record a duration under name.
+
+        Args:
+            name (str): Timer name.
+            ms (float): Duration in milliseconds.
+            **fields: Attributes included in the structured log line.
+        """
+        self.sample(name, ms)
+        if self.log_spans:
+            _log.info(json.dumps({"metric": name, "ms": round(ms, 3), **fields}, default=str))
+
+    def sample(self, name: str, ms: float) -> None:
+        """
+        Record a duration under name without a structured log line, for
+        timings taken many times per second (e.g. the event loop lag).
+        """
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = TimerStats(self.samples)
+            timer.add(ms)
+
+    @contextmanager
+    def span(self, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block under name.
+
+        Yields the span's fields, to which the block may add attributes
+        (e.g. a status code) for the structured log line. If the block raises,
+        the "<name>.errors" counter is incremented and the duration is still
+        recorded, with the exception type as the "error" field.
+
+        Args:
+            name (str): Timer name.
+            **fields: Initial attributes of the span.
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = type(e).__name__
+            self.incr(f"{name}.errors")
+            raise
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000, **fields)
+
+    def counter(self, name: str) -> int:
+        """
+        Return the current value of a counter (0 if never incremented).
+        """
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def timer(self, name: str) -> Optional[Dict[str, float]]:
+        """
+        Return the summary of a timer, or None if nothing was recorded.
+        """
+        with self._lock:
+            timer = self._timers.get(name)
+            return timer.summary() if timer is not None else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return all counters and timer summaries as a JSON-serializable dict.
+        """
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "uptime_s": round(time.time() - self._started, 3),
+                "counters": dict(sorted(self._counters.items())),
+                "timers": {name: timer.summary() for name, timer in sorted(self._timers.items())},
+            }
+
+    def dump(self, path: str) -> None:
+        """
+        Atomically write snapshot() as JSON to path. Errors are logged, not raised.
+        """
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Cannot write metrics to {path}: {e}")
+
+    def reset(self) -> None:
+        """
+        Drop all counters and timers.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+
+# Registry shared by the whole process
+METRICS = MetricsRegistry()
+
+
+def install_dump(path: str, registry: MetricsRegistry = METRICS) -> None:
+    """
+    Write the registry to path when the process exits and, where the
+    platform has it, whenever it receives SIGUSR1. Must be called from the
+    main thread.
+
+    Python only runs signal handlers while the interpreter is executing, so
+    an application blocked in a native event loop must wake it up
+    periodically (see CountryPickerApp).
+
+    Args:
+        path (str): JSON file to write.
+        registry (MetricsRegistry): Registry to dump.
+    """
+    registry.dump_path = path
+    atexit.register(registry.dump, path)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: registry.dump(path))
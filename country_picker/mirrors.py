@@ -0,0 +1,294 @@
+"""
+Mirror selection and hedged requests.
+
+Each resource (the country list, flags) can be served by several mirrors.
+For every mirror an exponentially weighted moving average (EWMA) of its
+latency, of the deviation from it and of its error rate is kept, and saved
+in the cache directory so the next run starts with what this one learned.
+
+A request goes to the fastest healthy mirror first. If it has not answered
+within that mirror's usual tail latency (EWMA mean plus two deviations,
+roughly its 95th percentile), the same request is also sent to the next
+mirror and whichever answers first is used; a mirror that fails is replaced
+by the next one immediately. This bounds the tail latency of a cold fetch
+by the fastest mirror rather than the slowest.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, TypeVar
+
+from .config import (
+    MIRROR_EWMA_ALPHA,
+    MIRROR_HEDGE_DEFAULT_MS,
+    MIRROR_HEDGE_MAX_MS,
+    MIRROR_HEDGE_MIN_MS,
+    MIRROR_HEDGE_WORKERS,
+    MIRROR_SAVE_INTERVAL_SECONDS,
+    MIRROR_STATS_FILE,
+    MIRROR_UNHEALTHY_ERROR_RATE,
+)
+from .metrics import METRICS
+from .retry import RetryLaterError
+
+T = TypeVar("T")
+
+# Bump when the layout of the stats file changes; older files are ignored.
+MIRROR_STATS_VERSION = 1
+
+
+class MirrorStat(NamedTuple):
+    """
+    Moving averages of one mirror's latency (ms), the mean absolute deviation
+    from it (ms) and its error rate (0 to 1), over `samples` requests.
+    """
+    latency_ms: float
+    deviation_ms: float
+    error_rate: float
+    samples: int
+
+
+class Mirrors:
+    """
+    Latency and error tracking for mirrors, and hedged calls across them.
+    Thread-safe; one instance is shared by all fetch paths of a process.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = MIRROR_STATS_FILE,
+        workers: int = MIRROR_HEDGE_WORKERS,
+        alpha: float = MIRROR_EWMA_ALPHA,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            path (str | None): File the statistics are loaded from and saved to, or None.
+            workers (int): Requests that may be in flight at once across all calls.
+            alpha (float): Weight of a new sample in the moving averages, 0 to 1.
+            clock (Callable[[], float]): Monotonic time source, in seconds.
+        """
+        self.path = path
+        self.alpha = alpha
+        self.clock = clock
+        self._stats: Dict[str, MirrorStat] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="mirror")
+        self._last_save = clock()
+        self._dirty = False
+        self._load()
+
+    def stat(self, mirror: str) -> Optional[MirrorStat]:
+        """
+        Return the statistics of a mirror, or None if it was never used.
+        """
+        with self._lock:
+            return self._stats.get(mirror)
+
+    def record(self, mirror: str, ms: float, failed: bool = False) -> None:
+        """
+        Add one request to a mirror's moving averages. The latency of failed
+        requests is not counted, only the failure.
+
+        Args:
+            mirror (str): Mirror URL.
+            ms (float): Time until the mirror answered, in milliseconds.
+            failed (bool): True if the mirror could not be reached or failed.
+        """
+        a = self.alpha
+        with self._lock:
+            stat = self._stats.get(mirror)
+            if stat is None:
+                stat = MirrorStat(0.0, 0.0, 1.0, 1) if failed else MirrorStat(ms, ms / 2, 0.0, 1)
+            elif failed:
+                stat = stat._replace(error_rate=(1 - a) * stat.error_rate + a, samples=stat.samples + 1)
+            else:
+                latency = stat.latency_ms if stat.latency_ms else ms
+                deviation = (1 - a) * stat.deviation_ms + a * abs(ms - latency)
+                stat = MirrorStat(
+                    (1 - a) * latency + a * ms, deviation, (1 - a) * stat.error_rate, stat.samples + 1
+                )
+            self._stats[mirror] = stat
+            self._dirty = True
+            save = self.clock() - self._last_save >= MIRROR_SAVE_INTERVAL_SECONDS
+        METRICS.observe("mirror.latency", ms, mirror=mirror, failed=failed)
+        if save:
+            self.save()
+
+    def hedge_delay(self, mirror: str) -> float:
+        """
+        Return the seconds to wait for a mirror before also asking the next
+        one: its EWMA latency plus two deviations, within the configured bounds.
+        """
+        stat = self.stat(mirror)
+        if stat is None or not stat.latency_ms:
+            ms = MIRROR_HEDGE_DEFAULT_MS
+        else:
+            ms = stat.latency_ms + 2 * stat.deviation_ms
+        return min(MIRROR_HEDGE_MAX_MS, max(MIRROR_HEDGE_MIN_MS, ms)) / 1000
+
+    def ranked(self, mirrors: Sequence[str]) -> List[str]:
+        """
+        Order mirrors healthy first, then by expected tail latency. Mirrors
+        without measurements are assumed as fast as the fastest measured one,
+        so the configured order decides between them.
+        """
+        with self._lock:
+            stats = {m: self._stats.get(m) for m in mirrors}
+        measured = [s.latency_ms + 2 * s.deviation_ms for s in stats.values() if s is not None and s.latency_ms]
+        default = min(measured, default=0.0)
+
+        def key(mirror: str) -> tuple:
+            stat = stats[mirror]
+            if stat is None:
+                return (False, default)
+            unhealthy = stat.error_rate >= MIRROR_UNHEALTHY_ERROR_RATE
+            return (unhealthy, stat.latency_ms + 2 * stat.deviation_ms if stat.latency_ms else default)
+
+        return sorted(dict.fromkeys(mirrors), key=key)
+
+    def call(
+        self,
+        mirrors: Sequence[str],
+        attempt: Callable[[str], T],
+        is_failure: Callable[[Exception], bool] = lambda e: True,
+        discard: Optional[Callable[[T], Any]] = None,
+    ) -> T:
+        """
+        Call attempt(mirror) on the best mirror, hedging with the next ones.
+
+        Whenever the newest attempt has not completed within its mirror's
+        hedge delay, or any attempt fails, the next mirror is tried as well.
+        The first successful result is returned; results of attempts that
+        complete later are passed to discard (e.g. to close a response).
+
+        Args:
+            mirrors (Sequence[str]): Candidate mirror URLs, in configured order.
+            attempt (Callable[[str], T]): Performs the request on one mirror.
+            is_failure (Callable[[Exception], bool]): Whether an exception
+                counts against the mirror's health (e.g. not a 404).
+            discard (Callable[[T], Any] | None): Releases an unused result.
+
+        Returns:
+            T: Result of the first successful attempt.
+
+        Raises:
+            Exception: The exception of the best-ranked mirror if all attempts failed.
+        """
+        order = self.ranked(mirrors)
+        if len(order) == 1:
+            # Nothing to race: run on the caller's thread
+            return self._timed(order[0], attempt, is_failure)
+
+        pending: Dict[Future, int] = {}
+        errors: Dict[int, Exception] = {}
+
+        def launch() -> None:
+            rank = len(pending) + len(errors)
+            pending[self._executor.submit(self._timed, order[rank], attempt, is_failure)] = rank
+
+        launch()
+        while pending:
+            newest = max(pending.values())
+            can_hedge = len(pending) + len(errors) < len(order)
+            done, _ = wait(pending, self.hedge_delay(order[newest]) if can_hedge else None, FIRST_COMPLETED)
+            if not done:
+                METRICS.incr("mirror.hedged")
+                launch()
+                continue
+
+            for future in done:
+                rank = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    if rank:
+                        METRICS.incr("mirror.won_by_fallback")
+                    for other in pending:
+                        other.add_done_callback(lambda f: _discard(f, discard))
+                    return future.result()
+                errors[rank] = error
+                if len(pending) + len(errors) < len(order):
+                    METRICS.incr("mirror.failover")
+                    launch()
+
+        raise errors[min(errors)]
+
+    def _timed(self, mirror: str, attempt: Callable[[str], T], is_failure: Callable[[Exception], bool]) -> T:
+        """
+        Run attempt(mirror) and record its latency and outcome.
+        """
+        start = time.perf_counter()
+        try:
+            result = attempt(mirror)
+        except RetryLaterError:
+            raise  # Refused without a request; nothing was measured
+        except Exception as e:
+            self.record(mirror, (time.perf_counter() - start) * 1000, failed=is_failure(e))
+            raise
+        self.record(mirror, (time.perf_counter() - start) * 1000)
+        return result
+
+    def save(self) -> None:
+        """
+        Write the statistics to the stats file, if they changed. Errors are logged.
+        """
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            payload = {
+                "version": MIRROR_STATS_VERSION,
+                "mirrors": {mirror: stat._asdict() for mirror, stat in self._stats.items()},
+            }
+            self._dirty = False
+            self._last_save = self.clock()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Cannot save mirror statistics to {self.path}: {e}")
+
+    def close(self) -> None:
+        """
+        Save the statistics and stop the hedging threads without waiting for
+        requests still in flight.
+        """
+        self.save()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self) -> None:
+        """
+        Read the statistics saved by an earlier run, ignoring a missing or
+        incompatible file.
+        """
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != MIRROR_STATS_VERSION:
+                return
+            self._stats = {
+                str(mirror): MirrorStat(
+                    float(s["latency_ms"]), float(s["deviation_ms"]), float(s["error_rate"]), int(s["samples"])
+                )
+                for mirror, s in payload["mirrors"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._stats = {}
+
+
+def _discard(future: Future, discard: Optional[Callable[[Any], Any]]) -> None:
+    """
+    Pass the result of a losing attempt to discard, if it succeeded.
+    """
+    if discard is not None and not future.cancelled() and future.exception() is None:
+        discard(future.result())
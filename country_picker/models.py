@@ -0,0 +1,202 @@
+"""
+Qt item models used by the country combobox.
+"""
+
+from bisect import bisect_left
+from itertools import repeat
+from typing import Any
+
+from PyQt6.QtCore import QAbstractListModel, QAbstractProxyModel, QModelIndex, QObject, Qt
+
+from .table import CountryTable
+from .utils import Country, row_changes
+
+# Above this many separate edits, update_table resets the model instead
+MAX_INCREMENTAL_EDITS = 64
+
+
+class CountryListModel(QAbstractListModel):
+    """
+    List model serving rows of a CountryTable on demand.
+
+    Views only call data() for the rows they display, so populating the
+    combobox no longer creates one item per country up front.
+    """
+
+    CodeRole = Qt.ItemDataRole.UserRole
+    RegionRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._table = CountryTable()
+        # (table, row) of each row served while update_table delivers its signals
+        self._entries: list[tuple[CountryTable, int]] | None = None
+
+    @property
+    def table(self) -> CountryTable:
+        """
+        The table currently shown by the model.
+        """
+        return self._table
+
+    def set_table(self, table: CountryTable) -> None:
+        """
+        Replace the shown countries.
+
+        Args:
+            table (CountryTable): New country records.
+        """
+        self.beginResetModel()
+        self._table = table
+        self.endResetModel()
+
+    def update_table(self, table: CountryTable) -> None:
+        """
+        Replace the shown countries by inserting and removing only the rows
+        that changed, so views keep their current and scroll positions. Falls
+        back to a reset when more than MAX_INCREMENTAL_EDITS edits are needed.
+
+        Args:
+            table (CountryTable): New country records.
+        """
+        # Rows are identified by collation key, the order both tables are
+        # sorted in, and code; the other fields are refreshed by dataChanged
+        old = self._table
+        new_rows = list(zip(table.keys, table.codes()))
+        edits = row_changes(list(zip(old.keys, old.codes())), new_rows)
+        if len(edits) > MAX_INCREMENTAL_EDITS:
+            self.set_table(table)
+            return
+
+        root = QModelIndex()
+        # Views may query rows while the signals are delivered, so the model
+        # serves the intermediate lists from entries, rows of the old and the
+        # new table, and only switches to the new table at the end
+        entries = list(zip(repeat(old), range(len(old))))
+        self._entries = entries
+        try:
+            for start, removed, inserted in edits:
+                if removed:
+                    self.beginRemoveRows(root, start, start + removed - 1)
+                    del entries[start:start + removed]
+                    self.endRemoveRows()
+                if inserted:
+                    # Inserted rows are consecutive in the new table
+                    first = bisect_left(table.keys, inserted[0][0])
+                    while new_rows[first] != inserted[0]:
+                        first += 1
+                    self.beginInsertRows(root, start, start + len(inserted) - 1)
+                    entries[start:start] = zip(repeat(table), range(first, first + len(inserted)))
+                    self.endInsertRows()
+        finally:
+            self._entries = None
+            self._table = table
+        if len(table):
+            self.dataChanged.emit(self.index(0), self.index(len(table) - 1))
+
+    def _locate(self, row: int) -> tuple[CountryTable, int]:
+        """
+        Return the table and row in it holding the country shown at row.
+        """
+        if self._entries is not None:
+            return self._entries[row]
+        return self._table, row
+
+    def record(self, row: int) -> Country | None:
+        """
+        Return the Country shown at row, or None if out of range.
+        """
+        if 0 <= row < self.rowCount():
+            table, table_row = self._locate(row)
+            return table.record(table_row)
+        return None
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._entries) if self._entries is not None else len(self._table)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        table, row = self._locate(index.row())
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return table.name(row)
+        if role == self.CodeRole:
+            return table.code(row)
+        if role == self.RegionRole:
+            return table.region(row)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return country_details(table.record(row))
+        return None
+
+
+def country_details(country: Country) -> str | None:
+    """
+    Describe a country's capital, region and population in one line, or
+    return None if the API provided none of them.
+    """
+    parts = []
+    if country.capital:
+        parts.append(f"Capital: {country.capital}")
+    region = " / ".join(part for part in (country.region, country.subregion) if part)
+    if region:
+        parts.append(region)
+    if country.population:
+        parts.append(f"Population: {country.population:,}")
+    return " · ".join(parts) or None
+
+
+class RowFilterProxyModel(QAbstractProxyModel):
+    """
+    Flat proxy exposing a chosen subset of the source rows, in a chosen order.
+
+    Used as the search completer's model: the rows come from the search index,
+    and because the source rows are mapped back, QComboBox selects the right
+    entry when a completion is activated.
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._rows: list[int] = []
+        self._proxy_rows: dict[int, int] | None = None
+
+    def set_rows(self, rows: list[int]) -> None:
+        """
+        Replace the visible source rows.
+
+        Args:
+            rows (list[int]): Source rows to show, in display order.
+        """
+        self.beginResetModel()
+        self._rows = rows
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else 1
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if parent.isValid() or column != 0 or not 0 <= row < len(self._rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index: QModelIndex) -> QModelIndex:
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], 0)
+
+    def mapFromSource(self, source_index: QModelIndex) -> QModelIndex:
+        if not source_index.isValid():
+            return QModelIndex()
+        if self._proxy_rows is None:
+            # Reverse mapping is rarely needed, so it is built lazily
+            self._proxy_rows = {source: proxy for proxy, source in enumerate(self._rows)}
+        row = self._proxy_rows.get(source_index.row())
+        return QModelIndex() if row is None else self.createIndex(row, 0)
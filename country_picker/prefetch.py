@@ -0,0 +1,322 @@
+"""
+Speculative flag downloads, so most flags are already in the flag pack when
+their country is selected.
+
+Two sources feed the PrefetchScheduler's priority queue:
+
+* while the combobox popup is open, the highlighted row and its neighbors
+  (most urgent, replaced on every highlight change);
+* once the country list is shown, the countries chosen most often, from a
+  SelectionHistory saved in the cache directory.
+
+A few background threads work through the queue within a concurrency and a
+bandwidth budget. Explicit selections take precedence: while the flag
+worker serves one, no new prefetch starts, and if the selected flag is
+being prefetched the worker waits for that download instead of repeating
+it. Prefetched flags only go into the pack; rendering still happens on
+selection.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import (
+    FLAG_CACHE_MAX_BYTES,
+    FLAG_PACK_FILE,
+    PREFETCH_BYTES_PER_SECOND,
+    PREFETCH_HISTORY_FILE,
+    PREFETCH_WORKERS,
+)
+from .data import fetch_flag
+from .flagpack import FlagPack
+from .metrics import METRICS
+from .retry import CircuitBreakers, NegativeCache
+from .snapshot import Snapshot
+
+if TYPE_CHECKING:
+    from .mirrors import Mirrors
+
+# Bump when the layout of the history file changes; older files are ignored.
+HISTORY_VERSION = 1
+
+# Queue classes, most urgent first. Entries are ordered by class, then by
+# their rank within the batch they were scheduled in.
+PRIORITY_HIGHLIGHT = 0
+PRIORITY_HISTORY = 1
+
+
+class SelectionHistory:
+    """
+    How often each country was chosen, loaded from and saved to a JSON file.
+    Thread-safe.
+    """
+
+    def __init__(self, path: Optional[str] = PREFETCH_HISTORY_FILE) -> None:
+        """
+        Args:
+            path (str | None): File the counts are loaded from and saved to, or None.
+        """
+        self.path = path
+        self._counts: Dict[str, int] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def record(self, alpha2_code: str) -> None:
+        """
+        Count one explicit choice of a country.
+        """
+        with self._lock:
+            code = alpha2_code.lower()
+            self._counts[code] = self._counts.get(code, 0) + 1
+            self._dirty = True
+
+    def most_chosen(self, limit: int) -> List[str]:
+        """
+        Return up to limit codes, most often chosen first.
+        """
+        with self._lock:
+            ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+        return [code for code, _count in ranked[:limit]]
+
+    def save(self) -> None:
+        """
+        Write the counts to the history file, if they changed. Errors are logged.
+        """
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            payload = {"version": HISTORY_VERSION, "counts": dict(self._counts)}
+            self._dirty = False
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Cannot save selection history to {self.path}: {e}")
+
+    def _load(self) -> None:
+        """
+        Read the counts saved by an earlier run, ignoring a missing or
+        incompatible file.
+        """
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != HISTORY_VERSION:
+                return
+            self._counts = {str(code): int(count) for code, count in payload["counts"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._counts = {}
+
+
+class PrefetchScheduler:
+    """
+    Priority queue of flags to download ahead of selection, served by
+    background threads within a concurrency and bandwidth budget.
+    """
+
+    def __init__(
+        self,
+        breakers: Optional[CircuitBreakers] = None,
+        negative: Optional[NegativeCache] = None,
+        mirrors: Optional["Mirrors"] = None,
+        workers: int = PREFETCH_WORKERS,
+        bytes_per_second: float = PREFETCH_BYTES_PER_SECOND,
+        pack_path: str = FLAG_PACK_FILE,
+        fetch: Optional[Callable[[str], int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            breakers (CircuitBreakers | None): Circuit breakers shared with the other fetch paths.
+            negative (NegativeCache | None): Recently failed flags, new cache by default.
+            mirrors (Mirrors | None): Mirror statistics shared with the other fetch paths.
+            workers (int): Prefetch downloads in flight at once.
+            bytes_per_second (float): Average download rate prefetching may use.
+            pack_path (str): Flag pack the flags are added to.
+            fetch (Callable[[str], int] | None): Downloads one flag into the
+                pack and returns the bytes transferred, or 0 if it was cached;
+                by default fetch_flag into the pack at pack_path.
+            clock (Callable[[], float]): Monotonic time source, in seconds.
+        """
+        self.breakers = breakers
+        self.negative = negative if negative is not None else NegativeCache()
+        self.mirrors = mirrors
+        self.workers = workers
+        self.bytes_per_second = bytes_per_second
+        self.pack_path = pack_path
+        self.clock = clock
+        self._fetch = fetch if fetch is not None else self._fetch_into_pack
+        self._pack: Optional[FlagPack] = None
+        self._snapshot = Snapshot()
+        self._local = threading.local()  # one requests.Session per prefetch thread
+
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self._queued: Dict[str, Tuple[int, int, int]] = {}  # code -> its live heap key
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._order = itertools.count()
+        self._selections = 0
+        # Bandwidth budget as a token bucket holding at most one second of transfer
+        self._allowance = bytes_per_second
+        self._refilled = clock()
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """
+        Start the prefetch threads.
+        """
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._run, name=f"prefetch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Drop queued prefetches, stop the threads without waiting for
+        downloads in flight, and close the flag pack.
+        """
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._queued.clear()
+            self._cond.notify_all()
+            pack, self._pack = self._pack, None
+        self._threads = []
+        self._snapshot.close()
+        if pack is not None:
+            # Downloads still in flight then fail to store their flag
+            pack.close()
+
+    def schedule(self, codes: Sequence[str], priority: int = PRIORITY_HISTORY, replace: bool = False) -> None:
+        """
+        Queue flags for prefetching, most urgent first.
+
+        Args:
+            codes (Sequence[str]): Alpha2 codes, in order of urgency.
+            priority (int): Queue class, e.g. PRIORITY_HIGHLIGHT.
+            replace (bool): Drop flags still queued in the same class first,
+                e.g. the neighbors of a row that is no longer highlighted.
+        """
+        with self._cond:
+            if replace:
+                for code, key in list(self._queued.items()):
+                    if key[0] == priority:
+                        del self._queued[code]  # its heap entry is skipped when popped
+            for rank, code in enumerate(codes):
+                code = code.lower()
+                key = (priority, rank, next(self._order))
+                current = self._queued.get(code)
+                if code in self._in_flight or (current is not None and current < key):
+                    continue
+                self._queued[code] = key
+                heapq.heappush(self._heap, (*key, code))
+                METRICS.incr("prefetch.scheduled")
+            self._cond.notify_all()
+
+    @contextmanager
+    def selection(self, alpha2_code: str) -> Iterator[None]:
+        """
+        Context in which an explicit selection's flag is fetched: no prefetch
+        starts meanwhile, and if the flag is being prefetched, entering waits
+        for that download so it is not repeated.
+
+        Args:
+            alpha2_code (str): Code of the selected country.
+        """
+        code = alpha2_code.lower()
+        with self._cond:
+            self._selections += 1
+            self._queued.pop(code, None)
+            in_flight = self._in_flight.get(code)
+        try:
+            if in_flight is not None:
+                METRICS.incr("prefetch.joined")
+                in_flight.wait()
+            yield
+        finally:
+            with self._cond:
+                self._selections -= 1
+                self._cond.notify_all()
+
+    def _next(self) -> Optional[str]:
+        """
+        Block until a prefetch may start and return its code, or None once
+        stopped. Waits while a selection is served or the bandwidth budget
+        is used up.
+        """
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                now = self.clock()
+                self._allowance = min(
+                    self.bytes_per_second, self._allowance + (now - self._refilled) * self.bytes_per_second
+                )
+                self._refilled = now
+                while self._heap and self._queued.get(self._heap[0][3]) != self._heap[0][:3]:
+                    heapq.heappop(self._heap)  # replaced or rescheduled entry
+                if not self._heap or self._selections:
+                    self._cond.wait()
+                elif self._allowance <= 0:
+                    self._cond.wait(-self._allowance / self.bytes_per_second)
+                else:
+                    code = heapq.heappop(self._heap)[3]
+                    del self._queued[code]
+                    self._in_flight[code] = threading.Event()
+                    return code
+
+    def _run(self) -> None:
+        while True:
+            code = self._next()
+            if code is None:
+                return
+            transferred = 0
+            try:
+                transferred = self._fetch(code)
+                METRICS.incr("prefetch.downloaded" if transferred else "prefetch.cached")
+            except Exception as e:
+                METRICS.incr("prefetch.failed")
+                logging.debug(f"Prefetching flag '{code}' failed ({type(e).__name__}): {e}")
+            finally:
+                with self._cond:
+                    self._allowance -= transferred
+                    self._in_flight.pop(code).set()
+                    self._cond.notify_all()
+            METRICS.incr("prefetch.bytes", transferred)
+
+    def _fetch_into_pack(self, code: str) -> int:
+        """
+        Download a flag into the pack unless it is there already, and return
+        the bytes added. Flags in the bundled snapshot are copied from it and,
+        conservatively, still count against the bandwidth budget.
+        """
+        import requests
+
+        with self._cond:
+            if self._stopped:
+                return 0
+            if self._pack is None:
+                self._pack = FlagPack(self.pack_path, FLAG_CACHE_MAX_BYTES)
+            pack = self._pack
+        if code in pack:
+            return 0
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return len(fetch_flag(session, pack, code, self._snapshot, self.breakers, self.negative, self.mirrors))
@@ -0,0 +1,46 @@
+"""
+SVG rasterization helpers.
+
+QImage, QPainter and QSvgRenderer are safe to use outside the GUI thread,
+so flags are rendered by the worker threads and only handed to the GUI
+as finished images.
+"""
+
+from PyQt6.QtCore import QByteArray, Qt
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtSvg import QSvgRenderer
+
+
+def render_svg(source: str | bytes | memoryview, width: int, height: int, device_pixel_ratio: float) -> QImage:
+    """
+    Render an SVG into an image sized for a widget of width x height logical
+    pixels on a screen with the given device pixel ratio. The aspect ratio of
+    the SVG is kept and the drawing is centered on a transparent background.
+
+    Args:
+        source (str | bytes | memoryview): Path to an SVG file, or the SVG document itself.
+        width (int): Target width in logical pixels.
+        height (int): Target height in logical pixels.
+        device_pixel_ratio (float): Device pixel ratio of the target screen.
+
+    Returns:
+        QImage: The rendered image, or a null QImage if the SVG is invalid.
+    """
+    renderer = QSvgRenderer(source if isinstance(source, str) else QByteArray(bytes(source)))
+    if not renderer.isValid():
+        return QImage()
+
+    image = QImage(
+        max(1, round(width * device_pixel_ratio)),
+        max(1, round(height * device_pixel_ratio)),
+        QImage.Format.Format_ARGB32_Premultiplied,
+    )
+    image.fill(Qt.GlobalColor.transparent)
+
+    renderer.setAspectRatioMode(Qt.AspectRatioMode.KeepAspectRatio)
+    painter = QPainter(image)
+    renderer.render(painter)
+    painter.end()
+
+    image.setDevicePixelRatio(device_pixel_ratio)
+    return image
@@ -0,0 +1,239 @@
+"""
+Retry policy, per-host circuit breakers and a negative cache, shared by the
+country list and flag fetch paths.
+
+Delays grow exponentially with the number of consecutive failures and are
+partly randomized, so clients that lose connectivity together do not retry
+in lockstep. Everything takes an injectable clock and random source.
+"""
+
+import math
+import random
+import threading
+import time
+from typing import Callable, Dict, Hashable
+from urllib.parse import urlsplit
+
+from .config import (
+    CIRCUIT_BREAKER_FAILURES,
+    FLAG_NEGATIVE_TTL_SECONDS,
+    RETRY_BASE_SECONDS,
+    RETRY_JITTER,
+    RETRY_MAX_SECONDS,
+)
+
+
+class RetryLaterError(Exception):
+    """
+    Raised instead of making a request that is known to fail: the host's
+    circuit is open, or the resource recently failed.
+    """
+
+    def __init__(self, message: str, retry_in: float) -> None:
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter and a cap.
+
+    The delay after the n-th consecutive failure (n >= 1) is
+    min(cap, base * multiplier ** (n - 1)), of which a random fraction of up
+    to `jitter` is taken off.
+    """
+
+    def __init__(
+        self,
+        base: float = RETRY_BASE_SECONDS,
+        cap: float = RETRY_MAX_SECONDS,
+        multiplier: float = 2.0,
+        jitter: float = RETRY_JITTER,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Args:
+            base (float): Delay after the first failure, in seconds.
+            cap (float): Longest delay, in seconds.
+            multiplier (float): Growth factor per additional failure.
+            jitter (float): Largest fraction of the delay that is randomized, 0 to 1.
+            rng (Callable[[], float]): Source of uniform random numbers in [0, 1).
+        """
+        self.base = base
+        self.cap = cap
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.rng = rng
+
+    def delay(self, failures: int) -> float:
+        """
+        Return the number of seconds to wait after `failures` consecutive
+        failures (0 if there were none).
+        """
+        if failures <= 0:
+            return 0.0
+        # Compare exponents rather than computing huge powers for long outages
+        if (failures - 1) * math.log(self.multiplier) >= math.log(self.cap / self.base):
+            delay = self.cap
+        else:
+            delay = self.base * self.multiplier ** (failures - 1)
+        return delay * (1 - self.jitter * self.rng())
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of one host.
+
+    After `threshold` consecutive failures the circuit opens: allow() returns
+    False until the policy's delay for the current failure count has passed.
+    The next allow() then lets one trial request through and immediately
+    re-opens the circuit for the next, longer delay; record_success() closes it.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        threshold: int = CIRCUIT_BREAKER_FAILURES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            policy (RetryPolicy): Backoff applied while the circuit is open.
+            threshold (int): Consecutive failures that open the circuit.
+            clock (Callable[[], float]): Monotonic time source, in seconds.
+        """
+        self.policy = policy
+        self.threshold = threshold
+        self.clock = clock
+        self.failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        True while requests are being refused.
+        """
+        return self.retry_in() > 0
+
+    def retry_in(self) -> float:
+        """
+        Return the seconds until a request will be allowed again (0 if now).
+        """
+        with self._lock:
+            return max(0.0, self._open_until - self.clock())
+
+    def allow(self) -> bool:
+        """
+        Return True if a request may be made now.
+        """
+        with self._lock:
+            if self.failures < self.threshold:
+                return True
+            now = self.clock()
+            if now < self._open_until:
+                return False
+            # Half-open: let this request through, hold back the others
+            self._open_until = now + self.policy.delay(self.failures - self.threshold + 2)
+            return True
+
+    def record_success(self) -> None:
+        """
+        Close the circuit after a successful request.
+        """
+        with self._lock:
+            self.failures = 0
+            self._open_until = 0.0
+
+    def record_failure(self) -> None:
+        """
+        Count a failed request, opening the circuit at the threshold.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self._open_until = self.clock() + self.policy.delay(self.failures - self.threshold + 1)
+
+
+class CircuitBreakers:
+    """
+    Thread-safe registry of one CircuitBreaker per host.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        threshold: int = CIRCUIT_BREAKER_FAILURES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            policy (RetryPolicy | None): Backoff shared by all breakers.
+            threshold (int): Consecutive failures that open a circuit.
+            clock (Callable[[], float]): Monotonic time source, in seconds.
+        """
+        self.policy = policy or RetryPolicy()
+        self.threshold = threshold
+        self.clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        """
+        Return the breaker of the host serving url.
+        """
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.policy, self.threshold, self.clock)
+            return breaker
+
+
+class NegativeCache:
+    """
+    Remembers keys that recently failed, each for a fixed time to live.
+    """
+
+    def __init__(self, ttl: float = FLAG_NEGATIVE_TTL_SECONDS, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            ttl (float): Seconds a failure is remembered.
+            clock (Callable[[], float]): Monotonic time source, in seconds.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._expiry: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable) -> None:
+        """
+        Remember that key failed now.
+        """
+        with self._lock:
+            self._expiry[key] = self.clock() + self.ttl
+
+    def retry_in(self, key: Hashable) -> float:
+        """
+        Return the seconds until key may be tried again (0 if it may be now).
+        Expired entries are dropped.
+        """
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return 0.0
+            remaining = expiry - self.clock()
+            if remaining <= 0:
+                del self._expiry[key]
+                return 0.0
+            return remaining
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.retry_in(key) > 0
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Forget a failure, e.g. after the key was fetched some other way.
+        """
+        with self._lock:
+            self._expiry.pop(key, None)
@@ -0,0 +1,274 @@
+"""
+Search indexes over the country list.
+
+SearchIndex answers type-to-search queries, LookupIndex resolves names and
+codes given on the command line or in batch, with fuzzy suggestions.
+
+Names are normalized (accents removed, case folded, punctuation dropped) so
+that e.g. "cote" finds "Côte d'Ivoire". The index is built once per list and
+answers substring queries by intersecting n-gram posting lists instead of
+scanning every name on each keystroke.
+"""
+
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .utils import LRUCache
+
+# Longest n-gram stored in the index; shorter queries are answered directly
+GRAM_SIZE = 3
+
+# Number of fuzzy-suggestion results remembered per LookupIndex
+SUGGESTION_MEMO_SIZE = 4096
+
+_EMPTY = array("I")
+
+
+def normalize(text: str) -> str:
+    """
+    Fold a name or query for matching: strip accents, case-fold, drop
+    apostrophes and turn other punctuation into single spaces.
+
+    Args:
+        text (str): Name or query.
+
+    Returns:
+        str: Normalized text.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    chars = []
+    for ch in decomposed:
+        if unicodedata.combining(ch) or ch in "'’`":
+            continue
+        chars.append(ch if ch.isalnum() else " ")
+    return " ".join("".join(chars).casefold().split())
+
+
+class SearchIndex:
+    """
+    Substring index over country names and their alternative names.
+
+    Every normalized key is split into all n-grams of length 1 to GRAM_SIZE,
+    each mapped to the sorted ids of the keys containing it. A query no longer
+    than GRAM_SIZE is a single posting lookup; longer queries intersect the
+    postings of their n-grams and verify the few remaining candidates.
+    """
+
+    def __init__(self, names: Sequence[str], aliases: Mapping[int, Sequence[str]] | None = None) -> None:
+        """
+        Build the index.
+
+        Args:
+            names (Sequence[str]): Display name of each row.
+            aliases (Mapping[int, Sequence[str]] | None): Alternative names per row.
+        """
+        self.row_count = len(names)
+        self._key_rows = array("I")
+        self._key_texts: List[str] = []
+        postings: Dict[str, array] = {}
+
+        def add_key(row: int, text: str) -> None:
+            key_text = normalize(text)
+            if not key_text:
+                return
+            key_id = len(self._key_texts)
+            self._key_rows.append(row)
+            self._key_texts.append(key_text)
+            grams = {
+                key_text[i:i + n]
+                for n in range(1, GRAM_SIZE + 1)
+                for i in range(len(key_text) - n + 1)
+            }
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(key_id)
+
+        for row, name in enumerate(names):
+            add_key(row, name)
+        for row, alternatives in (aliases or {}).items():
+            for alternative in alternatives:
+                add_key(row, alternative)
+
+        self._postings = postings
+
+    def search(self, query: str) -> List[int]:
+        """
+        Return the rows whose name or alternative names contain query.
+
+        Rows where a name starts with the query, or has a word starting with
+        it, come first; within each group rows keep their original order.
+
+        Args:
+            query (str): Text typed by the user.
+
+        Returns:
+            List[int]: Matching rows; all rows for an empty query.
+        """
+        q = normalize(query)
+        if not q:
+            return list(range(self.row_count))
+
+        if len(q) <= GRAM_SIZE:
+            key_ids = self._postings.get(q, _EMPTY)
+        else:
+            grams = sorted(
+                (self._postings.get(q[i:i + GRAM_SIZE], _EMPTY) for i in range(len(q) - GRAM_SIZE + 1)),
+                key=len,
+            )
+            candidates = set(grams[0])
+            for posting in grams[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(posting)
+            key_ids = [k for k in candidates if q in self._key_texts[k]]
+
+        word_start = f" {q}"
+        best: Dict[int, bool] = {}
+        for key_id in key_ids:
+            text = self._key_texts[key_id]
+            row = self._key_rows[key_id]
+            prefix = text.startswith(q) or word_start in text
+            best[row] = best.get(row, False) or prefix
+
+        rows = sorted(best)
+        return [r for r in rows if best[r]] + [r for r in rows if not best[r]]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Return the Levenshtein distance between two strings.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,               # deletion
+                current[j - 1] + 1,            # insertion
+                previous[j - 1] + (ca != cb),  # substitution
+            ))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over strings for bounded edit-distance queries.
+
+    Each child edge is labelled with its distance to the parent; the triangle
+    inequality lets a query skip every subtree whose label is further than
+    max_distance from the query's distance to the parent.
+    """
+
+    def __init__(self) -> None:
+        # Node layout: [word, rows, {distance: child}]
+        self._root: list | None = None
+
+    def add(self, word: str, row: int) -> None:
+        """
+        Insert word, associated with row. Duplicate words collect all their rows.
+        """
+        if self._root is None:
+            self._root = [word, [row], {}]
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                node[1].append(row)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [word, [row], {}]
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str, List[int]]]:
+        """
+        Return (distance, word, rows) for every stored word within max_distance
+        of word, closest first.
+        """
+        matches = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = edit_distance(word, node[0])
+            if distance <= max_distance:
+                matches.append((distance, node[0], node[1]))
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        matches.sort()
+        return matches
+
+
+class LookupIndex:
+    """
+    Resolves user-supplied country names or codes to rows.
+
+    Exact lookups (normalized name, alpha2 code) are dictionary hits. Fuzzy
+    suggestions for near-misses come from a BK-tree over the normalized names,
+    built on first use and memoized per query, so resolving large batches of
+    names stays cheap.
+    """
+
+    def __init__(self, records: Iterable[Sequence[str]]) -> None:
+        """
+        Args:
+            records (Iterable[Sequence[str]]): Records starting with
+                (country_name, alpha2_code), one per row.
+        """
+        self._by_name: Dict[str, int] = {}
+        self._by_code: Dict[str, int] = {}
+        self._names: List[str] = []
+        for row, record in enumerate(records):
+            name, code = record[0], record[1]
+            key = normalize(name)
+            self._names.append(key)
+            self._by_name.setdefault(key, row)
+            self._by_code.setdefault(code.lower(), row)
+        self._tree: BKTree | None = None
+        self._suggestions = LRUCache(SUGGESTION_MEMO_SIZE)
+
+    def resolve(self, query: str) -> Optional[int]:
+        """
+        Return the row whose name (ignoring case, accents and surrounding
+        whitespace) or alpha2 code equals query, or None.
+
+        Args:
+            query (str): Country name or code.
+        """
+        key = normalize(query)
+        row = self._by_name.get(key)
+        if row is None:
+            row = self._by_code.get(key)
+        return row
+
+    def suggest(self, query: str, limit: int = 3, max_distance: int = 2) -> List[int]:
+        """
+        Return up to limit rows whose normalized names are within max_distance
+        edits of the query, closest first.
+
+        Args:
+            query (str): Misspelled country name.
+            limit (int): Maximum number of suggestions.
+            max_distance (int): Largest edit distance considered a match.
+        """
+        key = (normalize(query), limit, max_distance)
+        rows = self._suggestions.get(key)
+        if rows is None:
+            if self._tree is None:
+                self._tree = BKTree()
+                for row, name in enumerate(self._names):
+                    self._tree.add(name, row)
+            rows = []
+            for _distance, _word, word_rows in self._tree.search(key[0], max_distance):
+                rows.extend(word_rows)
+            rows = rows[:limit]
+            self._suggestions.put(key, rows, 1)
+        return list(rows)
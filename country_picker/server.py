@@ -0,0 +1,419 @@
+"""
+Local HTTP service answering country list and flag requests for other
+processes on the host, so a single warm cache serves all of them.
+
+    GET /countries               JSON array of country objects, like API_URL
+    GET /countries/<code>        one country object
+    GET /flags/<code>.svg        SVG flag of a listed country, like FLAG_BASE_URL
+
+The list comes from the on-disk cache (or the bundled snapshot) and is
+revalidated against API_URL periodically. Flags are served from the shared
+flag pack and downloaded from FLAG_BASE_URL on a miss. Responses carry
+ETags and are gzip-compressed for clients that accept it.
+
+Point the GUI at the service with:
+
+    COUNTRY_PICKER_API_URL=http://127.0.0.1:8765/countries
+    COUNTRY_PICKER_FLAG_BASE_URL=http://127.0.0.1:8765/flags
+"""
+
+import gzip
+import json
+import logging
+import re
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .cache import CachedCountries, load_country_cache, save_country_cache
+from .config import FLAG_CACHE_MAX_BYTES, FLAG_PACK_FILE
+from .data import download_countries, fetch_flag
+from .flagpack import FlagPack, flag_digest
+from .metrics import METRICS
+from .mirrors import Mirrors
+from .retry import CircuitBreakers, NegativeCache, RetryLaterError
+from .snapshot import Snapshot
+from .table import CountryTable
+from .utils import LRUCache, api_item
+
+# Memory budget for gzip-compressed flags kept for reuse (bytes)
+GZIP_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+# Seconds an idle keep-alive connection may hold a worker thread
+KEEP_ALIVE_TIMEOUT = 5
+
+_FLAG_PATH = re.compile(r"^/flags/([A-Za-z]{2})\.svg$")
+_COUNTRY_PATH = re.compile(r"^/countries/([A-Za-z]{2})$")
+
+
+class _Body(NamedTuple):
+    """
+    A response body with its ETag and gzip-compressed form.
+    """
+    data: bytes
+    gzipped: bytes
+    etag: str
+
+
+def _make_body(data: bytes, digest: Optional[bytes] = None) -> _Body:
+    """
+    Compress data and derive its ETag from digest (or a hash of data).
+    """
+    if digest is None:
+        digest = flag_digest(data)
+    return _Body(data, gzip.compress(data, mtime=0), f'"{digest.hex()}"')
+
+
+class _Dataset(NamedTuple):
+    """
+    Serialized country list, replaced as a whole when the list changes.
+    """
+    listing: CachedCountries
+    countries: _Body
+    by_code: Dict[str, _Body]
+
+
+def _build_dataset(listing: CachedCountries) -> _Dataset:
+    """
+    Serialize the list, in display order, and every single country in the
+    API's JSON shape.
+    """
+    records = [api_item(country) for country in CountryTable(listing.countries)]
+    by_code = {
+        record["alpha2Code"].lower(): _make_body(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        for record in records
+    }
+    payload = json.dumps(records, ensure_ascii=False).encode("utf-8")
+    return _Dataset(listing, _make_body(payload), by_code)
+
+
+class CountryService:
+    """
+    Dataset and flag access behind the HTTP handler. Thread-safe.
+    """
+
+    def __init__(self, listing: CachedCountries, pack: FlagPack) -> None:
+        """
+        Args:
+            listing (CachedCountries): Initial country list and its validators.
+            pack (FlagPack): Shared flag pack used as the flag cache.
+        """
+        self._dataset = _build_dataset(listing)
+        self.pack = pack
+        self.snapshot = Snapshot()
+        self.breakers = CircuitBreakers()
+        self.negative = NegativeCache()
+        self.mirrors = Mirrors()
+        self._gzipped_flags = LRUCache(GZIP_CACHE_MAX_BYTES)
+        self._gzip_lock = threading.Lock()
+        self._local = threading.local()  # one requests.Session per worker thread
+
+    @property
+    def dataset(self) -> _Dataset:
+        return self._dataset
+
+    def close(self) -> None:
+        """
+        Save the mirror statistics and close the snapshot and the flag pack.
+        Must only be called once no request is being handled.
+        """
+        self.mirrors.close()
+        self.snapshot.close()
+        self.pack.close()
+
+    def refresh(self) -> bool:
+        """
+        Revalidate the country list against API_URL.
+
+        Returns:
+            bool: True if the list changed.
+
+        Raises:
+            requests.RequestException: For network-related errors.
+            ValueError: If response JSON is invalid.
+            RetryLaterError: If the API host's circuit is open.
+        """
+        listing = download_countries(self._dataset.listing, breakers=self.breakers, mirrors=self.mirrors)
+        if listing is None:
+            return False
+        _save(listing)
+        self._dataset = _build_dataset(listing)
+        return True
+
+    def flag(self, alpha2_code: str) -> _Body:
+        """
+        Return the SVG flag of a country, downloading it on a cache miss.
+
+        Raises:
+            requests.RequestException: For network-related errors.
+            RetryLaterError: If the flag failed recently or the flag host is down.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+
+            session = self._local.session = requests.Session()
+        data = bytes(fetch_flag(
+            session, self.pack, alpha2_code, self.snapshot, self.breakers, self.negative, self.mirrors
+        ))
+
+        digest = flag_digest(data)
+        with self._gzip_lock:
+            body = self._gzipped_flags.get(digest)
+        if body is None:
+            body = _make_body(data, digest)
+            with self._gzip_lock:
+                self._gzipped_flags.put(digest, body, len(body.data) + len(body.gzipped))
+        return body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Routes requests to the server's CountryService.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    server: "CountryServer"
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def do_GET(self) -> None:
+        with METRICS.span("serve.request", path=self.path):
+            self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        with METRICS.span("serve.request", path=self.path):
+            self._respond(send_body=False)
+
+    def _respond(self, send_body: bool) -> None:
+        service = self.server.service
+        path = self.path.split("?", 1)[0]
+
+        if path == "/countries":
+            self._send_body(service.dataset.countries, "application/json", "no-cache", send_body)
+            return
+
+        match = _COUNTRY_PATH.match(path)
+        if match:
+            body = service.dataset.by_code.get(match.group(1).lower())
+            if body is None:
+                self._send_error(404, "Unknown country code", send_body)
+            else:
+                self._send_body(body, "application/json", "no-cache", send_body)
+            return
+
+        match = _FLAG_PATH.match(path)
+        if match:
+            # Only flags of listed countries are fetched and stored in the pack
+            code = match.group(1).lower()
+            if code not in service.dataset.by_code:
+                self._send_error(404, "Unknown country code", send_body)
+                return
+            try:
+                body = service.flag(code)
+            except RetryLaterError as e:
+                self._send_error(503, str(e), send_body, {"Retry-After": str(max(1, round(e.retry_in)))})
+                return
+            except Exception as e:
+                response = getattr(e, "response", None)
+                if response is not None and response.status_code in (404, 410):
+                    self._send_error(404, "Unknown flag", send_body)
+                else:
+                    logging.warning(f"Flag '{match.group(1)}' unavailable: {e}")
+                    self._send_error(502, "Flag server unavailable", send_body)
+                return
+            self._send_body(body, "image/svg+xml", "public, max-age=86400", send_body)
+            return
+
+        self._send_error(404, "Not found", send_body)
+
+    def _send_body(self, body: _Body, content_type: str, cache_control: str, send_body: bool) -> None:
+        """
+        Send body, gzip-compressed if accepted, or 304 if the client's copy is current.
+        """
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        # The compressed form is a different representation, so it gets its own ETag
+        etag = body.etag[:-1] + '-gzip"' if gzipped else body.etag
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            self._send(304, b"", None, headers, send_body)
+            return
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+        self._send(200, body.gzipped if gzipped else body.data, content_type, headers, send_body)
+
+    def _send_error(self, status: int, message: str, send_body: bool, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, message.encode("utf-8"), "text/plain; charset=utf-8", headers or {}, send_body)
+
+    def _send(
+        self,
+        status: int,
+        data: bytes,
+        content_type: Optional[str],
+        headers: Dict[str, str],
+        send_body: bool,
+    ) -> None:
+        METRICS.incr(f"serve.status.{status}")
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(data)
+
+
+class CountryServer(HTTPServer):
+    """
+    HTTP server handling connections on a fixed-size thread pool, and
+    revalidating the country list in the background.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        service: CountryService,
+        workers: int = 16,
+        refresh_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            address (Tuple[str, int]): Host and port to listen on; port 0 picks a free port.
+            service (CountryService): Dataset and flag access.
+            workers (int): Connections handled concurrently.
+            refresh_seconds (float | None): Interval between list revalidations, or None.
+        """
+        super().__init__(address, _Handler)
+        self.service = service
+        self.refresh_seconds = refresh_seconds
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="serve")
+        # Accepted connections not handled to the end yet, by their pool job
+        self._connections: Dict[Future, socket.socket] = {}
+        self._connections_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request: socket.socket, client_address) -> None:
+        with self._connections_lock:
+            future = self._pool.submit(self._process_request, request, client_address)
+            self._connections[future] = request
+        future.add_done_callback(self._forget_connection)
+
+    def _forget_connection(self, future: Future) -> None:
+        with self._connections_lock:
+            self._connections.pop(future, None)
+
+    def _process_request(self, request: socket.socket, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients dropping keep-alive connections are expected
+        logging.debug(f"Connection from {client_address} failed", exc_info=True)
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        if self.refresh_seconds and self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="serve-refresh", daemon=True)
+            self._refresher.start()
+        super().serve_forever(poll_interval)
+
+    def _refresh_loop(self) -> None:
+        while not self._stopped.wait(self.refresh_seconds):
+            try:
+                if self.service.refresh():
+                    logging.info(f"Country list updated: {len(self.service.dataset.listing.countries)} countries")
+            except Exception as e:
+                logging.warning(f"Revalidating the country list failed: {e}")
+
+    def server_close(self) -> None:
+        """
+        Stop accepting connections, close the ones still queued, wait for the
+        handlers and the list revalidation still running, then close the
+        service. Call shutdown() first if serve_forever() runs in another thread.
+        """
+        self._stopped.set()
+        super().server_close()
+        with self._connections_lock:
+            connections = list(self._connections.items())
+        for future, request in connections:
+            if future.cancel():
+                # Accepted but never handled; closing it tells the client at once
+                self.shutdown_request(request)
+        # Running handlers use the service until they return, at the latest
+        # KEEP_ALIVE_TIMEOUT after their client went quiet
+        self._pool.shutdown(wait=True)
+        if self._refresher is not None:
+            self._refresher.join()
+        self.service.close()
+
+
+def _save(listing: CachedCountries) -> None:
+    """
+    Store a downloaded list in the cache shared with the GUI.
+    """
+    try:
+        save_country_cache(*listing)
+    except OSError as e:
+        logging.warning(f"Could not write country cache: {e}")
+
+
+def load_listing() -> Optional[CachedCountries]:
+    """
+    Return the country list with its validators from the cache, else the
+    bundled snapshot, else the API. Returns None if none is available.
+    """
+    cached = load_country_cache()
+    if cached is None:
+        snapshot = Snapshot()
+        cached = snapshot.countries()
+        snapshot.close()
+    if cached is not None:
+        return cached
+
+    try:
+        cached = download_countries()
+    except Exception as e:
+        logging.error(f"Cannot load the country list: {e}")
+        return None
+    _save(cached)
+    return cached
+
+
+def create_server(host: str, port: int, workers: int, refresh_seconds: Optional[float]) -> Optional[CountryServer]:
+    """
+    Load the dataset, open the shared flag pack and bind the server.
+
+    Returns:
+        CountryServer | None: The server, not yet serving, or None if no country list is available.
+
+    Raises:
+        OSError: If the address cannot be bound or the flag pack cannot be opened.
+    """
+    listing = load_listing()
+    if listing is None:
+        return None
+    service = CountryService(listing, FlagPack(FLAG_PACK_FILE, FLAG_CACHE_MAX_BYTES))
+    try:
+        return CountryServer((host, port), service, workers, refresh_seconds)
+    except OSError:
+        service.close()
+        raise
@@ -0,0 +1,120 @@
+"""
+Offline snapshot of the country list and all flags, bundled with the package.
+
+The snapshot is a deflate-compressed zip archive:
+
+    countries.json      the country list, in the same format as the on-disk cache
+    flags/<code>.svg    one SVG flag per country
+
+When nothing is cached yet the app starts from the snapshot, so a first
+launch needs no network access. The list is then revalidated in the
+background using the ETag / Last-Modified recorded at build time.
+"""
+
+import json
+import os
+import threading
+import zipfile
+from typing import Mapping, Optional
+
+from .cache import CachedCountries, decode_country_cache, encode_country_cache
+from .config import SNAPSHOT_FILE
+
+_COUNTRIES_MEMBER = "countries.json"
+_FLAG_MEMBER = "flags/{}.svg"
+
+
+class Snapshot:
+    """
+    Read access to a snapshot archive. The archive is opened on first use and
+    a missing or damaged file behaves like an empty snapshot. Safe to share
+    between threads.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_FILE) -> None:
+        """
+        Args:
+            path (str): Location of the snapshot archive.
+        """
+        self.path = path
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._unavailable = False
+        self._lock = threading.Lock()
+
+    def _read(self, member: str) -> Optional[bytes]:
+        """
+        Return the content of an archive member, or None if it does not exist
+        or the archive cannot be read.
+        """
+        with self._lock:
+            if self._archive is None and not self._unavailable:
+                try:
+                    self._archive = zipfile.ZipFile(self.path)
+                except (OSError, zipfile.BadZipFile):
+                    self._unavailable = True
+            if self._archive is None:
+                return None
+            try:
+                return self._archive.read(member)
+            except (KeyError, OSError, zipfile.BadZipFile):
+                return None
+
+    def countries(self) -> Optional[CachedCountries]:
+        """
+        Return the bundled country list with its HTTP validators, or None if
+        the snapshot is missing or unreadable.
+        """
+        data = self._read(_COUNTRIES_MEMBER)
+        if data is None:
+            return None
+        try:
+            return decode_country_cache(json.loads(data))
+        except ValueError:
+            return None
+
+    def flag(self, alpha2_code: str) -> Optional[bytes]:
+        """
+        Return the bundled SVG flag of a country, or None if it is not included.
+
+        Args:
+            alpha2_code (str): Alpha2 code of the country.
+        """
+        return self._read(_FLAG_MEMBER.format(alpha2_code.lower()))
+
+    def close(self) -> None:
+        """
+        Close the archive file.
+        """
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+
+def write_snapshot(
+    path: str,
+    listing: CachedCountries,
+    flags: Mapping[str, bytes],
+) -> None:
+    """
+    Atomically write a snapshot archive.
+
+    Args:
+        path (str): Destination of the archive.
+        listing (CachedCountries): Country list and the validators of its response.
+        flags (Mapping[str, bytes]): SVG document per alpha2 code.
+
+    Raises:
+        OSError: If the archive cannot be written.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    payload = encode_country_cache(listing.countries, listing.etag, listing.last_modified)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        archive.writestr(_COUNTRIES_MEMBER, json.dumps(payload, ensure_ascii=False))
+        for code in sorted(flags):
+            archive.writestr(_FLAG_MEMBER.format(code.lower()), flags[code])
+    os.replace(tmp_path, path)
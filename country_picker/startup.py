@@ -0,0 +1,56 @@
+"""
+Startup phase timing for --profile-startup.
+
+This module must stay free of Qt and network imports: it is loaded before
+them so that their cost shows up in the "imports" phase.
+"""
+
+import json
+import logging
+import sys
+import time
+from typing import Dict, TextIO
+
+# Phases reported by the application, in the order they normally complete
+STARTUP_PHASES = ("imports", "qapplication", "first_paint", "first_data")
+
+
+class StartupProfiler:
+    """
+    Records the time at which each startup phase completed, in milliseconds
+    since the profiler was created (at the top of main()).
+
+    Interpreter startup before main() is not included; a launcher timing the
+    whole process can add it from its own clock.
+    """
+
+    def __init__(self) -> None:
+        self._origin = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.reported = False
+
+    def mark(self, phase: str) -> None:
+        """
+        Record that phase completed now. Only the first mark of a phase counts.
+
+        Args:
+            phase (str): One of STARTUP_PHASES.
+        """
+        self.phases.setdefault(phase, round((time.perf_counter() - self._origin) * 1000, 1))
+
+    def report(self, stream: TextIO | None = None) -> None:
+        """
+        Write the timings once, as a single JSON line, to stream (stderr by
+        default) and to the log. Missing phases (e.g. no data because the
+        network is down) are reported as null.
+
+        Args:
+            stream (TextIO | None): Destination of the JSON line.
+        """
+        if self.reported:
+            return
+        self.reported = True
+        timings = {phase: self.phases.get(phase) for phase in STARTUP_PHASES}
+        line = json.dumps({"startup_ms": timings})
+        print(line, file=stream or sys.stderr, flush=True)
+        logging.info(f"Startup timings: {line}")
@@ -0,0 +1,282 @@
+"""
+Compact, columnar in-memory table of countries.
+"""
+
+import heapq
+import sys
+from array import array
+from itertools import repeat
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .search import normalize
+from .utils import Country
+
+# Alpha2 and alpha3 codes are stored back to back in byte buffers
+_CODE_WIDTH = 2
+_ALPHA3_WIDTH = 3
+
+
+def collation_key(name: str) -> str:
+    """
+    Return the key countries are sorted by: the name with accents, case and
+    punctuation folded (so "Åland Islands" sorts under A), then the name
+    itself to order names that fold the same.
+
+    This is deliberately independent of the process locale, so the app,
+    the headless commands and the local server list countries identically.
+    """
+    return f"{normalize(name)}\0{name}"
+
+
+class CountryTable:
+    """
+    Immutable list of countries, sorted by collation_key of their names and
+    stored column by column.
+
+    Names and capitals are interned strings, codes are packed into byte
+    buffers, regions and subregions are stored as small integer ids into a
+    shared vocabulary, and populations in an unsigned array. The collation
+    keys are computed once, so sorting and merging never recompute them.
+    Rows are indexed by region; the code-to-row index is built on first use.
+    """
+
+    def __init__(
+        self, records: Iterable[Sequence] = (), presorted: bool = False, keys: Optional[List[str]] = None
+    ) -> None:
+        """
+        Args:
+            records (Iterable[Sequence]): Country records, or (country_name,
+                alpha2_code, ...) tuples with the remaining fields omitted.
+            presorted (bool): True if records are already in collation order.
+            keys (Optional[List[str]]): collation_key of each record's name, if
+                already known; computed otherwise.
+        """
+        countries = [r if isinstance(r, Country) else Country(*r) for r in records]
+        if keys is None:
+            keys = [collation_key(c.name) for c in countries]
+        elif len(keys) != len(countries):
+            raise ValueError(f"Got {len(keys)} collation keys for {len(countries)} records")
+        else:
+            keys = list(keys)
+        if not presorted:
+            order = sorted(range(len(countries)), key=keys.__getitem__)
+            countries = [countries[i] for i in order]
+            keys = [keys[i] for i in order]
+        self._build(countries, keys)
+
+    @classmethod
+    def _from_sorted(cls, countries: List[Country], keys: List[str]) -> "CountryTable":
+        table = cls.__new__(cls)
+        table._build(countries, keys)
+        return table
+
+    def _build(self, countries: List[Country], keys: List[str]) -> None:
+        intern = sys.intern
+        self._keys = keys
+        self._names = [intern(c.name) for c in countries]
+        self._capitals = [intern(c.capital) for c in countries]
+        self._codes = b"".join(
+            c.alpha2.lower().encode("ascii", "replace")[:_CODE_WIDTH].ljust(_CODE_WIDTH) for c in countries
+        )
+        self._alpha3 = b"".join(
+            c.alpha3.upper().encode("ascii", "replace")[:_ALPHA3_WIDTH].ljust(_ALPHA3_WIDTH) for c in countries
+        )
+        self._population = array("Q", (max(0, c.population) for c in countries))
+
+        # Dictionary-encoded region columns; id 0 is the empty string
+        self._vocabulary: List[str] = [""]
+        ids: Dict[str, int] = {"": 0}
+
+        def encode(value: str) -> int:
+            value_id = ids.get(value)
+            if value_id is None:
+                value_id = ids[value] = len(self._vocabulary)
+                self._vocabulary.append(intern(value))
+            return value_id
+
+        self._region_ids = array("H", (encode(c.region) for c in countries))
+        self._subregion_ids = array("H", (encode(c.subregion) for c in countries))
+        self._index_regions()
+
+    def _index_regions(self) -> None:
+        """
+        Build the region index from the region column, and reset the code index.
+        """
+        self._rows_by_region: Dict[str, array] = {}
+        for row, region_id in enumerate(self._region_ids):
+            region = self._vocabulary[region_id]
+            rows = self._rows_by_region.get(region)
+            if rows is None:
+                rows = self._rows_by_region[region] = array("I")
+            rows.append(row)
+        self._rows: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[Country]:
+        for row in range(len(self._names)):
+            yield self.record(row)
+
+    @property
+    def keys(self) -> List[str]:
+        """
+        Collation keys of all rows, in order. Must not be modified.
+        """
+        return self._keys
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Display names of all rows, in order. Must not be modified.
+        """
+        return self._names
+
+    def name(self, row: int) -> str:
+        """
+        Return the country name stored at row.
+        """
+        return self._names[row]
+
+    def code(self, row: int) -> str:
+        """
+        Return the lowercase alpha2 code stored at row.
+        """
+        start = row * _CODE_WIDTH
+        return self._codes[start:start + _CODE_WIDTH].decode("ascii").rstrip()
+
+    def codes(self) -> List[str]:
+        """
+        Return the lowercase alpha2 codes of all rows, in order.
+        """
+        codes = self._codes.decode("ascii")
+        return [codes[start:start + _CODE_WIDTH].rstrip() for start in range(0, len(codes), _CODE_WIDTH)]
+
+    def region(self, row: int) -> str:
+        """
+        Return the region of the country at row, or "" if unknown.
+        """
+        return self._vocabulary[self._region_ids[row]]
+
+    def population(self, row: int) -> int:
+        """
+        Return the population of the country at row, or 0 if unknown.
+        """
+        return self._population[row]
+
+    def record(self, row: int) -> Country:
+        """
+        Return all fields of the country stored at row.
+        """
+        start = row * _ALPHA3_WIDTH
+        return Country(
+            self._names[row],
+            self.code(row),
+            self._alpha3[start:start + _ALPHA3_WIDTH].decode("ascii").rstrip(),
+            self._vocabulary[self._region_ids[row]],
+            self._vocabulary[self._subregion_ids[row]],
+            self._population[row],
+            self._capitals[row],
+        )
+
+    def row_of_code(self, alpha2_code: str) -> Optional[int]:
+        """
+        Return the row of the country with the given alpha2 code, or None.
+        """
+        if self._rows is None:
+            self._rows = {self.code(row): row for row in range(len(self._names))}
+        return self._rows.get(alpha2_code.lower())
+
+    def regions(self) -> List[str]:
+        """
+        Return the distinct non-empty regions, in alphabetical order.
+        """
+        return sorted(region for region in self._rows_by_region if region)
+
+    def rows_in_region(self, region: str) -> Sequence[int]:
+        """
+        Return the rows of the countries in region, in display order.
+        """
+        return self._rows_by_region.get(region, array("I"))
+
+    def filter(
+        self,
+        region: Optional[str] = None,
+        subregion: Optional[str] = None,
+        min_population: int = 0,
+        predicate: Optional[Callable[[int], bool]] = None,
+    ) -> List[int]:
+        """
+        Return the rows matching all given criteria, in display order.
+
+        The region index narrows the candidates before the other criteria
+        are checked against their columns.
+
+        Args:
+            region (str | None): Only countries in this region.
+            subregion (str | None): Only countries in this subregion.
+            min_population (int): Only countries with at least this population.
+            predicate (Callable[[int], bool] | None): Additional test on each row.
+
+        Returns:
+            List[int]: Matching rows.
+        """
+        rows: Iterable[int] = self.rows_in_region(region) if region is not None else range(len(self))
+        if subregion is not None:
+            subregion_id = self._vocabulary.index(subregion) if subregion in self._vocabulary else -1
+            rows = [r for r in rows if self._subregion_ids[r] == subregion_id]
+        if min_population:
+            rows = [r for r in rows if self._population[r] >= min_population]
+        if predicate is not None:
+            rows = [r for r in rows if predicate(r)]
+        return list(rows)
+
+    def merge(self, records: Iterable[Sequence]) -> "CountryTable":
+        """
+        Return a new table holding this table's countries and records.
+
+        Only the new records are sorted; the columns of both tables are then
+        merged in linear time using the stored collation keys, without
+        creating Country records or re-encoding the existing rows.
+
+        Args:
+            records (Iterable[Sequence]): Additional records, in any order.
+        """
+        added = CountryTable(records)
+        # (key, source table, row) in merged order; 0 is self, 1 is added
+        merged = list(heapq.merge(
+            zip(self._keys, repeat(0), range(len(self))),
+            zip(added._keys, repeat(1), range(len(added))),
+        ))
+
+        def pick(columns: tuple) -> list:
+            return [columns[source][row] for _key, source, row in merged]
+
+        def pick_bytes(columns: tuple, width: int) -> bytes:
+            return b"".join(columns[source][row * width:(row + 1) * width] for _key, source, row in merged)
+
+        # Region ids of the added rows, translated to the merged vocabulary
+        vocabulary = list(self._vocabulary)
+        ids = {value: value_id for value_id, value in enumerate(vocabulary)}
+        translate = array("H")
+        for value in added._vocabulary:
+            value_id = ids.get(value)
+            if value_id is None:
+                value_id = ids[value] = len(vocabulary)
+                vocabulary.append(value)
+            translate.append(value_id)
+        added_regions = array("H", (translate[value_id] for value_id in added._region_ids))
+        added_subregions = array("H", (translate[value_id] for value_id in added._subregion_ids))
+
+        table = CountryTable.__new__(CountryTable)
+        table._keys = [key for key, _source, _row in merged]
+        table._names = pick((self._names, added._names))
+        table._capitals = pick((self._capitals, added._capitals))
+        table._codes = pick_bytes((self._codes, added._codes), _CODE_WIDTH)
+        table._alpha3 = pick_bytes((self._alpha3, added._alpha3), _ALPHA3_WIDTH)
+        table._population = array("Q", pick((self._population, added._population)))
+        table._vocabulary = vocabulary
+        table._region_ids = array("H", pick((self._region_ids, added_regions)))
+        table._subregion_ids = array("H", pick((self._subregion_ids, added_subregions)))
+        table._index_regions()
+        return table
@@ -1,56 +1,217 @@
-import os
+import logging
+import queue
+from contextlib import nullcontext
+from typing import Hashable
 from PyQt6.QtCore import QThread, pyqtSignal
-import requests
+from PyQt6.QtGui import QImage
 
-from .data import fetch_countries
-from .config import FLAG_BASE_URL, FLAG_FOLDER
+from .cache import load_country_cache
+from .config import FLAG_CACHE_MAX_BYTES, FLAG_PACK_FILE
+from .data import fetch_flag, revalidate_countries
+from .flagpack import FlagPack
+from .metrics import METRICS
+from .mirrors import Mirrors
+from .prefetch import PrefetchScheduler
+from .retry import CircuitBreakers, NegativeCache
+from .snapshot import Snapshot
 
 
 class CountryFetchThread(QThread):
     """
     Thread to fetch the list of countries from the network API.
-    Runs fetch_countries() and emits signals on success or failure.
+
+    Uses stale-while-revalidate: a cached list (or, on a first start, the
+    list bundled in the package snapshot) is emitted straight away, then
+    the API is asked whether it changed. `finished` is emitted a second time
+    only if the server returned a new list. Errors are only reported when
+    there was nothing cached to show. On a cold start, `batch` delivers the
+    records while the response is still downloading.
     """
-    finished = pyqtSignal(list)  # emits list of (country_name, alpha2_code) tuples
+    finished = pyqtSignal(list)  # emits list of Country records, in response order
+    batch = pyqtSignal(list)     # emits records parsed so far on a cold start, unsorted
     error = pyqtSignal(str)      # emits error message string
 
+    def __init__(self, breakers: CircuitBreakers | None = None, mirrors: Mirrors | None = None) -> None:
+        """
+        Args:
+            breakers: Circuit breakers shared with the other fetch paths.
+            mirrors: Mirror statistics shared with the other fetch paths.
+        """
+        super().__init__()
+        self.breakers = breakers
+        self.mirrors = mirrors
+
     def run(self) -> None:
+        cached = load_country_cache()
+        if cached is None:
+            snapshot = Snapshot()
+            cached = snapshot.countries()
+            snapshot.close()
+        if cached is not None:
+            self.finished.emit(cached.countries)
+
         try:
-            countries = fetch_countries()
-            self.finished.emit(countries)
+            # Fill the UI progressively only when there is no cached list on screen
+            countries = revalidate_countries(
+                cached, self.batch.emit if cached is None else None, self.breakers, self.mirrors
+            )
+            if countries is not None:
+                self.finished.emit(countries)
         except Exception as e:
-            self.error.emit(str(e))
+            if cached is None:
+                self.error.emit(str(e))
+            else:
+                METRICS.incr("countries.revalidate_failed")
+                logging.warning(f"Revalidating cached countries failed: {e}")
 
 
-class FlagFetchThread(QThread):
+class FlagFetchWorker(QThread):
     """
-    Thread to fetch the flag image (SVG) of a selected country by its alpha2 code.
-    Saves the flag locally and emits the local path once done.
+    Long-lived network worker fetching and rendering flag images by alpha2 code.
+
+    Jobs are queued with request() and never block the caller. The worker owns
+    a pooled requests.Session so connections to the flag server are kept alive.
+    Each job has an owner (the picker that asked for it). When one owner has
+    several jobs pending only the newest is served, since its older
+    selections are no longer visible; the jobs of different owners are all
+    served, in the order they were first queued, and pending jobs for a flag
+    that was just delivered are dropped, since every picker receives it.
+    Jobs are handled one at a time, so a repeated request for a code that is
+    being downloaded waits for that download and is then served from the
+    flag pack. Flags missing from the pack are copied from the bundled
+    snapshot before trying the network.
+
+    Downloads go through the shared per-host circuit breakers, and codes whose
+    download returned 404 or timed out are kept in a negative cache for
+    FLAG_NEGATIVE_TTL_SECONDS, so selecting them again fails immediately.
+    With mirrors, downloads go to the fastest flag mirror and are hedged
+    with the others. With a prefetcher, prefetching pauses while a job is
+    served, and a job for a flag being prefetched waits for that download.
+
+    The SVG is rasterized here, at the requested size and device pixel ratio,
+    so the GUI thread only has to turn the finished image into a pixmap.
+
+    requests and QtSvg are imported by the worker itself when it starts,
+    keeping them off the GUI thread's startup path.
     """
-    finished = pyqtSignal(str)  # emits local path to saved flag file, or empty string if failed
+    flag_ready = pyqtSignal(str, QImage)  # emits alpha2 code and rendered flag, or a null image if failed
 
-    def __init__(self, alpha2_code: str):
+    def __init__(
+        self,
+        breakers: CircuitBreakers | None = None,
+        mirrors: Mirrors | None = None,
+        prefetcher: PrefetchScheduler | None = None,
+    ) -> None:
+        """
+        Args:
+            breakers: Circuit breakers shared with the other fetch paths.
+            mirrors: Mirror statistics shared with the other fetch paths.
+            prefetcher: Prefetch scheduler giving way to this worker's jobs.
+        """
         super().__init__()
-        self.alpha2_code = alpha2_code.lower()
+        self.prefetcher = prefetcher
+        self.session = None  # created by run(), once requests is imported
+        self.pack: FlagPack | None = None
+        self.snapshot = Snapshot()
+        self.breakers = breakers
+        self.mirrors = mirrors
+        # Shared with the prefetcher, so neither retries a flag the other found missing
+        self.negative = prefetcher.negative if prefetcher is not None else NegativeCache()
+        self._jobs: queue.Queue[tuple[Hashable, tuple[str, int, int, float]] | None] = queue.Queue()
+        # Newest job of each owner, moved from _jobs by the worker thread only
+        self._pending: dict[Hashable, tuple[str, int, int, float]] = {}
+
+    def request(
+        self, alpha2_code: str, width: int, height: int, device_pixel_ratio: float, owner: Hashable = None
+    ) -> None:
+        """
+        Queue a flag fetch; the result is delivered through flag_ready.
+
+        Args:
+            alpha2_code: Alpha2 code of the country.
+            width: Width of the flag in logical pixels.
+            height: Height of the flag in logical pixels.
+            device_pixel_ratio: Device pixel ratio of the screen showing the flag.
+            owner: Requester; a newer job of the same owner replaces this one.
+        """
+        self._jobs.put((owner, (alpha2_code.lower(), width, height, device_pixel_ratio)))
+
+    def stop(self) -> None:
+        """
+        Ask the worker to exit and abort pooled connections.
+        """
+        self._jobs.put(None)
+        session = self.session
+        if session is not None:
+            session.close()
+
+    def _drain(self, block: bool) -> bool:
+        """
+        Move queued jobs to the pending jobs, keeping each owner's newest.
+        With block, wait for at least one job. Returns False when the
+        worker must stop.
+        """
+        while True:
+            try:
+                item = self._jobs.get(block)
+            except queue.Empty:
+                return True
+            if item is None:
+                return False
+            owner, job = item
+            self._pending[owner] = job
+            block = False
+
+    def _next_job(self) -> tuple[str, int, int, float] | None:
+        """
+        Block until a job is available and return the pending job of the
+        owner that has waited longest. Returns None when the worker must stop.
+        """
+        if not self._drain(block=not self._pending):
+            return None
+        return self._pending.pop(next(iter(self._pending)))
+
+    def _served(self, job: tuple[str, int, int, float]) -> None:
+        """
+        Drop the pending jobs answered by the flag_ready just emitted for job.
+        """
+        if not self._drain(block=False):
+            self._jobs.put(None)  # Seen by the next _next_job
+        for owner in [owner for owner, pending in self._pending.items() if pending == job]:
+            del self._pending[owner]
 
     def run(self) -> None:
+        import requests
+        from .render import render_svg
+
+        self.session = requests.Session()
         try:
-            # Ensure the flag folder exists
-            if not os.path.exists(FLAG_FOLDER):
-                os.makedirs(FLAG_FOLDER, exist_ok=True)
-
-            filename = f"{self.alpha2_code}.svg"
-            local_path = os.path.join(FLAG_FOLDER, filename)
-
-            # Download flag only if not already cached
-            if not os.path.isfile(local_path):
-                url = f"{FLAG_BASE_URL}/{self.alpha2_code}.svg"
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                with open(local_path, "wb") as f:
-                    f.write(response.content)
-
-            self.finished.emit(local_path)
-        except Exception:
-            # On failure, emit empty string to indicate no flag available
-            self.finished.emit("")
+            self.pack = FlagPack(FLAG_PACK_FILE, FLAG_CACHE_MAX_BYTES)
+        except OSError as e:
+            logging.error(f"Cannot open flag pack '{FLAG_PACK_FILE}': {e}")
+
+        while True:
+            job = self._next_job()
+            if job is None:
+                self.snapshot.close()
+                if self.pack is not None:
+                    self.pack.close()
+                return
+
+            code, width, height, device_pixel_ratio = job
+            try:
+                if self.pack is None:
+                    raise OSError("flag pack unavailable")
+                with self.prefetcher.selection(code) if self.prefetcher is not None else nullcontext():
+                    svg = fetch_flag(
+                        self.session, self.pack, code, self.snapshot, self.breakers, self.negative, self.mirrors
+                    )
+                with METRICS.span("flag.render", code=code, width=width, height=height):
+                    image = render_svg(svg, width, height, device_pixel_ratio)
+            except Exception as e:
+                # On failure, emit a null image to indicate no flag available
+                METRICS.incr("flag.unavailable")
+                logging.info(f"Flag for '{code}' unavailable ({type(e).__name__}): {e}")
+                image = QImage()
+            self.flag_ready.emit(code, image)
+            self._served(job)
@@ -1,7 +1,8 @@
 import os
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QLabel
-from PyQt6.QtGui import QFont, QIcon
-from PyQt6.QtCore import Qt
+import time
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QCompleter, QLabel
+from PyQt6.QtGui import QFont, QIcon, QImage, QPixmap, QShowEvent
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 
 from .config import (
     INITIAL_LABEL_PLACEHOLDER,
@@ -9,38 +10,94 @@ from .config import (
     COMBOBOX_SELECT_TEXT,
     COMBOBOX_NO_COUNTRIES_TEXT,
     COMBOBOX_ERROR_TEXT,
+    COMBOBOX_MIN_CONTENTS_LENGTH,
+    PREFETCH_NEIGHBORS,
+    REGION_FILTER_ALL_TEXT,
 )
+from .catalog import CountryCatalog, build_search_index
+from .metrics import METRICS
+from .models import CountryListModel, RowFilterProxyModel
+from .prefetch import PRIORITY_HIGHLIGHT
+from .search import SearchIndex
+from .table import CountryTable
+from .utils import Country
 
 
-class CountryPickerUI(QWidget):
+class CountryPickerWidget(QWidget):
     """
-    Main UI Widget containing the combo box, flag label, country name label,
-    and a retry countdown label.
+    Embeddable country picker: the combo box with its region filter, the
+    selected country's name and flag, and a retry countdown label.
 
     The layout places the combo box at the top and a horizontal layout below it
     with the selected country name and its flag icon.
+
+    Any number of pickers can be shown at once. They all follow one
+    CountryCatalog, which holds the country list, its search index and the
+    rendered flags and does all fetching; each picker keeps only its own
+    selection, region filter and list model over the shared table. The
+    first picker shown starts the catalog.
     """
+    country_changed = pyqtSignal(object)  # emits the selected Country, or None
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(
+        self, catalog: CountryCatalog | None = None, autostart: bool = True, parent: QWidget | None = None
+    ) -> None:
+        """
+        Args:
+            catalog (CountryCatalog | None): Catalog to follow; the
+                process-wide one by default.
+            autostart (bool): Start the catalog once the picker is first
+                shown; with False, the owner starts it.
+            parent (QWidget | None): Parent widget.
+        """
+        super().__init__(parent)
+        self.catalog = catalog if catalog is not None else CountryCatalog.instance()
+        self.autostart = autostart
 
-        self.setWindowTitle("Country Picker")
-        self.setMinimumSize(600, 250)
-
-        # Set custom window icon
-        icon_path = os.path.join(os.path.dirname(__file__), "resources", "icon.ico")
-        self.setWindowIcon(QIcon(icon_path))
+        # Code and time of the last selection whose flag is not shown yet
+        self.pending_selection: tuple[str, float] | None = None
 
         # Main vertical layout for the widget
         self.layout = QVBoxLayout(self)
 
-        # Setup ComboBox with initial loading text
+        # Setup ComboBox backed by a lazily served country model; status texts
+        # (loading, select, error) are shown as placeholder text
         self.combobox = QComboBox(self)
         combo_font = QFont()
         combo_font.setPointSize(14)
         self.combobox.setFont(combo_font)
-        self.combobox.setEditable(False)
-        self.combobox.addItem(COMBOBOX_LOADING_TEXT)
+        self.country_model = CountryListModel(self)
+        self.combobox.setModel(self.country_model)
+
+        # Uniform item sizes let the popup lay out only the visible rows, and a
+        # fixed minimum contents length avoids measuring every country name
+        self.combobox.view().setUniformItemSizes(True)
+        self.combobox.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToMinimumContentsLengthWithIcon)
+        self.combobox.setMinimumContentsLength(COMBOBOX_MIN_CONTENTS_LENGTH)
+
+        # Editable combobox with type-to-search: each keystroke queries the
+        # search index and the completer popup shows the matching rows
+        self.combobox.setEditable(True)
+        self.combobox.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.search_index: SearchIndex | None = None
+        self.search_model = RowFilterProxyModel(self)
+        self.search_model.setSourceModel(self.country_model)
+        self.completer = QCompleter(self.search_model, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.combobox.setCompleter(self.completer)
+        self.combobox.lineEdit().textEdited.connect(self.filter_countries)
+        self.combobox.lineEdit().returnPressed.connect(self.select_first_match)
+        self._set_status_text(COMBOBOX_LOADING_TEXT)
+
+        # Region filter next to the combobox; filtered-out rows are hidden in
+        # the popup and search results rather than removed from the model, so
+        # rows keep their numbers. Hidden until the list carries regions.
+        self.region_combobox = QComboBox(self)
+        self.region_combobox.setFont(combo_font)
+        self.region_combobox.addItem(REGION_FILTER_ALL_TEXT, None)
+        self.region_combobox.setVisible(False)
+        self.region_combobox.currentIndexChanged.connect(self.apply_region_filter)
+        self.region_rows: set[int] | None = None
 
         # Horizontal layout to hold flag and selected country text side by side
         flag_text_layout = QHBoxLayout()
@@ -51,6 +108,10 @@ class CountryPickerUI(QWidget):
         self.flag_label.setScaledContents(True)
         self.flag_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
+        # Rendered flags keyed by (alpha2, width, height, device pixel ratio),
+        # shared with the other pickers
+        self.flag_cache = self.catalog.flag_cache
+
         # Label to show the selected country name text
         self.text_label = QLabel(INITIAL_LABEL_PLACEHOLDER, self)
         text_font = QFont()
@@ -72,58 +133,317 @@ class CountryPickerUI(QWidget):
         self.retry_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         # Add widgets/layouts to main layout
-        self.layout.addWidget(self.combobox)
+        picker_layout = QHBoxLayout()
+        picker_layout.addWidget(self.region_combobox)
+        picker_layout.addWidget(self.combobox, 1)
+        self.layout.addLayout(picker_layout)
         self.layout.addLayout(flag_text_layout)
         self.layout.addWidget(self.retry_label)
 
-    def set_countries(self, countries: list[tuple[str, str]]) -> None:
+        # Follow the catalog, starting from what it already holds
+        self.combobox.currentIndexChanged.connect(self.on_country_selected)
+        self.combobox.activated.connect(self.on_country_chosen)
+        self.combobox.highlighted.connect(self.on_country_highlighted)
+        self.catalog.countries_changed.connect(self.on_countries_changed)
+        self.catalog.fetch_failed.connect(self.show_error_loading)
+        self.catalog.retry_countdown.connect(self.on_retry_countdown)
+        self.catalog.flag_ready.connect(self.on_flag_fetched)
+        if self.catalog.error is not None and not len(self.catalog.table):
+            self.show_error_loading()
+        elif len(self.catalog.table) or not self.catalog.loading:
+            self.on_countries_changed(self.catalog.table, self.catalog.loading)
+        self.update_retry_label(self.catalog.retry_seconds())
+
+    def showEvent(self, event: QShowEvent) -> None:
+        super().showEvent(event)
+        if self.autostart and not self.catalog.started:
+            # Return to the event loop first so the picker is painted
+            QTimer.singleShot(0, self.catalog.start)
+
+    def on_countries_changed(self, table: CountryTable, loading: bool) -> None:
         """
-        Populate the combo box with country names.
+        Show the catalog's countries, with its search index once complete.
 
         Args:
-            countries (list[tuple[str, str]]): List of (country_name, alpha2_code)
+            table (CountryTable): Country records.
+            loading (bool): True while more countries are still arriving.
         """
-        self.combobox.clear()
-        if not countries:
-            self.combobox.addItem(COMBOBOX_NO_COUNTRIES_TEXT)
+        self.set_countries(table, loading, None if loading else self.catalog.search_index)
+
+    def on_retry_countdown(self, seconds_remaining: int) -> None:
+        """
+        Show the catalog's retry countdown, or clear it when seconds_remaining is 0.
+        """
+        self.update_retry_label(seconds_remaining or None)
+
+    def set_countries(
+        self, table: CountryTable, loading: bool = False, search_index: SearchIndex | None = None
+    ) -> None:
+        """
+        Show the given countries in the combo box. Only the rows that differ
+        from the current list are inserted or removed; the selected country
+        stays selected if it is still listed, otherwise nothing is selected.
+
+        Args:
+            table (CountryTable): Country records.
+            loading (bool): True for a partial list while more countries arrive;
+                the list can be browsed but search is enabled only once complete.
+            search_index (SearchIndex | None): Search index over table, built
+                here if not given.
+        """
+        current = self.country_model.record(self.combobox.currentIndex())
+
+        # Search results refer to rows of the previous list
+        self.search_index = None
+        self.search_model.set_rows([])
+        self.country_model.update_table(table)
+
+        row = table.row_of_code(current.alpha2) if current is not None else None
+        self.combobox.setCurrentIndex(-1 if row is None else row)
+        self._set_regions(table.regions())
+        if loading:
+            self.combobox.setEnabled(True)
+            self._set_status_text(COMBOBOX_LOADING_TEXT)
+            return
+        if not len(table):
+            self._set_status_text(COMBOBOX_NO_COUNTRIES_TEXT)
             self.combobox.setEnabled(False)
             return
 
         self.combobox.setEnabled(True)
-        self.combobox.addItem(COMBOBOX_SELECT_TEXT)
-        for country, _alpha2 in countries:
-            self.combobox.addItem(country)
+        self._set_status_text(COMBOBOX_SELECT_TEXT)
+        self.search_index = search_index if search_index is not None else build_search_index(table)
+
+    def _set_regions(self, regions: list[str]) -> None:
+        """
+        Offer the given regions in the region filter, keeping the chosen
+        region if it is still offered, and apply the filter to the list.
+        """
+        chosen = self.region_combobox.currentData()
+        self.region_combobox.blockSignals(True)
+        self.region_combobox.clear()
+        self.region_combobox.addItem(REGION_FILTER_ALL_TEXT, None)
+        for region in regions:
+            self.region_combobox.addItem(region, region)
+        index = self.region_combobox.findData(chosen) if chosen is not None else 0
+        self.region_combobox.setCurrentIndex(max(index, 0))
+        self.region_combobox.blockSignals(False)
+        self.region_combobox.setVisible(bool(regions))
+        self.apply_region_filter()
+
+    def apply_region_filter(self) -> None:
+        """
+        Hide the countries outside the region chosen in the region filter
+        from the combobox popup and from search results.
+        """
+        region = self.region_combobox.currentData()
+        table = self.country_model.table
+        self.region_rows = None if region is None else set(table.filter(region=region))
+        view = self.combobox.view()
+        for row in range(len(table)):
+            view.setRowHidden(row, self.region_rows is not None and row not in self.region_rows)
+
+    def filter_countries(self, text: str) -> None:
+        """
+        Show the countries matching the typed text in the completer popup.
+        Matching ignores case and accents and includes alternative names.
+
+        Args:
+            text (str): Current text of the combobox editor.
+        """
+        if self.search_index is None:
+            return
+        rows = self.search_index.search(text)
+        if self.region_rows is not None:
+            rows = [row for row in rows if row in self.region_rows]
+        self.search_model.set_rows(rows)
+        if text:
+            self.completer.complete()
 
-    def show_error_loading(self) -> None:
+    def rows_around(self, row: int, count: int) -> list[int]:
+        """
+        Return row and up to count visible rows on either side of it,
+        nearest first, skipping rows hidden by the region filter.
+        """
+        view = self.combobox.view()
+        rows = [row]
+        above, below = row - 1, row + 1
+        while len(rows) < 2 * count + 1 and (above >= 0 or below < self.country_model.rowCount()):
+            for candidate in (below, above):
+                if 0 <= candidate < self.country_model.rowCount() and not view.isRowHidden(candidate):
+                    rows.append(candidate)
+            above, below = above - 1, below + 1
+        return rows[:2 * count + 1]
+
+    def select_first_match(self) -> None:
+        """
+        Select the best match for the typed text when Enter is pressed.
+        """
+        if self.search_model.rowCount() > 0:
+            row = self.search_model.mapToSource(self.search_model.index(0, 0)).row()
+            self.combobox.setCurrentIndex(row)
+            # Enter chooses the match just like clicking it in the popup
+            self.combobox.activated.emit(row)
+        self.combobox.setEditText(self.combobox.itemText(self.combobox.currentIndex()))
+
+    def show_error_loading(self, error_msg: str = "") -> None:
         """
         Show error message in combo box when loading countries fails.
         """
-        self.combobox.clear()
-        self.combobox.addItem(COMBOBOX_ERROR_TEXT)
+        self.country_model.set_table(CountryTable())
+        self._set_regions([])
+        self.search_index = None
+        self._set_status_text(COMBOBOX_ERROR_TEXT)
         self.combobox.setEnabled(False)
 
-    def update_label(self, country_name: str, flag_path: str | None) -> None:
+    def _set_status_text(self, text: str) -> None:
+        """
+        Show a status text in the combo box while no country is selected.
+        """
+        self.combobox.setPlaceholderText(text)
+        self.combobox.lineEdit().setPlaceholderText(text)
+
+    def current_country(self) -> Country | None:
+        """
+        Return the Country currently selected in the combobox,
+        or None if nothing is selected.
+        """
+        return self.country_model.record(self.combobox.currentIndex())
+
+    def select_code(self, alpha2_code: str) -> bool:
+        """
+        Select the country with the given alpha2 code, if it is listed.
+
+        Returns:
+            bool: True if the country is now selected.
+        """
+        row = self.country_model.table.row_of_code(alpha2_code)
+        if row is None:
+            return False
+        self.combobox.setCurrentIndex(row)
+        return True
+
+    def on_country_selected(self, index: int) -> None:
+        """
+        Handle user selecting a country from the combobox.
+
+        Args:
+            index: The selected index of the combobox.
+        """
+        current = self.current_country()
+        self.pending_selection = None
+        self.country_changed.emit(current)
+        if current is None:
+            # No valid selection
+            self.update_label("", None)
+            return
+
+        country_name, alpha2 = current.name, current.alpha2
+        # Show country name immediately, with the flag if it was rendered before
+        start = time.perf_counter()
+        if self.update_label(country_name, None, alpha2):
+            METRICS.incr("selection.pixmap_hit")
+            METRICS.observe("selection.flag_visible", (time.perf_counter() - start) * 1000, code=alpha2, cached=True)
+            return
+
+        # Queue the flag; never wait for a previous download on the GUI thread
+        self.pending_selection = (alpha2, start)
+        self.catalog.request_flag(alpha2, *self.flag_size(), owner=id(self))
+
+    def on_flag_fetched(self, alpha2: str, flag_image: QImage) -> None:
+        """
+        Show a fetched flag if its country is still the selected one.
+
+        Args:
+            alpha2: Alpha2 code the flag belongs to.
+            flag_image: Flag rendered by the worker, or a null image if unavailable.
+        """
+        current = self.current_country()
+        if current is None or current.alpha2 != alpha2:
+            return
+        # Another picker of the same size may have converted it already
+        shown = self.update_label(current.name, None, alpha2) or self.update_label(current.name, flag_image, alpha2)
+        if self.pending_selection is not None and self.pending_selection[0] == alpha2:
+            if shown:
+                elapsed = (time.perf_counter() - self.pending_selection[1]) * 1000
+                METRICS.observe("selection.flag_visible", elapsed, code=alpha2, cached=False)
+            self.pending_selection = None
+
+    def on_country_highlighted(self, row: int) -> None:
+        """
+        Prefetch the flags of the row highlighted in the open popup and of
+        its neighbors, replacing the previous highlight's pending prefetches.
+
+        Args:
+            row: The highlighted index of the combobox.
+        """
+        table = self.country_model.table
+        codes = [table.code(r) for r in self.rows_around(row, PREFETCH_NEIGHBORS)]
+        self.catalog.prefetch(codes, PRIORITY_HIGHLIGHT, replace=True)
+
+    def on_country_chosen(self, row: int) -> None:
+        """
+        Count a country chosen by the user in the selection history.
+
+        Args:
+            row: The chosen index of the combobox.
+        """
+        current = self.country_model.record(row)
+        if current is not None:
+            self.catalog.record_choice(current.alpha2)
+
+    def flag_size(self) -> tuple[int, int, float]:
+        """
+        Return the (width, height, device_pixel_ratio) flags must be rendered at.
+        """
+        return (
+            self.flag_label.width(),
+            self.flag_label.height(),
+            self.flag_label.devicePixelRatioF(),
+        )
+
+    def update_label(
+        self, country_name: str, flag_image: QImage | None, alpha2_code: str | None = None
+    ) -> bool:
         """
         Update the selected country label and display the flag icon.
 
+        Without an image, a flag rendered earlier for the same code, label size
+        and device pixel ratio is taken from the in-memory cache.
+
         Args:
             country_name (str): Name of the selected country.
-            flag_path (str | None): Local path to flag image (SVG or other).
+            flag_image (QImage | None): Flag rendered by the worker thread.
+            alpha2_code (str | None): Country code, used as the flag cache key.
+
+        Returns:
+            bool: True if a flag is displayed.
         """
         if not country_name:
             self.text_label.setText(INITIAL_LABEL_PLACEHOLDER)
             self.flag_label.clear()
-            return
+            return False
 
         # Display "Selected: <country_name>"
         self.text_label.setText(f"Selected: {country_name}")
 
-        if flag_path and os.path.exists(flag_path):
-            icon = QIcon(flag_path)
-            pixmap = icon.pixmap(self.flag_label.width(), self.flag_label.height())
-            self.flag_label.setPixmap(pixmap)
+        key = (alpha2_code, *self.flag_size()) if alpha2_code else None
+        if flag_image is None:
+            pixmap = self.flag_cache.get(key) if key is not None else None
+        elif not flag_image.isNull():
+            # Only the cheap image-to-pixmap conversion happens on the GUI thread
+            pixmap = QPixmap.fromImage(flag_image)
+            if key is not None:
+                self.flag_cache.put(key, pixmap, flag_image.sizeInBytes())
         else:
+            pixmap = None
+
+        if pixmap is None:
             self.flag_label.clear()
+            return False
+
+        self.flag_label.setPixmap(pixmap)
+        return True
 
     def update_retry_label(self, seconds_remaining: int | None) -> None:
         """
@@ -137,3 +457,26 @@ class CountryPickerUI(QWidget):
             self.retry_label.setText("")
         else:
             self.retry_label.setText(f"Retrying in {seconds_remaining} seconds...")
+
+
+class CountryPickerUI(CountryPickerWidget):
+    """
+    Main window of the application: one country picker with the window
+    title and icon. The application starts the catalog itself, after the
+    first paint.
+    """
+
+    def __init__(self, catalog: CountryCatalog | None = None) -> None:
+        """
+        Args:
+            catalog (CountryCatalog | None): Catalog to follow; the
+                process-wide one by default.
+        """
+        super().__init__(catalog, autostart=False)
+
+        self.setWindowTitle("Country Picker")
+        self.setMinimumSize(600, 250)
+
+        # Set custom window icon
+        icon_path = os.path.join(os.path.dirname(__file__), "resources", "icon.ico")
+        self.setWindowIcon(QIcon(icon_path))
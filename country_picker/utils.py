@@ -1,29 +1,256 @@
-from typing import List, Dict, Tuple
+import codecs
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 
-def parse_countries_json(json_data: List[Dict]) -> List[Tuple[str, str]]:
+class Country(NamedTuple):
     """
-    Parse the JSON response from the countries API into a sorted list of tuples.
+    One country as parsed from the API. Fields other than the name and the
+    lowercase alpha2 code are empty (or 0) if the API omitted them.
+    """
+    name: str
+    alpha2: str
+    alpha3: str = ""
+    region: str = ""
+    subregion: str = ""
+    population: int = 0
+    capital: str = ""
+
+
+# API field names of the Country fields, in order
+API_FIELDS = ("name", "alpha2Code", "alpha3Code", "region", "subregion", "population", "capital")
+
+
+def api_item(country: Country) -> Dict[str, Any]:
+    """
+    Return a country in the API's JSON shape, the inverse of _country_record.
+    """
+    return dict(zip(API_FIELDS, country))
 
-    Each tuple contains:
-        - country name (str)
-        - alpha2 country code (str, lowercase)
+
+def _country_record(item: Dict) -> Optional[Country]:
+    """
+    Extract the Country record from one API item, or None if the name or
+    alpha2 code is missing.
+    """
+    name = item.get("name")
+    # Support both 'alpha2Code' and 'alpha2' keys for alpha2 code
+    alpha2 = item.get("alpha2Code") or item.get("alpha2")
+
+    if not (name and alpha2):
+        return None
+    population = item.get("population")
+    return Country(
+        name,
+        alpha2.lower(),
+        str(item.get("alpha3Code") or ""),
+        str(item.get("region") or ""),
+        str(item.get("subregion") or ""),
+        population if isinstance(population, int) and population > 0 else 0,
+        str(item.get("capital") or ""),
+    )
+
+
+def parse_countries_json(json_data: List[Dict]) -> List[Country]:
+    """
+    Parse the JSON response from the countries API into a list of Country
+    records (name, lowercase alpha2 code and the optional fields).
 
     Args:
         json_data (List[Dict]): Raw JSON list of country data.
 
     Returns:
-        List[Tuple[str, str]]: List of (country_name, alpha2_code) sorted alphabetically by country name.
+        List[Country]: Records in response order, like iter_countries_json;
+            CountryTable sorts them once, by collation key.
     """
     countries = []
     for item in json_data:
-        name = item.get("name")
-        # Support both 'alpha2Code' and 'alpha2' keys for alpha2 code
-        alpha2 = item.get("alpha2Code") or item.get("alpha2")
+        record = _country_record(item)
+        if record is not None:
+            countries.append(record)
+    return countries
 
-        if name and alpha2:
-            countries.append((name, alpha2.lower()))
 
-    # Sort countries alphabetically by name
-    countries.sort(key=lambda x: x[0])
-    return countries
+def iter_countries_json(chunks: Iterable[bytes]) -> Iterator[Country]:
+    """
+    Incrementally parse a countries API response delivered in byte chunks.
+
+    Yields each Country record as soon as its JSON object
+    is complete, in response order (unsorted). Only the current unparsed tail
+    of the response is held in memory. Items are filtered exactly as in
+    parse_countries_json.
+
+    Args:
+        chunks (Iterable[bytes]): UTF-8 encoded JSON array, split arbitrarily.
+
+    Yields:
+        Country: Parsed records.
+
+    Raises:
+        ValueError: If the data is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    done = False
+
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        pos = 0
+        while not done:
+            # Skip whitespace and separators between items
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Countries JSON must be an array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                done = True
+                pos += 1
+                break
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # incomplete item, wait for more data
+            if isinstance(item, dict):
+                record = _country_record(item)
+                if record is not None:
+                    yield record
+        buffer = buffer[pos:]
+
+    buffer += text_decoder.decode(b"", final=True)
+    if not done or buffer.strip():
+        raise ValueError("Countries JSON is truncated or malformed")
+
+
+def row_changes(old: Sequence[Any], new: Sequence[Any]) -> List[Tuple[int, int, List[Any]]]:
+    """
+    Compute the row edits turning the sorted list old into the sorted list new.
+
+    Each edit is (start, removed, inserted): remove `removed` rows at start,
+    then insert the `inserted` items there. Edits are returned back to front,
+    so applying them in order never shifts the position of a later edit.
+
+    Both lists are merged in a single pass, so this takes linear time. Items
+    must be comparable; if the lists are not sorted the edits are still
+    correct, just not minimal.
+
+    Args:
+        old (Sequence[Any]): Current rows, sorted.
+        new (Sequence[Any]): Desired rows, sorted.
+
+    Returns:
+        List[Tuple[int, int, List[Any]]]: Edits; empty if the lists are equal.
+    """
+    edits: List[list] = []
+
+    def edit_at(position: int) -> list:
+        # Extend the last edit if it ends where this one starts
+        if edits and edits[-1][0] + edits[-1][1] == position:
+            return edits[-1]
+        edit = [position, 0, []]
+        edits.append(edit)
+        return edit
+
+    i = j = 0
+    while i < len(old) or j < len(new):
+        if i < len(old) and j < len(new) and old[i] == new[j]:
+            i += 1
+            j += 1
+        elif j == len(new) or (i < len(old) and old[i] < new[j]):
+            edit_at(i)[1] += 1
+            i += 1
+        else:
+            edit_at(i)[2].append(new[j])
+            j += 1
+
+    return [(start, removed, inserted) for start, removed, inserted in reversed(edits)]
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by the total cost of its entries.
+
+    Each entry carries a cost (e.g. its size in bytes); the least recently
+    used entries are evicted until the total fits in max_cost. Hit and miss
+    counters are kept for diagnostics.
+    """
+
+    def __init__(self, max_cost: int) -> None:
+        """
+        Args:
+            max_cost (int): Upper bound for the summed cost of all entries.
+        """
+        self.max_cost = max_cost
+        self.total_cost = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Return the cached value for key and mark it as recently used.
+
+        Args:
+            key (Hashable): Cache key.
+
+        Returns:
+            Any: The cached value, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, cost: int) -> None:
+        """
+        Insert or replace an entry, evicting old entries to stay within budget.
+        Values costing more than the whole budget are not cached.
+
+        Args:
+            key (Hashable): Cache key.
+            value (Any): Value to cache.
+            cost (int): Cost of the value, in the same unit as max_cost.
+        """
+        self.discard(key)
+        if cost > self.max_cost:
+            return
+        self._entries[key] = (value, cost)
+        self.total_cost += cost
+        while self.total_cost > self.max_cost:
+            _key, (_value, old_cost) = self._entries.popitem(last=False)
+            self.total_cost -= old_cost
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Remove an entry if present.
+
+        Args:
+            key (Hashable): Cache key.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_cost -= entry[1]
+
+    def clear(self) -> None:
+        """
+        Remove all entries; counters are kept.
+        """
+        self._entries.clear()
+        self.total_cost = 0
@@ -0,0 +1,151 @@
+"""
+Event loop responsiveness monitor.
+
+A heartbeat on the GUI thread (a QTimer in CountryPickerApp) calls
+StallWatchdog.beat every WATCHDOG_INTERVAL_MS, and each beat records how
+late it ran as the "loop.lag" timer. A background thread checks that beats
+keep arriving. When none has arrived for WATCHDOG_STALL_MS, the main thread
+is stuck in a long call. Its Python stack is then captured and logged while
+the stall is still in progress, so the log names the blocking call even if
+the loop never recovers. Once the loop recovers, the stall's duration is
+recorded in the "loop.stall" timer and in a histogram of counters
+("loop.stalls.lt_500ms", ..., "loop.stalls.ge_5000ms").
+
+The watchdog thread only wakes every half threshold and the heartbeat costs
+one timer event, so it is cheap enough to leave on. Like metrics.py, the
+module has no Qt imports; the caller drives beat().
+"""
+
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Dict, Optional, Sequence
+
+from .config import WATCHDOG_INTERVAL_MS, WATCHDOG_STALL_BUCKETS_MS, WATCHDOG_STALL_MS
+from .metrics import METRICS, MetricsRegistry
+
+_log = logging.getLogger(__name__)
+
+
+def stall_bucket(ms: float, buckets: Sequence[int] = WATCHDOG_STALL_BUCKETS_MS) -> str:
+    """
+    Return the histogram bucket of a stall duration, e.g. "lt_1000ms".
+    """
+    for bound in buckets:
+        if ms < bound:
+            return f"lt_{bound}ms"
+    return f"ge_{buckets[-1]}ms"
+
+
+class StallWatchdog:
+    """
+    Measures the lag of an event loop driven heartbeat and captures the
+    watched thread's stack when the loop stalls.
+    """
+
+    def __init__(
+        self,
+        interval_ms: float = WATCHDOG_INTERVAL_MS,
+        stall_ms: float = WATCHDOG_STALL_MS,
+        thread_id: Optional[int] = None,
+        registry: MetricsRegistry = METRICS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            interval_ms (float): Interval at which beat() is called.
+            stall_ms (float): Time without a beat after which the loop is stalled.
+            thread_id (int | None): Thread running the event loop, by default the main thread.
+            registry (MetricsRegistry): Registry the lag and stalls are recorded in.
+            clock (Callable[[], float]): Monotonic time source, in seconds.
+        """
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.registry = registry
+        self.clock = clock
+        self._last_beat = clock()
+        self._captured = False  # stack of the current stall already logged
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start watching. Beats are expected from now on.
+        """
+        if self._thread is not None:
+            return
+        with self._lock:
+            self._last_beat = self.clock()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the watchdog thread and log the stall histogram, if there were stalls.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        histogram = self.histogram()
+        if histogram:
+            _log.info(f"Event loop stalls (ms): {histogram}")
+
+    def histogram(self) -> Dict[str, int]:
+        """
+        Return the number of stalls per duration bucket, omitting empty buckets.
+        """
+        buckets = [f"lt_{bound}ms" for bound in WATCHDOG_STALL_BUCKETS_MS]
+        buckets.append(f"ge_{WATCHDOG_STALL_BUCKETS_MS[-1]}ms")
+        counts = {bucket: self.registry.counter(f"loop.stalls.{bucket}") for bucket in buckets}
+        return {bucket: count for bucket, count in counts.items() if count}
+
+    def beat(self) -> None:
+        """
+        Heartbeat, called by a timer on the watched event loop every interval_ms.
+        """
+        now = self.clock()
+        with self._lock:
+            gap_ms = (now - self._last_beat) * 1000
+            self._last_beat = now
+            captured, self._captured = self._captured, False
+        self.registry.sample("loop.lag", max(0.0, gap_ms - self.interval_ms))
+        if gap_ms >= self.stall_ms:
+            self.registry.incr(f"loop.stalls.{stall_bucket(gap_ms)}")
+            self.registry.observe("loop.stall", gap_ms, stack_captured=captured)
+            _log.warning(f"Event loop was unresponsive for {gap_ms:.0f} ms")
+
+    def check(self) -> bool:
+        """
+        Capture and log the watched thread's stack if the loop is stalled and
+        its stack was not captured yet during this stall. Called periodically
+        by the watchdog thread.
+
+        Returns:
+            bool: True if a stack was captured.
+        """
+        with self._lock:
+            last_beat = self._last_beat
+            if self._captured or (self.clock() - last_beat) * 1000 < self.stall_ms:
+                return False
+        frame = sys._current_frames().get(self.thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "  (no Python frame)\n"
+        del frame
+        with self._lock:
+            if self._last_beat != last_beat:
+                return False  # recovered while the stack was being taken
+            self._captured = True
+            blocked_ms = (self.clock() - last_beat) * 1000
+        self.registry.incr("loop.stacks_captured")
+        _log.warning(f"Event loop blocked for {blocked_ms:.0f} ms so far, main thread stack:\n{stack.rstrip()}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.stall_ms / 2000):
+            self.check()
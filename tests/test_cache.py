@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from country_picker.cache import load_country_cache, save_country_cache
+from country_picker.utils import Country
+
+
+class TestCountryCache(unittest.TestCase):
+    """
+    Unit tests for the on-disk country list cache
+    located in country_picker.cache.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache", "countries.json")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self) -> None:
+        """
+        Tests that a saved list and its validators are loaded back unchanged.
+        """
+        countries = [
+            Country("Côte d'Ivoire", "ci", "CIV", "Africa", "Western Africa", 26378275, "Yamoussoukro"),
+            Country("Switzerland", "ch"),
+        ]
+        save_country_cache(countries, '"abc"', "Wed, 21 Oct 2015 07:28:00 GMT", path=self.path)
+
+        cached = load_country_cache(self.path)
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached.countries, countries)
+        self.assertEqual(cached.etag, '"abc"')
+        self.assertEqual(cached.last_modified, "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["countries.json"])
+
+    def test_missing_file(self) -> None:
+        """
+        Tests that a missing cache file is reported as no cache.
+        """
+        self.assertIsNone(load_country_cache(self.path))
+
+    def test_corrupt_or_incompatible_file(self) -> None:
+        """
+        Tests that truncated files and files from another format version are ignored.
+        """
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"version": 1, "countries": [["Fra')
+        self.assertIsNone(load_country_cache(self.path))
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": -1, "countries": []}, f)
+        self.assertIsNone(load_country_cache(self.path))
+
+    def test_pairs_format_is_refetched(self) -> None:
+        """
+        Tests that a list cached as (name, alpha2) pairs is loaded without its
+        validators, so the full records are downloaded again.
+        """
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "etag": '"abc"', "countries": [["France", "fr"]]}, f)
+        cached = load_country_cache(self.path)
+        self.assertEqual(cached.countries, [Country("France", "fr")])
+        self.assertIsNone(cached.etag)
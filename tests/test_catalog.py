@@ -0,0 +1,150 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QThread
+from PyQt6.QtWidgets import QApplication
+
+from country_picker import catalog
+from country_picker.catalog import CountryCatalog, join_thread
+from country_picker.thread import CountryFetchThread, FlagFetchWorker
+from country_picker.ui import CountryPickerWidget
+from country_picker.utils import Country
+
+COUNTRIES = [
+    Country("Switzerland", "ch", region="Europe"),
+    Country("France", "fr", region="Europe"),
+    Country("Japan", "jp", region="Asia"),
+]
+
+
+class TestCountryCatalog(unittest.TestCase):
+    """
+    Unit tests for the CountryCatalog class located in country_picker.catalog,
+    and the pickers following it located in country_picker.ui.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self) -> None:
+        # Never started, so nothing goes to the network
+        self.catalog = CountryCatalog()
+
+    def tearDown(self) -> None:
+        self.catalog.stop()
+
+    def test_pickers_share_one_table(self) -> None:
+        """
+        Tests that pickers created before and after the list arrives show the
+        same table, search index and flag cache, and keep separate selections.
+        """
+        early = CountryPickerWidget(self.catalog, autostart=False)
+        self.catalog.on_countries_fetched(COUNTRIES)
+        late = CountryPickerWidget(self.catalog, autostart=False)
+
+        for picker in (early, late):
+            self.assertIs(picker.country_model.table, self.catalog.table)
+            self.assertIs(picker.search_index, self.catalog.search_index)
+            self.assertIs(picker.flag_cache, self.catalog.flag_cache)
+            self.assertTrue(picker.combobox.isEnabled())
+
+        selected = []
+        late.country_changed.connect(selected.append)
+        self.assertTrue(late.select_code("JP"))
+        self.assertEqual(selected, [COUNTRIES[2]])
+        self.assertIsNone(early.current_country())
+
+    def test_fetch_error_reaches_all_pickers(self) -> None:
+        """
+        Tests that a failed fetch disables every picker, including one created
+        afterwards, and schedules a retry.
+        """
+        early = CountryPickerWidget(self.catalog, autostart=False)
+        self.catalog.on_fetch_error("network down")
+        late = CountryPickerWidget(self.catalog, autostart=False)
+
+        self.assertTrue(self.catalog.retry_timer.isActive())
+        for picker in (early, late):
+            self.assertFalse(picker.combobox.isEnabled())
+            self.assertTrue(picker.retry_label.text().startswith("Retrying in"))
+
+    def test_stop_waits_for_fetch(self) -> None:
+        """
+        Tests that stop waits for a running country fetch and that its late
+        result is not published.
+        """
+        release = threading.Event()
+
+        class SlowFetchThread(CountryFetchThread):
+            def run(self) -> None:
+                release.wait(5)
+                self.finished.emit(COUNTRIES)
+
+        with mock.patch.object(catalog, "CountryFetchThread", SlowFetchThread):
+            self.catalog.start_fetch()
+        fetch_thread = self.catalog.fetch_thread
+        threading.Timer(0.1, release.set).start()
+        self.catalog.stop()
+        self.app.processEvents()
+
+        self.assertTrue(fetch_thread.isFinished())
+        self.assertIsNone(self.catalog.fetch_thread)
+        self.assertEqual(len(self.catalog.table), 0)
+
+    def test_join_thread_keeps_stalled_thread(self) -> None:
+        """
+        Tests that join_thread reports a thread outliving both waits.
+        """
+        release = threading.Event()
+
+        class StuckThread(QThread):
+            def run(self) -> None:
+                release.wait(5)
+
+        thread = StuckThread()
+        thread.start()
+        try:
+            with mock.patch.object(catalog, "WORKER_STOP_TIMEOUT_MS", 10), \
+                    mock.patch.object(catalog, "WORKER_STOP_GRACE_MS", 10), \
+                    self.assertLogs(level="WARNING") as logs:
+                self.assertFalse(join_thread(thread))
+            self.assertIn("did not stop", logs.output[-1])
+        finally:
+            release.set()
+            thread.wait()
+        self.assertTrue(join_thread(thread))
+
+
+class TestFlagFetchWorkerJobs(unittest.TestCase):
+    """
+    Unit tests for the job scheduling of FlagFetchWorker located in country_picker.thread.
+    """
+
+    def test_newest_job_per_owner(self) -> None:
+        """
+        Tests that each owner's newest job is served, owners in the order
+        they first asked, and that jobs for a delivered flag are dropped.
+        """
+        worker = FlagFetchWorker()
+        size = (48, 32, 1.0)
+        worker.request("ch", *size, owner="a")
+        worker.request("CH", *size, owner="b")
+        worker.request("fr", *size, owner="a")
+        self.assertEqual(worker._next_job(), ("fr", *size))
+        self.assertEqual(worker._next_job(), ("ch", *size))
+
+        worker.request("de", *size, owner="a")
+        worker.request("de", *size, owner="b")
+        worker.request("it", *size, owner="c")
+        job = worker._next_job()
+        self.assertEqual(job, ("de", *size))
+        worker._served(job)
+        self.assertEqual(worker._next_job(), ("it", *size))
+
+        worker.stop()
+        self.assertIsNone(worker._next_job())
@@ -0,0 +1,168 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from country_picker.cache import save_country_cache
+from country_picker.flagpack import FlagPack
+from country_picker.utils import Country, api_item
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs the command line entry point, then reports whether Qt was imported
+DRIVER = """
+import sys
+from country_picker.__main__ import main
+try:
+    main()
+except SystemExit as e:
+    code = e.code
+print(any(m.split(".")[0] == "PyQt6" for m in sys.modules), file=sys.stderr)
+sys.exit(code)
+"""
+
+FLAG = b'<svg xmlns="http://www.w3.org/2000/svg"><rect width="3" height="2" fill="red"/></svg>'
+
+
+class _FlagServer(ThreadingHTTPServer):
+    """
+    Serves a country list at /countries and the flags in `flags` at /flags/<code>.svg.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, countries: list) -> None:
+        self.body = json.dumps([api_item(country) for country in countries]).encode("utf-8")
+        self.flags: Dict[str, bytes] = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                code = self.path[len("/flags/"):-len(".svg")] if self.path.startswith("/flags/") else None
+                body = server.body if self.path.startswith("/countries") else server.flags.get(code)
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Length", str(len(body or b"")))
+                self.end_headers()
+                self.wfile.write(body or b"")
+
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+class TestHeadlessCommands(unittest.TestCase):
+    """
+    Tests for the headless subcommands located in country_picker.cli,
+    run in a child process against a cached country list.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.countries = countries = [
+            Country("Côte d'Ivoire", "ci", region="Africa"),
+            Country("France", "fr", region="Europe"),
+            Country("Switzerland", "ch", region="Europe"),
+        ]
+        save_country_cache(countries, None, None, path=os.path.join(self.tmp_dir.name, "countries.json"))
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def run_cli(self, *args: str, stdin: str = "", **extra_env: str) -> subprocess.CompletedProcess:
+        env = dict(os.environ, COUNTRY_PICKER_CACHE_DIR=self.tmp_dir.name, PYTHONPATH=REPO_ROOT, **extra_env)
+        return subprocess.run(
+            [sys.executable, "-c", DRIVER, *args],
+            input=stdin.encode("utf-8"), env=env, capture_output=True, timeout=60,
+        )
+
+    def test_resolve_streams_without_qt(self) -> None:
+        """
+        Tests that resolve answers every stdin line in order and never imports PyQt6.
+        """
+        result = self.run_cli("resolve", stdin="switzerland\nfr\nCOTE D'IVOIRE\nAtlantis\nfr\n")
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(
+            result.stdout.decode("utf-8").splitlines(),
+            ["ch\tSwitzerland", "fr\tFrance", "ci\tCôte d'Ivoire", "\t", "fr\tFrance"],
+        )
+        self.assertTrue(result.stderr.decode().endswith("False\n"))
+
+    def test_resolve_fuzzy(self) -> None:
+        """
+        Tests that --fuzzy resolves misspelled names to the closest match.
+        """
+        result = self.run_cli("resolve", "--fuzzy", stdin="swizerland\n")
+        self.assertEqual(result.stdout.decode("utf-8"), "ch\tSwitzerland\n")
+
+    def test_lookup_and_export(self) -> None:
+        """
+        Tests lookup's exit status and the CSV export, in full and by region.
+        """
+        self.assertEqual(self.run_cli("lookup", "ch", "France").returncode, 0)
+        missing = self.run_cli("lookup", "Frnace")
+        self.assertEqual(missing.returncode, 1)
+        self.assertIn("France", missing.stderr.decode())
+
+        export = self.run_cli("export", "--format", "csv")
+        self.assertEqual(
+            export.stdout.decode("utf-8").splitlines(),
+            [
+                "name,alpha2Code,alpha3Code,region,subregion,population,capital",
+                "Côte d'Ivoire,ci,,Africa,,0,",
+                "France,fr,,Europe,,0,",
+                "Switzerland,ch,,Europe,,0,",
+            ],
+        )
+        self.assertTrue(export.stderr.decode().endswith("False\n"))
+
+        europe = self.run_cli("export", "--format", "csv", "--region", "Europe")
+        self.assertEqual(len(europe.stdout.decode("utf-8").splitlines()), 3)
+
+    def test_workers_must_be_positive(self) -> None:
+        """
+        Tests that --workers below 1 is a usage error, not a traceback.
+        """
+        for command in ("warm-cache", "build-snapshot", "serve"):
+            result = self.run_cli(command, "--workers", "0")
+            self.assertEqual(result.returncode, 2)
+            self.assertIn("--workers: must be at least 1, got 0", result.stderr.decode())
+            self.assertNotIn("Traceback", result.stderr.decode())
+
+    def test_warm_cache_resumes_and_verifies(self) -> None:
+        """
+        Tests that warm-cache downloads missing flags, reports failures, only
+        fetches what is still missing when run again, and with --verify
+        replaces entries that are not flags.
+        """
+        server = _FlagServer(self.countries)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        env = {"COUNTRY_PICKER_API_URL": f"{url}/countries", "COUNTRY_PICKER_FLAG_BASE_URL": f"{url}/flags"}
+        path = os.path.join(self.tmp_dir.name, "warm.pack")
+
+        server.flags = {"ch": FLAG, "fr": FLAG}
+        first = self.run_cli("warm-cache", "--path", path, "--workers", "2", **env)
+        self.assertEqual(first.returncode, 1)
+        self.assertIn("2 downloaded, 1 failed", first.stdout.decode())
+        self.assertIn("Flag 'ci' failed", first.stderr.decode())
+        self.assertTrue(first.stderr.decode().endswith("False\n"))
+
+        server.flags["ci"] = FLAG
+        second = self.run_cli("warm-cache", "--path", path, **env)
+        self.assertEqual(second.returncode, 0)
+        self.assertIn("1 downloaded, 2 cached", second.stdout.decode())
+
+        FlagPack(path).add("fr", b"<html>Sign in to continue</html>")
+        verified = self.run_cli("warm-cache", "--path", path, "--verify", **env)
+        self.assertEqual(verified.returncode, 0)
+        self.assertIn("2 verified, 1 repaired", verified.stdout.decode())
+        self.assertEqual(bytes(FlagPack(path).get("fr")), FLAG)
@@ -1,8 +1,10 @@
 import unittest
 import logging
 import os
-from typing import List, Dict, Tuple
-from country_picker.utils import parse_countries_json
+from typing import List, Dict
+import json
+from country_picker.table import CountryTable
+from country_picker.utils import Country, iter_countries_json, parse_countries_json
 
 
 # Set up logging to file in the same directory as this test module
@@ -72,21 +74,27 @@ class TestParseCountriesJson(unittest.TestCase):
     def test_parse_valid_json(self) -> None:
         """
         Tests parsing valid JSON with country names and alpha2 codes.
-        Checks that output is sorted and formatted as expected.
+        Checks that output keeps the response order and is formatted as
+        expected, and is sorted only by CountryTable.
         """
         logging.info("TEST    : test_parse_valid_json")
         json_data: List[Dict] = [
             {"name": "Switzerland", "alpha2Code": "CH"},
             {"name": "United States", "alpha2Code": "US"},
+            {"name": "Åland Islands", "alpha2Code": "AX"},
             {"name": "France", "alpha2Code": "FR"},
         ]
-        expected: List[Tuple[str, str]] = [
-            ("France", "fr"),
-            ("Switzerland", "ch"),
-            ("United States", "us"),
+        expected: List[Country] = [
+            Country("Switzerland", "ch"),
+            Country("United States", "us"),
+            Country("Åland Islands", "ax"),
+            Country("France", "fr"),
         ]
         result = parse_countries_json(json_data)
         self.assertEqual(result, expected)
+        self.assertEqual(
+            CountryTable(result).names, ["Åland Islands", "France", "Switzerland", "United States"]
+        )
 
     def test_parse_missing_fields(self) -> None:
         """
@@ -99,10 +107,23 @@ class TestParseCountriesJson(unittest.TestCase):
             {"alpha2Code": "US"},     # missing name
             {"name": "France", "alpha2Code": "FR"},
         ]
-        expected: List[Tuple[str, str]] = [("France", "fr")]
+        expected: List[Country] = [Country("France", "fr")]
         result = parse_countries_json(json_data)
         self.assertEqual(result, expected)
 
+    def test_parse_optional_fields(self) -> None:
+        """
+        Tests that alpha3 code, region, subregion, population and capital are
+        parsed when present.
+        """
+        logging.info("TEST    : test_parse_optional_fields")
+        json_data: List[Dict] = [{
+            "name": "Switzerland", "alpha2Code": "CH", "alpha3Code": "CHE", "region": "Europe",
+            "subregion": "Western Europe", "population": 8654622, "capital": "Bern",
+        }]
+        expected = [Country("Switzerland", "ch", "CHE", "Europe", "Western Europe", 8654622, "Bern")]
+        self.assertEqual(parse_countries_json(json_data), expected)
+
     def test_parse_empty_list(self) -> None:
         """
         Tests that parsing an empty list returns an empty list.
@@ -112,6 +133,53 @@ class TestParseCountriesJson(unittest.TestCase):
         self.assertEqual(result, [])
 
 
+class TestIterCountriesJson(unittest.TestCase):
+    """
+    Unit tests for the streaming iter_countries_json parser
+    located in country_picker.utils.
+    """
+
+    json_data: List[Dict] = [
+        {"name": "Switzerland", "alpha2Code": "CH"},
+        {"name": "Côte d'Ivoire", "alpha2Code": "CI"},
+        {"alpha2Code": "US"},
+        {"name": "Åland Islands", "alpha2": "AX"},
+        {"name": "France", "alpha2Code": "FR", "extra": {"nested": ["[", "]", "{"]}},
+    ]
+
+    def test_streaming_matches_buffered(self) -> None:
+        """
+        Tests that parsing the response in chunks of any size yields the same
+        records as parse_countries_json on the fully buffered response.
+        """
+        logging.info("TEST    : test_streaming_matches_buffered")
+        payload = json.dumps(self.json_data, indent=1, ensure_ascii=False).encode("utf-8")
+        expected = parse_countries_json(self.json_data)
+        for size in (1, 2, 3, 7, 64, len(payload)):
+            chunks = [payload[i:i + size] for i in range(0, len(payload), size)]
+            result = list(iter_countries_json(chunks))
+            self.assertEqual(result, expected, f"chunk size {size}")
+            self.assertEqual(list(CountryTable(result)), list(CountryTable(expected)))
+
+    def test_streaming_yields_in_response_order(self) -> None:
+        """
+        Tests that records are yielded as they arrive, before the array is complete.
+        """
+        logging.info("TEST    : test_streaming_yields_in_response_order")
+        records = iter_countries_json(iter([b'[{"name": "Switzerland", "alpha2Code": "CH"},', b'{"name"']))
+        self.assertEqual(next(records), Country("Switzerland", "ch"))
+
+    def test_streaming_rejects_truncated(self) -> None:
+        """
+        Tests that a truncated or non-array response raises ValueError.
+        """
+        logging.info("TEST    : test_streaming_rejects_truncated")
+        with self.assertRaises(ValueError):
+            list(iter_countries_json([b'[{"name": "France", "alpha2Code": "FR"}']))
+        with self.assertRaises(ValueError):
+            list(iter_countries_json([b'{"status": 404}']))
+
+
 def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, pattern: str | None) -> unittest.TestSuite:
     """
     Custom load_tests function to run the tests with LoggingTestRunner
@@ -0,0 +1,175 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from country_picker.flagpack import FlagPack, flag_digest
+
+CH_SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><path fill="red" d="M0 0h32v32H0z"/></svg>'
+FR_SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><path fill="blue" d="M0 0h10v20H0z"/></svg>'
+
+
+class TestFlagPack(unittest.TestCase):
+    """
+    Unit tests for the memory-mapped flag store
+    located in country_picker.flagpack.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "flags", "flags.pack")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_add_and_reopen(self) -> None:
+        """
+        Tests that appended flags can be read back, also after reopening the pack.
+        """
+        pack = FlagPack(self.path)
+        self.assertIsNone(pack.get("ch"))
+        pack.add("ch", CH_SVG)
+        pack.add("fr", FR_SVG)
+        self.assertEqual(bytes(pack.get("ch")), CH_SVG)
+
+        reopened = FlagPack(self.path)
+        self.assertEqual(sorted(reopened.codes()), ["ch", "fr"])
+        self.assertEqual(bytes(reopened.get("fr")), FR_SVG)
+
+    def test_replace_and_compact(self) -> None:
+        """
+        Tests that replacing a flag leaves dead space that compaction reclaims.
+        """
+        pack = FlagPack(self.path)
+        pack.add("ch", FR_SVG)
+        pack.add("ch", CH_SVG)
+        pack.add("fr", FR_SVG)
+        self.assertGreater(pack.file_size(), pack.live_bytes())
+
+        pack.compact()
+        self.assertEqual(pack.file_size(), pack.live_bytes())
+        self.assertEqual(bytes(pack.get("ch")), CH_SVG)
+        self.assertEqual(bytes(FlagPack(self.path).get("fr")), FR_SVG)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["flags.pack"])
+
+    def test_dead_space_is_compacted(self) -> None:
+        """
+        Tests that adding flags one by one keeps dead index copies below the live size.
+        """
+        pack = FlagPack(self.path)
+        for i in range(200):
+            pack.add(f"{i:02x}", FR_SVG + bytes(i))
+            self.assertLessEqual(pack.file_size() - pack.live_bytes(), pack.live_bytes())
+        self.assertEqual(len(FlagPack(self.path)), 200)
+
+    def test_close(self) -> None:
+        """
+        Tests that a closed pack releases its mapping, reads as empty and
+        refuses writes, while views handed out before stay readable.
+        """
+        with FlagPack(self.path) as pack:
+            pack.add("ch", CH_SVG)
+            view = pack.get("ch")
+        self.assertIsNone(pack._mm)
+        self.assertEqual(len(pack), 0)
+        self.assertIsNone(pack.get("ch"))
+        with self.assertRaises(ValueError):
+            pack.add("fr", FR_SVG)
+        self.assertEqual(bytes(view), CH_SVG)
+        view.release()
+        pack.close()
+        self.assertEqual(bytes(FlagPack(self.path).get("ch")), CH_SVG)
+
+    def test_invalid_file_is_replaced(self) -> None:
+        """
+        Tests that an unreadable pack is replaced by an empty one.
+        """
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "wb") as f:
+            f.write(b"<svg>not a pack</svg>")
+        pack = FlagPack(self.path)
+        self.assertEqual(len(pack), 0)
+        pack.add("ch", CH_SVG)
+        self.assertEqual(bytes(FlagPack(self.path).get("ch")), CH_SVG)
+
+    def test_digest(self) -> None:
+        """
+        Tests that the digest is a stable 16-byte content hash.
+        """
+        self.assertEqual(len(flag_digest(CH_SVG)), 16)
+        self.assertNotEqual(flag_digest(CH_SVG), flag_digest(FR_SVG))
+
+    def test_shared_between_instances(self) -> None:
+        """
+        Tests that flags added or compacted through one instance (e.g. another
+        process) are seen by another one without reopening.
+        """
+        first = FlagPack(self.path)
+        second = FlagPack(self.path)
+        first.add("ch", CH_SVG)
+        self.assertEqual(bytes(second.get("ch")), CH_SVG)
+
+        second.add("fr", FR_SVG)
+        first.add("ch", FR_SVG)
+        first.add("ch", CH_SVG)
+        second.compact()
+        self.assertEqual(bytes(first.get("fr")), FR_SVG)
+        self.assertEqual(bytes(first.get("ch")), CH_SVG)
+        self.assertEqual(sorted(first.codes()), ["ch", "fr"])
+
+    def test_same_content_is_not_appended_twice(self) -> None:
+        """
+        Tests that adding a flag already stored by another instance writes nothing.
+        """
+        FlagPack(self.path).add("ch", CH_SVG)
+        pack = FlagPack(self.path)
+        size = pack.file_size()
+        pack.add("ch", CH_SVG)
+        self.assertEqual(pack.file_size(), size)
+
+    def test_corrupt_blob_is_ignored(self) -> None:
+        """
+        Tests that a blob not matching its digest is reported missing and can be re-added.
+        """
+        FlagPack(self.path).add("ch", CH_SVG)
+        with open(self.path, "r+b") as f:
+            data = f.read()
+            f.seek(data.index(CH_SVG) + 10)
+            f.write(b"X")
+
+        pack = FlagPack(self.path)
+        self.assertIsNone(pack.get("ch"))
+        pack.add("ch", CH_SVG)
+        self.assertEqual(bytes(pack.get("ch")), CH_SVG)
+
+    def test_least_recently_used_are_evicted(self) -> None:
+        """
+        Tests that exceeding the size cap evicts the flags accessed longest ago.
+        """
+        pack = FlagPack(self.path)
+        with mock.patch("country_picker.flagpack.time.time") as now:
+            for t, code in enumerate(["aa", "bb", "cc"]):
+                now.return_value = t * 10
+                pack.add(code, CH_SVG)
+            now.return_value = 10_000
+            pack.get("aa")  # old enough to be touched
+
+            pack.max_bytes = pack.live_bytes()
+            pack.add("dd", FR_SVG)
+
+        self.assertEqual(sorted(pack.codes()), ["aa", "dd"])
+        self.assertLessEqual(pack.file_size(), pack.max_bytes)
+        self.assertEqual(pack.file_size(), pack.live_bytes())
+
+    def test_stats(self) -> None:
+        """
+        Tests that stats report counts, sizes and access times.
+        """
+        pack = FlagPack(self.path)
+        with mock.patch("country_picker.flagpack.time.time", return_value=1234):
+            pack.add("ch", CH_SVG)
+        stats = pack.stats()
+        self.assertEqual(stats.flags, 1)
+        self.assertEqual(stats.live_bytes, pack.live_bytes())
+        self.assertEqual(stats.file_size, pack.file_size())
+        self.assertEqual((stats.oldest_access, stats.newest_access), (1234, 1234))
@@ -0,0 +1,88 @@
+import gzip
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from country_picker.log import CompressingRotatingFileHandler, setup_logging, shutdown_logging
+
+
+class TestCompressingRotatingFileHandler(unittest.TestCase):
+    """
+    Unit tests for the CompressingRotatingFileHandler class located in country_picker.log.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "app.log")
+        self.logger = logging.getLogger(f"test_log.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self) -> None:
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+        self.tmp_dir.cleanup()
+
+    def test_size_rotation_compresses_backups(self) -> None:
+        """
+        Tests that rotated files are gzip-compressed and only backup_count are kept.
+        """
+        self.logger.addHandler(CompressingRotatingFileHandler(self.path, max_bytes=100, backup_count=2, max_age=0))
+        for i in range(10):
+            self.logger.info(f"message {i:02d} " + "x" * 60)
+
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["app.log", "app.log.1.gz", "app.log.2.gz"])
+        with gzip.open(self.path + ".1.gz", "rt", encoding="utf-8") as f:
+            self.assertIn("message 08", f.read())
+        with open(self.path, encoding="utf-8") as f:
+            self.assertIn("message 09", f.read())
+
+    def test_age_rotation(self) -> None:
+        """
+        Tests that a log file left behind longer than max_age ago is rotated.
+        """
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("old run\n")
+        old = time.time() - 7200
+        os.utime(self.path, (old, old))
+
+        self.logger.addHandler(CompressingRotatingFileHandler(self.path, max_bytes=0, backup_count=1, max_age=3600))
+        self.logger.info("new run")
+
+        with gzip.open(self.path + ".1.gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "old run\n")
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "new run\n")
+
+
+class TestSetupLogging(unittest.TestCase):
+    """
+    Unit tests for the queue-based setup_logging located in country_picker.log.
+    """
+
+    def test_records_are_written_by_background_thread(self) -> None:
+        """
+        Tests that records from any thread reach the file once the queue is flushed.
+        """
+        root = logging.getLogger()
+        level = root.level
+        self.addCleanup(root.setLevel, level)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "logs", "app.log")
+            setup_logging("DEBUG", path)
+            try:
+                logging.debug("from the main thread")
+                worker = threading.Thread(target=logging.info, args=("from a worker",), name="worker")
+                worker.start()
+                worker.join()
+            finally:
+                shutdown_logging()
+
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        self.assertIn("[DEBUG] MainThread: from the main thread", text)
+        self.assertIn("[INFO] worker: from a worker", text)
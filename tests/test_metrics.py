@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+
+from country_picker.data import fetch_flag
+from country_picker.flagpack import FlagPack
+from country_picker.metrics import METRICS, MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """
+    Unit tests for the MetricsRegistry class located in country_picker.metrics.
+    """
+
+    def setUp(self) -> None:
+        self.metrics = MetricsRegistry(samples=100)
+
+    def test_counters_and_timers(self) -> None:
+        """
+        Tests counter sums and the timer summary, including percentiles.
+        """
+        self.metrics.incr("flag.pack_hit")
+        self.metrics.incr("flag.pack_hit", 2)
+        for ms in range(1, 101):
+            self.metrics.observe("flag.render", float(ms))
+
+        self.assertEqual(self.metrics.counter("flag.pack_hit"), 3)
+        self.assertEqual(self.metrics.counter("flag.download"), 0)
+        summary = self.metrics.timer("flag.render")
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["min_ms"], 1)
+        self.assertEqual(summary["max_ms"], 100)
+        self.assertEqual(summary["mean_ms"], 50.5)
+        self.assertEqual(summary["p50_ms"], 51)
+        self.assertEqual(summary["p95_ms"], 96)
+        self.assertIsNone(self.metrics.timer("flag.download"))
+
+    def test_span_records_errors(self) -> None:
+        """
+        Tests that a failing span is timed, counted and re-raised.
+        """
+        with self.assertRaises(ValueError):
+            with self.metrics.span("countries.fetch") as span:
+                span["status"] = 500
+                raise ValueError("bad payload")
+        self.assertEqual(self.metrics.timer("countries.fetch")["count"], 1)
+        self.assertEqual(self.metrics.counter("countries.fetch.errors"), 1)
+
+    def test_dump(self) -> None:
+        """
+        Tests that dump writes the snapshot as JSON.
+        """
+        self.metrics.incr("countries.errors")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "metrics", "run.json")
+            self.metrics.dump(path)
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+        self.assertEqual(payload["counters"], {"countries.errors": 1})
+        self.assertEqual(payload["timers"], {})
+
+
+class TestFetchFlagMetrics(unittest.TestCase):
+    """
+    Unit tests for the flag cache counters recorded by fetch_flag located in country_picker.data.
+    """
+
+    class Snapshot:
+        def flag(self, alpha2_code):
+            return b"<svg/>" if alpha2_code == "ch" else None
+
+    def test_snapshot_then_pack_hit(self) -> None:
+        """
+        Tests that a bundled flag counts as a snapshot hit, then as a pack hit.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pack = FlagPack(os.path.join(tmp_dir, "flags.pack"))
+            snapshot_hits = METRICS.counter("flag.snapshot_hit")
+            pack_hits = METRICS.counter("flag.pack_hit")
+
+            self.assertEqual(bytes(fetch_flag(None, pack, "ch", self.Snapshot())), b"<svg/>")
+            self.assertEqual(bytes(fetch_flag(None, pack, "ch", self.Snapshot())), b"<svg/>")
+
+        self.assertEqual(METRICS.counter("flag.snapshot_hit"), snapshot_hits + 1)
+        self.assertEqual(METRICS.counter("flag.pack_hit"), pack_hits + 1)
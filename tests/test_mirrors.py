@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from country_picker.mirrors import Mirrors
+
+PRIMARY = "https://primary.example"
+SECONDARY = "https://secondary.example"
+
+
+class TestMirrors(unittest.TestCase):
+    """
+    Unit tests for the Mirrors class located in country_picker.mirrors.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "mirrors.json")
+        self.mirrors = Mirrors(self.path)
+
+    def tearDown(self) -> None:
+        self.mirrors.close()
+        self.tmp_dir.cleanup()
+
+    def test_ranking(self) -> None:
+        """
+        Tests that healthy mirrors come first, fastest first, and unmeasured
+        mirrors keep the configured order.
+        """
+        self.assertEqual(self.mirrors.ranked([PRIMARY, SECONDARY]), [PRIMARY, SECONDARY])
+
+        self.mirrors.record(PRIMARY, 200.0)
+        self.mirrors.record(SECONDARY, 50.0)
+        self.assertEqual(self.mirrors.ranked([PRIMARY, SECONDARY]), [SECONDARY, PRIMARY])
+
+        for _ in range(5):
+            self.mirrors.record(SECONDARY, 0.0, failed=True)
+        self.assertGreaterEqual(self.mirrors.stat(SECONDARY).error_rate, 0.5)
+        self.assertEqual(self.mirrors.ranked([PRIMARY, SECONDARY]), [PRIMARY, SECONDARY])
+
+    def test_hedge_delay_follows_tail_latency(self) -> None:
+        """
+        Tests that the hedge delay is the EWMA latency plus two deviations, within bounds.
+        """
+        self.assertEqual(self.mirrors.hedge_delay(PRIMARY), 0.5)
+        self.mirrors.record(PRIMARY, 100.0)
+        stat = self.mirrors.stat(PRIMARY)
+        self.assertAlmostEqual(self.mirrors.hedge_delay(PRIMARY), (stat.latency_ms + 2 * stat.deviation_ms) / 1000)
+        self.mirrors.record(SECONDARY, 1.0)
+        self.assertEqual(self.mirrors.hedge_delay(SECONDARY), 0.05)
+
+    def test_slow_primary_is_hedged(self) -> None:
+        """
+        Tests that a primary slower than its hedge delay loses to the secondary,
+        and that the late result is discarded.
+        """
+        self.mirrors.record(PRIMARY, 10.0)
+        discarded = threading.Event()
+
+        def attempt(mirror: str) -> str:
+            if mirror == PRIMARY:
+                time.sleep(0.5)
+            return mirror
+
+        start = time.monotonic()
+        result = self.mirrors.call([PRIMARY, SECONDARY], attempt, discard=lambda r: discarded.set())
+        self.assertEqual(result, SECONDARY)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertTrue(discarded.wait(2))
+
+    def test_failover_and_errors(self) -> None:
+        """
+        Tests that a failing mirror is replaced immediately, and that the best
+        mirror's error is raised when all fail.
+        """
+        def flaky(mirror: str) -> str:
+            if mirror == PRIMARY:
+                raise ConnectionError("primary down")
+            return mirror
+
+        self.assertEqual(self.mirrors.call([PRIMARY, SECONDARY], flaky), SECONDARY)
+        self.assertEqual(self.mirrors.stat(PRIMARY).error_rate, 1.0)
+
+        def broken(mirror: str) -> str:
+            raise LookupError(mirror)
+
+        with self.assertRaises(LookupError) as raised:
+            self.mirrors.call([PRIMARY, SECONDARY], broken, is_failure=lambda e: False)
+        self.assertEqual(raised.exception.args, (SECONDARY,))
+
+    def test_statistics_persist(self) -> None:
+        """
+        Tests that statistics saved by one instance are loaded by the next.
+        """
+        self.mirrors.record(SECONDARY, 42.0)
+        self.mirrors.save()
+        restored = Mirrors(self.path)
+        self.addCleanup(restored.close)
+        self.assertEqual(restored.stat(SECONDARY), self.mirrors.stat(SECONDARY))
+        self.assertIsNone(restored.stat(PRIMARY))
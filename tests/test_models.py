@@ -0,0 +1,82 @@
+import os
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QCoreApplication
+
+from country_picker.models import CountryListModel
+from country_picker.table import CountryTable
+from country_picker.utils import Country
+
+COUNTRIES = [
+    Country("Chile", "cl", region="Americas"),
+    Country("France", "fr", region="Europe"),
+    Country("Japan", "jp", region="Asia"),
+    Country("Switzerland", "ch", region="Europe"),
+]
+
+
+class TestCountryListModel(unittest.TestCase):
+    """
+    Unit tests for the CountryListModel class located in country_picker.models.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def test_update_table_serves_intermediate_rows(self) -> None:
+        """
+        Tests that update_table inserts and removes only the changed rows,
+        that views reading the model in between see each intermediate list,
+        and that the model shows the new table afterwards.
+        """
+        model = CountryListModel()
+        model.set_table(CountryTable(COUNTRIES[:3]))
+        seen = []
+
+        def snapshot(*_args) -> None:
+            seen.append([model.index(row).data(CountryListModel.CodeRole) for row in range(model.rowCount())])
+
+        model.rowsRemoved.connect(snapshot)
+        model.rowsInserted.connect(snapshot)
+        resets = []
+        model.modelReset.connect(lambda: resets.append(True))
+
+        table = CountryTable(COUNTRIES[1:])
+        model.update_table(table)
+        self.assertEqual(seen, [["cl", "fr", "jp", "ch"], ["fr", "jp", "ch"]])
+        self.assertEqual(resets, [])
+        self.assertIs(model.table, table)
+        self.assertEqual(model.record(2), COUNTRIES[3])
+        self.assertIsNone(model.record(3))
+
+    def test_update_table_refreshes_changed_fields(self) -> None:
+        """
+        Tests that a country whose other fields changed keeps its row and is
+        refreshed through dataChanged.
+        """
+        model = CountryListModel()
+        model.set_table(CountryTable(COUNTRIES))
+        moved = []
+        model.rowsInserted.connect(lambda *_args: moved.append("inserted"))
+        model.rowsRemoved.connect(lambda *_args: moved.append("removed"))
+        changed = []
+        model.dataChanged.connect(lambda first, last: changed.append((first.row(), last.row())))
+
+        model.update_table(CountryTable([*COUNTRIES[:2], Country("Japan", "jp", region="Oceania"), COUNTRIES[3]]))
+        self.assertEqual(moved, [])
+        self.assertEqual(changed, [(0, 3)])
+        self.assertEqual(model.index(2).data(CountryListModel.RegionRole), "Oceania")
+
+    def test_table_reuses_keys(self) -> None:
+        """
+        Tests that a table built from known collation keys keeps them.
+        """
+        table = CountryTable(COUNTRIES)
+        copy = CountryTable(table, presorted=True, keys=table.keys)
+        self.assertEqual(copy.keys, table.keys)
+        self.assertEqual(list(copy), list(table))
+        with self.assertRaises(ValueError):
+            CountryTable(COUNTRIES, keys=table.keys[:1])
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from country_picker.prefetch import PRIORITY_HIGHLIGHT, PRIORITY_HISTORY, PrefetchScheduler, SelectionHistory
+
+
+class TestSelectionHistory(unittest.TestCase):
+    """
+    Unit tests for the SelectionHistory class located in country_picker.prefetch.
+    """
+
+    def test_most_chosen_persists(self) -> None:
+        """
+        Tests that choices are ranked by count and restored by the next instance.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "history.json")
+            history = SelectionHistory(path)
+            for code in ("ch", "FR", "ch", "de", "ch", "fr"):
+                history.record(code)
+            self.assertEqual(history.most_chosen(2), ["ch", "fr"])
+            history.save()
+            self.assertEqual(SelectionHistory(path).most_chosen(5), ["ch", "fr", "de"])
+
+
+class TestPrefetchScheduler(unittest.TestCase):
+    """
+    Unit tests for the PrefetchScheduler class located in country_picker.prefetch.
+    """
+
+    def setUp(self) -> None:
+        self.fetched: list[str] = []
+        self.size = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def fetch(self, code: str) -> int:
+        self.gate.wait(5)
+        self.fetched.append(code)
+        return self.size
+
+    def make(self, **kwargs) -> PrefetchScheduler:
+        scheduler = PrefetchScheduler(fetch=self.fetch, **kwargs)
+        self.addCleanup(scheduler.stop)
+        return scheduler
+
+    def wait_for(self, count: int) -> None:
+        deadline = time.monotonic() + 5
+        while len(self.fetched) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_priority_and_replacement(self) -> None:
+        """
+        Tests that highlighted rows go before history, and that a new
+        highlight replaces the previous highlight's pending prefetches.
+        """
+        scheduler = self.make(workers=1)
+        scheduler.schedule(["de", "it"], PRIORITY_HISTORY)
+        scheduler.schedule(["ch", "fr"], PRIORITY_HIGHLIGHT, replace=True)
+        scheduler.schedule(["at", "IT"], PRIORITY_HIGHLIGHT, replace=True)
+        scheduler.start()
+        self.wait_for(3)
+        self.assertEqual(self.fetched, ["at", "it", "de"])
+
+    def test_gives_way_to_selection(self) -> None:
+        """
+        Tests that no prefetch starts while a selection is served, and that a
+        selection of a flag being prefetched waits for that download.
+        """
+        scheduler = self.make(workers=1)
+        scheduler.start()
+        with scheduler.selection("fr"):
+            scheduler.schedule(["ch"])
+            time.sleep(0.1)
+            self.assertEqual(self.fetched, [])
+        self.wait_for(1)
+        self.assertEqual(self.fetched, ["ch"])
+
+        self.gate.clear()
+        scheduler.schedule(["de"])
+        time.sleep(0.05)
+        threading.Timer(0.1, self.gate.set).start()
+        with scheduler.selection("de"):
+            self.assertEqual(self.fetched, ["ch", "de"])
+
+    def test_bandwidth_budget(self) -> None:
+        """
+        Tests that prefetches are delayed once the bandwidth budget is used up.
+        """
+        self.size = 300
+        scheduler = self.make(workers=2, bytes_per_second=1000)
+        scheduler.schedule(["a1", "a2", "a3", "a4", "a5", "a6"])
+        start = time.monotonic()
+        scheduler.start()
+        self.wait_for(6)
+        self.assertEqual(len(self.fetched), 6)
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
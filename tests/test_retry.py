@@ -0,0 +1,165 @@
+import os
+import tempfile
+import unittest
+
+import requests
+
+from country_picker.data import fetch_flag
+from country_picker.flagpack import FlagPack
+from country_picker.retry import CircuitBreaker, CircuitBreakers, NegativeCache, RetryLaterError, RetryPolicy
+
+
+class FakeClock:
+    """
+    Manually advanced monotonic clock.
+    """
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    Unit tests for the backoff policy
+    located in country_picker.retry.
+    """
+
+    def test_exponential_with_cap(self) -> None:
+        """
+        Tests that delays double per failure and stop growing at the cap.
+        """
+        policy = RetryPolicy(base=5, cap=60, jitter=0.5, rng=lambda: 0.0)
+        self.assertEqual([policy.delay(n) for n in range(6)], [0, 5, 10, 20, 40, 60])
+        self.assertEqual(policy.delay(10_000), 60)
+
+    def test_jitter_bounds(self) -> None:
+        """
+        Tests that jitter takes at most the configured fraction off the delay.
+        """
+        self.assertEqual(RetryPolicy(base=8, cap=60, jitter=0.5, rng=lambda: 0.999999).delay(1), 8 * (1 - 0.5 * 0.999999))
+        self.assertEqual(RetryPolicy(base=8, cap=60, jitter=0.25, rng=lambda: 0.5).delay(2), 14)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Unit tests for the per-host circuit breaker
+    located in country_picker.retry.
+    """
+
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(RetryPolicy(base=10, cap=100, jitter=0), threshold=2, clock=self.clock)
+
+    def test_opens_after_threshold(self) -> None:
+        """
+        Tests that requests are refused after consecutive failures until the delay passed.
+        """
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_in(), 10)
+
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())   # trial request
+        self.assertFalse(self.breaker.allow())  # others wait for its outcome
+
+    def test_failed_trial_backs_off_further(self) -> None:
+        """
+        Tests that a failed trial re-opens the circuit for a longer delay.
+        """
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.retry_in(), 20)
+
+    def test_success_closes(self) -> None:
+        """
+        Tests that a success resets the failure count and closes the circuit.
+        """
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.is_open)
+
+    def test_registry_is_per_host(self) -> None:
+        """
+        Tests that breakers are shared per host, independently of the path.
+        """
+        breakers = CircuitBreakers(threshold=1, clock=self.clock)
+        self.assertIs(breakers.for_url("https://flagcdn.com/ch.svg"), breakers.for_url("https://FLAGCDN.com/de.svg"))
+        self.assertIsNot(breakers.for_url("https://flagcdn.com/ch.svg"), breakers.for_url("https://restcountries.com/v2/all"))
+
+
+class TestNegativeCache(unittest.TestCase):
+    """
+    Unit tests for the TTL negative cache
+    located in country_picker.retry.
+    """
+
+    def test_entries_expire(self) -> None:
+        """
+        Tests that a failure is remembered for the TTL only.
+        """
+        clock = FakeClock()
+        cache = NegativeCache(ttl=30, clock=clock)
+        cache.add("xx")
+        self.assertIn("xx", cache)
+        clock.now += 29
+        self.assertEqual(cache.retry_in("xx"), 1)
+        clock.now += 1
+        self.assertNotIn("xx", cache)
+
+
+class TestFetchFlagFailures(unittest.TestCase):
+    """
+    Tests that fetch_flag stops requesting flags that timed out, and respects
+    an open circuit.
+    """
+
+    class TimeoutSession:
+        def __init__(self) -> None:
+            self.calls = 0
+
+        def get(self, url, timeout):
+            self.calls += 1
+            raise requests.Timeout("timed out")
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pack = FlagPack(os.path.join(self.tmp_dir.name, "flags.pack"))
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_repeat_selection_fails_instantly(self) -> None:
+        """
+        Tests that a timed-out flag is not requested again while negatively cached.
+        """
+        session = self.TimeoutSession()
+        negative = NegativeCache(ttl=60, clock=FakeClock())
+        with self.assertRaises(requests.Timeout):
+            fetch_flag(session, self.pack, "xx", negative=negative)
+        with self.assertRaises(RetryLaterError):
+            fetch_flag(session, self.pack, "xx", negative=negative)
+        self.assertEqual(session.calls, 1)
+
+    def test_open_circuit_skips_requests(self) -> None:
+        """
+        Tests that once a host's circuit opens, other flags fail without a request.
+        """
+        session = self.TimeoutSession()
+        breakers = CircuitBreakers(RetryPolicy(jitter=0), threshold=2, clock=FakeClock())
+        for code in ("aa", "bb"):
+            with self.assertRaises(requests.Timeout):
+                fetch_flag(session, self.pack, code, breakers=breakers)
+        with self.assertRaises(RetryLaterError) as raised:
+            fetch_flag(session, self.pack, "cc", breakers=breakers)
+        self.assertGreater(raised.exception.retry_in, 0)
+        self.assertEqual(session.calls, 2)
@@ -0,0 +1,105 @@
+import unittest
+
+from country_picker.search import BKTree, LookupIndex, SearchIndex, edit_distance, normalize
+
+
+class TestSearchIndex(unittest.TestCase):
+    """
+    Unit tests for the type-to-search index
+    located in country_picker.search.
+    """
+
+    def setUp(self) -> None:
+        self.names = ["Côte d'Ivoire", "France", "Guinea-Bissau", "Switzerland", "United States of America"]
+        self.index = SearchIndex(self.names, {4: ("USA",)})
+
+    def test_normalize(self) -> None:
+        """
+        Tests that accents, case and punctuation are folded away.
+        """
+        self.assertEqual(normalize("  Côte d'Ivoire "), "cote divoire")
+        self.assertEqual(normalize("Guinea-Bissau"), "guinea bissau")
+
+    def test_accent_and_case_insensitive(self) -> None:
+        """
+        Tests that queries match regardless of accents and case.
+        """
+        self.assertEqual(self.index.search("cote"), [0])
+        self.assertEqual(self.index.search("CÔTE D'IV"), [0])
+
+    def test_substring_and_alias(self) -> None:
+        """
+        Tests that queries match inside names and alternative names.
+        """
+        self.assertEqual(self.index.search("land"), [3])
+        self.assertEqual(self.index.search("usa"), [4])
+        self.assertEqual(self.index.search("xyz"), [])
+
+    def test_prefix_matches_first(self) -> None:
+        """
+        Tests that names starting with the query are ranked before inner matches.
+        """
+        # "a" starts the word "America" and only sits inside the other names
+        self.assertEqual(self.index.search("a"), [4, 1, 2, 3])
+
+    def test_empty_query(self) -> None:
+        """
+        Tests that an empty query returns all rows in order.
+        """
+        self.assertEqual(self.index.search(""), list(range(len(self.names))))
+
+    def test_matches_linear_scan(self) -> None:
+        """
+        Tests that index results equal a plain substring scan.
+        """
+        for query in ["a", "in", "ssa", "nited sta", "q"]:
+            expected = {i for i, name in enumerate(self.names) if normalize(query) in normalize(name)}
+            self.assertEqual(set(self.index.search(query)) - {4}, expected - {4})
+
+
+class TestLookupIndex(unittest.TestCase):
+    """
+    Unit tests for name/code resolution and fuzzy suggestions
+    located in country_picker.search.
+    """
+
+    def setUp(self) -> None:
+        self.records = [("France", "fr"), ("Swaziland", "sz"), ("Sweden", "se"), ("Switzerland", "ch")]
+        self.index = LookupIndex(self.records)
+
+    def test_resolve_name_and_code(self) -> None:
+        """
+        Tests that names resolve regardless of case and whitespace, and codes resolve too.
+        """
+        self.assertEqual(self.index.resolve("switzerland "), 3)
+        self.assertEqual(self.index.resolve("FRANCE"), 0)
+        self.assertEqual(self.index.resolve("CH"), 3)
+        self.assertIsNone(self.index.resolve("Swizerland"))
+
+    def test_suggest_closest(self) -> None:
+        """
+        Tests that near-misses suggest the closest names first.
+        """
+        self.assertEqual(self.index.suggest("Swizerland")[0], 3)
+        self.assertEqual(self.index.suggest("Swizerland", limit=1, max_distance=1), [3])
+        self.assertEqual(self.index.suggest("Atlantis"), [])
+
+    def test_bk_tree_matches_linear_scan(self) -> None:
+        """
+        Tests that BK-tree results equal a brute-force edit-distance scan.
+        """
+        words = ["france", "swaziland", "sweden", "switzerland", "finland", "ireland", "iceland", "poland"]
+        tree = BKTree()
+        for row, word in enumerate(words):
+            tree.add(word, row)
+        for query in ["swizerland", "island", "polan", "x"]:
+            expected = sorted((edit_distance(query, w), w, [r]) for r, w in enumerate(words) if edit_distance(query, w) <= 3)
+            self.assertEqual(tree.search(query, 3), expected)
+
+    def test_edit_distance(self) -> None:
+        """
+        Tests the Levenshtein distance on simple cases.
+        """
+        self.assertEqual(edit_distance("kitten", "sitting"), 3)
+        self.assertEqual(edit_distance("", "abc"), 3)
+        self.assertEqual(edit_distance("same", "same"), 0)
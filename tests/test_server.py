@@ -0,0 +1,141 @@
+import gzip
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from country_picker.cache import CachedCountries
+from country_picker import server
+from country_picker.flagpack import FlagPack
+from country_picker.server import CountryServer, CountryService
+from country_picker.utils import Country
+
+FLAG = b'<svg xmlns="http://www.w3.org/2000/svg"><rect width="3" height="2" fill="red"/></svg>'
+
+
+class TestCountryServer(unittest.TestCase):
+    """
+    Unit tests for the HTTP lookup and flag service located in country_picker.server.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        pack = FlagPack(os.path.join(self.tmp_dir.name, "flags.pack"))
+        pack.add("ch", FLAG)
+        listing = CachedCountries(
+            [Country("Switzerland", "ch", "CHE", "Europe", "Western Europe", 8654622, "Bern"), Country("France", "fr")],
+            None,
+            None,
+        )
+        self.server = CountryServer(("127.0.0.1", 0), CountryService(listing, pack), workers=2)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def get(self, path: str, **headers: str) -> tuple[http.client.HTTPResponse, bytes]:
+        host, port = self.server.server_address[:2]
+        connection = http.client.HTTPConnection(host, port, timeout=5)
+        try:
+            connection.request("GET", path, headers={k.replace("_", "-"): v for k, v in headers.items()})
+            response = connection.getresponse()
+            return response, response.read()
+        finally:
+            # An open keep-alive connection would hold one of the two workers
+            connection.close()
+
+    def test_countries_in_api_shape(self) -> None:
+        """
+        Tests that /countries answers like API_URL, sorted, ignoring the query string.
+        """
+        response, body = self.get("/countries?fields=name,alpha2Code")
+        self.assertEqual(response.status, 200)
+        self.assertEqual([country["name"] for country in json.loads(body)], ["France", "Switzerland"])
+
+    def test_single_country(self) -> None:
+        """
+        Tests lookups of one country by code, in any case, and unknown codes.
+        """
+        _response, body = self.get("/countries/ch")
+        self.assertEqual(
+            json.loads(body),
+            {
+                "name": "Switzerland", "alpha2Code": "ch", "alpha3Code": "CHE", "region": "Europe",
+                "subregion": "Western Europe", "population": 8654622, "capital": "Bern",
+            },
+        )
+        self.assertEqual(self.get("/countries/XX")[0].status, 404)
+
+    def test_etag_and_gzip(self) -> None:
+        """
+        Tests 304 answers to a matching If-None-Match and gzip-encoded bodies.
+        """
+        etag = self.get("/countries")[0].getheader("ETag")
+        not_modified, body = self.get("/countries", If_None_Match=etag)
+        self.assertEqual(not_modified.status, 304)
+        self.assertEqual(body, b"")
+
+        compressed, body = self.get("/countries", Accept_Encoding="gzip")
+        self.assertEqual(compressed.getheader("Content-Encoding"), "gzip")
+        self.assertNotEqual(compressed.getheader("ETag"), etag)
+        self.assertEqual(len(json.loads(gzip.decompress(body))), 2)
+
+    def test_flags_from_pack(self) -> None:
+        """
+        Tests that cached flags are served with an ETag.
+        """
+        response, body = self.get("/flags/CH.svg")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "image/svg+xml")
+        self.assertEqual(body, FLAG)
+        self.assertEqual(self.get("/flags/ch.svg", If_None_Match=response.getheader("ETag"))[0].status, 304)
+        self.assertEqual(self.get("/flags/../ch.svg")[0].status, 404)
+
+    def test_flags_of_unknown_codes(self) -> None:
+        """
+        Tests that flags of codes missing from the list are never fetched.
+        """
+        with mock.patch.object(server, "fetch_flag") as fetch_flag:
+            self.assertEqual(self.get("/flags/xx.svg")[0].status, 404)
+        fetch_flag.assert_not_called()
+        self.assertIsNone(self.server.service.pack.get("xx"))
+
+    def test_close_drops_queued_connections(self) -> None:
+        """
+        Tests that closing the server closes connections still waiting for a
+        worker, and waits for the handlers still running.
+        """
+        host, port = self.server.server_address[:2]
+        busy = []
+        for _ in range(2):
+            # Keep-alive connections holding both workers
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            connection.request("GET", "/countries/ch")
+            connection.getresponse().read()
+            busy.append(connection)
+        queued = socket.create_connection((host, port), timeout=5)
+        queued.sendall(b"GET /countries/fr HTTP/1.1\r\nHost: test\r\n\r\n")
+        deadline = time.monotonic() + 5
+        while len(self.server._connections) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.server.shutdown()
+        closing = threading.Thread(target=self.server.server_close)
+        closing.start()
+        try:
+            self.assertEqual(queued.recv(1024), b"")
+            self.assertTrue(closing.is_alive())
+        finally:
+            queued.close()
+            for connection in busy:
+                connection.close()
+        closing.join(5)
+        self.assertFalse(closing.is_alive())
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from country_picker.cache import CachedCountries
+from country_picker.utils import Country
+from country_picker.snapshot import Snapshot, write_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Unit tests for the bundled offline snapshot
+    located in country_picker.snapshot.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "assets", "snapshot.zip")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self) -> None:
+        """
+        Tests that the list, its validators and the flags are read back unchanged.
+        """
+        listing = CachedCountries([Country("Côte d'Ivoire", "ci"), Country("Switzerland", "ch")], '"v1"', None)
+        write_snapshot(self.path, listing, {"ci": b"<svg>ci</svg>", "CH": b"<svg>ch</svg>"})
+
+        snapshot = Snapshot(self.path)
+        self.assertEqual(snapshot.countries(), listing)
+        self.assertEqual(snapshot.flag("ch"), b"<svg>ch</svg>")
+        self.assertEqual(snapshot.flag("CI"), b"<svg>ci</svg>")
+        self.assertIsNone(snapshot.flag("de"))
+        snapshot.close()
+
+    def test_missing_or_damaged_archive(self) -> None:
+        """
+        Tests that a missing or damaged archive behaves like an empty snapshot.
+        """
+        self.assertIsNone(Snapshot(self.path).countries())
+
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "wb") as f:
+            f.write(b"not a zip file")
+        snapshot = Snapshot(self.path)
+        self.assertIsNone(snapshot.countries())
+        self.assertIsNone(snapshot.flag("ch"))
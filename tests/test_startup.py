@@ -0,0 +1,41 @@
+import io
+import json
+import unittest
+
+from country_picker.startup import STARTUP_PHASES, StartupProfiler
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """
+    Unit tests for the StartupProfiler
+    located in country_picker.startup.
+    """
+
+    def test_first_mark_wins(self) -> None:
+        """
+        Tests that a phase keeps the time of its first mark.
+        """
+        profiler = StartupProfiler()
+        profiler.mark("first_data")
+        first = profiler.phases["first_data"]
+        profiler.mark("first_data")
+        self.assertEqual(profiler.phases["first_data"], first)
+        self.assertGreaterEqual(first, 0)
+
+    def test_report_is_one_json_line_written_once(self) -> None:
+        """
+        Tests that report() writes every phase once, with null for missing ones.
+        """
+        profiler = StartupProfiler()
+        profiler.mark("imports")
+        stream = io.StringIO()
+        profiler.report(stream)
+        profiler.report(stream)
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        timings = json.loads(lines[0])["startup_ms"]
+        self.assertEqual(list(timings), list(STARTUP_PHASES))
+        self.assertIsNotNone(timings["imports"])
+        self.assertIsNone(timings["first_data"])
+
@@ -0,0 +1,70 @@
+import unittest
+
+from country_picker.table import CountryTable, collation_key
+from country_picker.utils import Country
+
+COUNTRIES = [
+    Country("Switzerland", "ch", "CHE", "Europe", "Western Europe", 8654622, "Bern"),
+    Country("Åland Islands", "ax", "ALA", "Europe", "Northern Europe", 28875, "Mariehamn"),
+    Country("Chile", "cl", "CHL", "Americas", "South America", 19116209, "Santiago"),
+    Country("France", "fr", "FRA", "Europe", "Western Europe", 67391582, "Paris"),
+]
+
+
+class TestCountryTable(unittest.TestCase):
+    """
+    Unit tests for the columnar CountryTable
+    located in country_picker.table.
+    """
+
+    def test_records_round_trip_sorted(self) -> None:
+        """
+        Tests that records are sorted by collation key and read back unchanged.
+        """
+        table = CountryTable(COUNTRIES)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table.names, ["Åland Islands", "Chile", "France", "Switzerland"])
+        self.assertEqual(list(table), sorted(COUNTRIES, key=lambda c: collation_key(c.name)))
+        self.assertEqual(table.code(3), "ch")
+        self.assertEqual(table.population(2), 67391582)
+
+    def test_short_records(self) -> None:
+        """
+        Tests that (name, alpha2) pairs get empty optional fields and lowercase codes.
+        """
+        table = CountryTable([("Switzerland", "CH"), ("France", "fr")])
+        self.assertEqual(list(table), [Country("France", "fr"), Country("Switzerland", "ch")])
+        self.assertEqual(table.regions(), [])
+
+    def test_row_of_code(self) -> None:
+        """
+        Tests the code-to-row lookup, including unknown codes.
+        """
+        table = CountryTable(COUNTRIES)
+        self.assertEqual(table.row_of_code("CH"), 3)
+        self.assertIsNone(table.row_of_code("de"))
+
+    def test_filter(self) -> None:
+        """
+        Tests filtering by region, subregion, population and predicate.
+        """
+        table = CountryTable(COUNTRIES)
+        self.assertEqual(table.regions(), ["Americas", "Europe"])
+        self.assertEqual(table.filter(region="Europe"), [0, 2, 3])
+        self.assertEqual(table.filter(region="Europe", subregion="Western Europe"), [2, 3])
+        self.assertEqual(table.filter(min_population=10_000_000), [1, 2])
+        self.assertEqual(table.filter(predicate=lambda row: table.code(row) == "cl"), [1])
+        self.assertEqual(table.filter(region="Antarctic"), [])
+        self.assertEqual(table.filter(), [0, 1, 2, 3])
+
+    def test_merge(self) -> None:
+        """
+        Tests that merging a batch gives the same table as building it at once.
+        """
+        table = CountryTable(COUNTRIES[:2]).merge(COUNTRIES[2:])
+        self.assertEqual(list(table), list(CountryTable(COUNTRIES)))
+        self.assertEqual(table.keys, CountryTable(COUNTRIES).keys)
+        self.assertEqual(table.codes(), ["ax", "cl", "fr", "ch"])
+        self.assertEqual(table.filter(region="Americas"), [1])
+        self.assertEqual(table.filter(subregion="Western Europe"), [2, 3])
+        self.assertEqual(table.row_of_code("FR"), 2)
@@ -0,0 +1,85 @@
+import unittest
+
+from country_picker.utils import LRUCache, row_changes
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Unit tests for the cost-bounded LRUCache
+    located in country_picker.utils.
+    """
+
+    def test_hits_and_misses(self) -> None:
+        """
+        Tests that lookups return cached values and update the counters.
+        """
+        cache = LRUCache(10)
+        cache.put("ch", "swiss", 1)
+        self.assertEqual(cache.get("ch"), "swiss")
+        self.assertIsNone(cache.get("fr"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self) -> None:
+        """
+        Tests that the least recently used entries are evicted to stay within budget.
+        """
+        cache = LRUCache(10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 4)
+        cache.get("a")  # "b" is now the oldest
+        cache.put("c", 3, 4)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.total_cost, 8)
+
+    def test_replace_and_oversized(self) -> None:
+        """
+        Tests that replacing an entry updates the cost and oversized values are skipped.
+        """
+        cache = LRUCache(10)
+        cache.put("a", 1, 4)
+        cache.put("a", 2, 6)
+        self.assertEqual(cache.total_cost, 6)
+        cache.put("huge", 3, 11)
+        self.assertNotIn("huge", cache)
+        self.assertEqual(len(cache), 1)
+
+
+class TestRowChanges(unittest.TestCase):
+    """
+    Unit tests for the row_changes list diff
+    located in country_picker.utils.
+    """
+
+    @staticmethod
+    def apply(old, edits):
+        rows = list(old)
+        for start, removed, inserted in edits:
+            rows[start:start + removed] = inserted
+        return rows
+
+    def test_equal_lists(self) -> None:
+        """
+        Tests that equal lists need no edits.
+        """
+        self.assertEqual(row_changes(["a", "b"], ["a", "b"]), [])
+
+    def test_minimal_edits_back_to_front(self) -> None:
+        """
+        Tests that a sorted update yields one edit per changed run, last run first.
+        """
+        old = ["a", "b", "c", "d", "f"]
+        new = ["a", "c", "d", "e", "f", "g"]
+        edits = row_changes(old, new)
+        self.assertEqual(edits, [(5, 0, ["g"]), (4, 0, ["e"]), (1, 1, [])])
+        self.assertEqual(self.apply(old, edits), new)
+
+    def test_unsorted_lists_still_converge(self) -> None:
+        """
+        Tests that the edits are correct even when the lists are not sorted.
+        """
+        old = ["d", "a", "c"]
+        new = ["b", "d", "a"]
+        self.assertEqual(self.apply(old, row_changes(old, new)), new)
+        self.assertEqual(self.apply([], row_changes([], new)), new)
@@ -0,0 +1,57 @@
+import time
+import unittest
+
+from country_picker.metrics import MetricsRegistry
+from country_picker.watchdog import StallWatchdog, stall_bucket
+
+
+def blocking_call() -> None:
+    time.sleep(0.3)
+
+
+class TestStallWatchdog(unittest.TestCase):
+    """
+    Unit tests for the event loop watchdog located in country_picker.watchdog.
+    """
+
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+
+    def test_lag_and_histogram(self) -> None:
+        """
+        Tests that late beats are recorded as lag, and long gaps as stalls in
+        the histogram bucket of their duration.
+        """
+        now = [0.0]
+        watchdog = StallWatchdog(interval_ms=100, stall_ms=250, registry=self.registry, clock=lambda: now[0])
+        for t in (0.1, 0.25):
+            now[0] = t
+            watchdog.beat()
+        now[0] = 1.05
+        with self.assertLogs("country_picker.watchdog", "WARNING"):
+            watchdog.beat()
+
+        lag = self.registry.timer("loop.lag")
+        self.assertEqual(lag["count"], 3)
+        self.assertAlmostEqual(lag["max_ms"], 700.0)
+        self.assertEqual(self.registry.timer("loop.stall")["count"], 1)
+        self.assertEqual(watchdog.histogram(), {"lt_1000ms": 1})
+        self.assertEqual(stall_bucket(9000), "ge_5000ms")
+
+    def test_captures_main_thread_stack(self) -> None:
+        """
+        Tests that the stack of a blocked main thread is logged once per stall.
+        """
+        watchdog = StallWatchdog(interval_ms=10, stall_ms=50, registry=self.registry)
+        watchdog.start()
+        try:
+            with self.assertLogs("country_picker.watchdog", "WARNING") as logs:
+                blocking_call()
+                watchdog.beat()
+        finally:
+            watchdog.stop()
+
+        self.assertEqual(self.registry.counter("loop.stacks_captured"), 1)
+        self.assertIn("blocking_call", logs.output[0])
+        self.assertIn("unresponsive", logs.output[-1])
+        self.assertFalse(watchdog.check())